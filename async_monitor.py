@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from logger import logger
+
+
+class _FutureWaiter:
+    """Ожидающий запрос корутины: вместо условия потока - future в цикле событий."""
+
+    __slots__ = (
+        "process_id",
+        "request",
+        "future",
+        "granted",
+        "retired",
+        "priority",
+        "deadline",
+        "sequence",
+        "enqueued_at",
+        "bypassed",
+    )
+
+    def __init__(self, process_id, request, future, priority=0, deadline=None):
+        self.process_id = process_id
+        self.request = request
+        self.future = future
+        self.granted = False
+        self.retired = False
+        self.priority = priority
+        self.deadline = deadline
+        self.sequence = None
+        self.enqueued_at = None
+        self.bypassed = 0
+
+    def notify(self):
+        # Выдача может произойти в любом потоке, поэтому результат передается через цикл событий.
+        self.future.get_loop().call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(self.granted)
+
+
+class AsyncDeadlockPreventerMonitor:
+    """
+    Асинхронный фронтенд монитора для корутин.
+
+    Матрицы, проверка безопасности и очередь ожидания общие с обычным
+    DeadlockPreventerMonitor (атрибут monitor), поэтому корутины и потоки могут
+    работать с одним монитором одновременно. Ожидающие запросы корутин хранятся
+    как future, а не как заблокированные потоки. Блокировка монитора удерживается
+    только на время проверки и никогда - во время ожидания.
+    """
+
+    def __init__(self, available_resources, num_processes, matrix_logger=None, monitor=None, **options):
+        self.monitor = monitor or DeadlockPreventerMonitor(
+            available_resources, num_processes, matrix_logger=matrix_logger, **options
+        )
+
+    @property
+    def num_processes(self):
+        return self.monitor.num_processes
+
+    @property
+    def num_resources(self):
+        return self.monitor.num_resources
+
+    @property
+    def available(self):
+        return self.monitor.available
+
+    async def set_max_claim(self, process_id, max_needs):
+        self.monitor.set_max_claim(process_id, max_needs)
+
+    async def register_process(self, max_needs=None):
+        return self.monitor.register_process(max_needs)
+
+    async def unregister_process(self, process_id):
+        self.monitor.unregister_process(process_id)
+
+    async def request_resources(self, process_id, request, timeout=None, priority=0):
+        """
+        Запрашивает ресурсы; отложенный запрос ждет выдачи, не блокируя цикл событий.
+
+        Через timeout секунд невыданный запрос снимается с очереди и возвращается False.
+        """
+        monitor = self.monitor
+        request = np.array(request, dtype=int)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with monitor.lock:
+            logger.request(process_id, request)
+            if not monitor._validate_request(process_id, request):
+                return False
+            future = asyncio.get_running_loop().create_future()
+            waiter = _FutureWaiter(process_id, request, future, priority, deadline)
+            if monitor._admit_or_enqueue(waiter):
+                return True
+
+        try:
+            if timeout is None:
+                return await waiter.future
+            return await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            with monitor.lock:
+                # Выдача могла успеть до отмены future.
+                if waiter.granted:
+                    return True
+                if not waiter.retired:
+                    monitor._expire_waiter(waiter)
+            return False
+        except asyncio.CancelledError:
+            with monitor.lock:
+                monitor._cancel_waiter(waiter)
+            raise
+
+    async def release_resources(self, process_id, release):
+        self.monitor.release_resources(process_id, release)
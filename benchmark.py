@@ -1,11 +1,18 @@
+import argparse
+import json
+import sys
 import threading
 import time
 
-import matplotlib.pyplot as plt
 import numpy as np
 
 # Импортируем ваш основной класс
 from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from derived_need_monitor import DerivedNeedMonitor
+from logger import LEVEL_OFF, logger
+from safety import SAFETY_ALGORITHMS
+from simulation import simulate
+from trace_replay import Trace, replay_fast, replay_timed
 
 
 # ==============================================================================
@@ -23,9 +30,13 @@ class DummyLogger:
 # ==============================================================================
 
 
-def generate_random_state(num_processes, total_resources):
+def generate_random_state(
+    num_processes, total_resources, safety_algorithm="vectorized", monitor_class=DeadlockPreventerMonitor, **options
+):
     """Генерирует случайное состояние системы для одного теста."""
-    monitor = DeadlockPreventerMonitor(total_resources, num_processes, matrix_logger=DummyLogger())
+    monitor = monitor_class(
+        total_resources, num_processes, matrix_logger=DummyLogger(), safety_algorithm=safety_algorithm, **options
+    )
     max_claim = np.random.randint(
         1, np.array(total_resources, dtype=int) + 1, size=(num_processes, len(total_resources))
     )
@@ -34,17 +45,15 @@ def generate_random_state(num_processes, total_resources):
 
     for i in range(num_processes):
         if np.random.rand() > 0.5:
-            request = np.floor_divide(monitor.need[i], 2)
+            request = np.floor_divide(monitor._need_row(i), 2)
             request = np.minimum(request, monitor.available)
-            monitor.available -= request
-            monitor.allocation[i] += request
-            monitor.need[i] -= request
+            monitor._allocate(i, request)
     return monitor
 
 
-def benchmark_overhead(monitor, iterations=1000):
-    """Измеряет среднее время выполнения _is_safe_state."""
-    total_time = 0
+def sample_safety_check(monitor, iterations=1000):
+    """Время каждого из iterations вызовов _is_safe_state после гипотетического выделения, в секундах."""
+    samples = []
     process_id_to_test = 0
     request_to_test = (
         np.floor_divide(monitor.need[process_id_to_test], 2)
@@ -60,13 +69,57 @@ def benchmark_overhead(monitor, iterations=1000):
         start_time = time.perf_counter()
         monitor._is_safe_state()
         end_time = time.perf_counter()
-        total_time += end_time - start_time
+        samples.append(end_time - start_time)
 
         monitor.available += request_to_test
         monitor.allocation[process_id_to_test] -= request_to_test
         monitor.need[process_id_to_test] += request_to_test
 
-    return total_time / iterations
+    return samples
+
+
+# Раскладки матриц для бенчмарка памяти: параметры generate_random_state.
+MEMORY_LAYOUTS = {
+    "int64": {"matrix_dtype": np.int64},
+    "compact": {},
+    "compact+derived": {"monitor_class": DerivedNeedMonitor},
+}
+
+
+def matrix_bytes(monitor):
+    return sum(getattr(monitor, name).nbytes for name in monitor._MATRICES)
+
+
+def benchmark_memory(num_processes, num_resources, total=100, iterations=20):
+    """
+    Память матриц и время полной проверки безопасности для каждой раскладки MEMORY_LAYOUTS.
+
+    Все раскладки получают одно и то же случайное состояние.
+    """
+    results = []
+    for layout, options in MEMORY_LAYOUTS.items():
+        np.random.seed(0)
+        monitor = generate_random_state(num_processes, [total] * num_resources, **options)
+        samples = []
+        for _ in range(iterations):
+            start_time = time.perf_counter()
+            monitor._is_safe_state()
+            samples.append(time.perf_counter() - start_time)
+        results.append(
+            {
+                "key": f"n={num_processes},m={num_resources},{layout}",
+                "layout": layout,
+                "dtype": str(monitor.allocation.dtype),
+                "matrix_bytes": matrix_bytes(monitor),
+                "metrics": summarize(samples),
+            }
+        )
+    return results
+
+
+def benchmark_overhead(monitor, iterations=1000):
+    """Измеряет среднее время выполнения _is_safe_state."""
+    return sum(sample_safety_check(monitor, iterations)) / iterations
 
 
 # ==============================================================================
@@ -85,15 +138,21 @@ class BenchmarkWorkerThread(threading.Thread):
         self.results_list = results_list
         self.successful_requests = 0
 
-    def run(self):
+    def _prepare(self):
         # Заявляем о максимальной потребности (например, половина всех ресурсов)
         max_claim = np.floor_divide(self.monitor.available, self.monitor.num_processes * 2)
+        if np.all(max_claim == 0):
+            max_claim[0] = 1
         self.monitor.set_max_claim(self.process_id, max_claim)
 
         # Простой, детерминированный запрос
         request = np.floor_divide(max_claim, 2)
         if np.all(request == 0):
             request[0] = 1  # хотя бы 1 ресурс
+        return request
+
+    def run(self):
+        request = self._prepare()
 
         # Цикл "запрос-освобождение" на максимальной скорости
         while not self.stop_event.is_set():
@@ -105,10 +164,12 @@ class BenchmarkWorkerThread(threading.Thread):
         self.results_list.append(self.successful_requests)
 
 
-def benchmark_throughput(num_processes, num_resources, duration=3):
+def benchmark_throughput(num_processes, num_resources, duration=3, combining=False):
     """Запускает полную симуляцию и измеряет кол-во операций в секунду."""
     total_resources = [100] * num_resources
-    monitor = DeadlockPreventerMonitor(total_resources, num_processes, matrix_logger=DummyLogger())
+    monitor = DeadlockPreventerMonitor(
+        total_resources, num_processes, matrix_logger=DummyLogger(), combining=combining
+    )
     stop_event = threading.Event()
     results = []
     threads = []
@@ -132,13 +193,173 @@ def benchmark_throughput(num_processes, num_resources, duration=3):
     return total_operations / duration
 
 
+class _TimingLock:
+    """
+    Обертка над блокировкой монитора для бенчмарка.
+
+    В каждом потоке копит время ожидания блокировки и время ее удержания,
+    чтобы задержку вызова можно было разделить на эти две части.
+    """
+
+    def __init__(self, lock):
+        self._lock = lock
+        self._local = threading.local()
+
+    def acquire(self, blocking=True, timeout=-1):
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        now = time.perf_counter()
+        local = self._local
+        local.wait = getattr(local, "wait", 0.0) + now - start
+        if acquired:
+            local.acquired_at = now
+        return acquired
+
+    def release(self):
+        local = self._local
+        local.hold = getattr(local, "hold", 0.0) + time.perf_counter() - local.acquired_at
+        self._lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def take(self):
+        """Возвращает и обнуляет накопленные в текущем потоке (ожидание, удержание)."""
+        local = self._local
+        result = (getattr(local, "wait", 0.0), getattr(local, "hold", 0.0))
+        local.wait = local.hold = 0.0
+        return result
+
+
+def instrument_monitor(monitor):
+    """Подменяет блокировку монитора на _TimingLock и замеряет каждый вызов _is_safe_state."""
+    timing_lock = _TimingLock(monitor.lock)
+    monitor.lock = timing_lock
+    monitor.condition = threading.Condition(timing_lock)
+
+    safety_samples = []
+    is_safe_state = monitor._is_safe_state
+
+    def timed_is_safe_state():
+        start = time.perf_counter()
+        result = is_safe_state()
+        safety_samples.append(time.perf_counter() - start)
+        return result
+
+    monitor._is_safe_state = timed_is_safe_state
+    return timing_lock, safety_samples
+
+
+class LatencyWorkerThread(BenchmarkWorkerThread):
+    """Тот же цикл, что у BenchmarkWorkerThread, но с замером каждого вызова."""
+
+    def __init__(self, process_id, monitor, stop_event, results_list, timing_lock):
+        super().__init__(process_id, monitor, stop_event, results_list)
+        self.timing_lock = timing_lock
+        # Для каждой операции - кортежи (полное время, ожидание блокировки, внутри блокировки).
+        self.samples = {"request": [], "release": []}
+
+    def _timed(self, operation, method, *args):
+        self.timing_lock.take()
+        start = time.perf_counter()
+        result = method(self.process_id, *args)
+        total = time.perf_counter() - start
+        self.samples[operation].append((total, *self.timing_lock.take()))
+        return result
+
+    def run(self):
+        request = self._prepare()
+        while not self.stop_event.is_set():
+            if self._timed("request", self.monitor.request_resources, request):
+                self.successful_requests += 1
+                self._timed("release", self.monitor.release_resources, request)
+        self.results_list.append(self.successful_requests)
+
+
+def summarize(samples):
+    """Перцентили p50/p99/p999 и среднее по выборке в секундах, результат в микросекундах."""
+    if len(samples) == 0:
+        return {"count": 0}
+    p50, p99, p999 = np.percentile(samples, [50, 99, 99.9]) * 1e6
+    return {
+        "count": len(samples),
+        "mean_us": float(np.mean(samples) * 1e6),
+        "p50_us": float(p50),
+        "p99_us": float(p99),
+        "p999_us": float(p999),
+    }
+
+
+def benchmark_latency(num_processes, num_resources, duration=3, combining=False):
+    """Пропускная способность и перцентили задержек request/release/_is_safe_state."""
+    monitor = DeadlockPreventerMonitor(
+        [100] * num_resources, num_processes, matrix_logger=DummyLogger(), combining=combining
+    )
+    timing_lock, safety_samples = instrument_monitor(monitor)
+    stop_event = threading.Event()
+    results = []
+    threads = [LatencyWorkerThread(i, monitor, stop_event, results, timing_lock) for i in range(num_processes)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop_event.set()
+    for thread in threads:
+        thread.join()
+
+    metrics = {"ops_per_sec": sum(results) / duration, "safety_check": summarize(safety_samples)}
+    for operation in ("request", "release"):
+        samples = np.array([sample for thread in threads for sample in thread.samples[operation]]).reshape(-1, 3)
+        metrics[operation] = {
+            "total": summarize(samples[:, 0]),
+            "lock_wait": summarize(samples[:, 1]),
+            "in_lock": summarize(samples[:, 2]),
+        }
+    return metrics
+
+
+def benchmark_replay(trace_path, timed=False, speed=1.0, **monitor_options):
+    """Прогоняет записанную трассу (trace_replay.TraceRecorder) на свежем мониторе."""
+    trace = Trace.load(trace_path)
+    monitor = trace.build_monitor(matrix_logger=DummyLogger(), **monitor_options)
+    if timed:
+        return replay_timed(trace, monitor, speed=speed)
+    return replay_fast(trace, monitor)
+
+
+def benchmark_simulation(total_resources, processes, arrival_rate=0.0, duration=3600.0, seed=1):
+    """
+    Прогоняет симуляцию на виртуальных часах (simulation.simulate) и возвращает ее сводку.
+
+    Время симуляции должно расти с числом процессов линейно: освобождение не
+    просматривает всю очередь ожидания. Для сравнения с базовыми результатами
+    в metrics попадает только время работы.
+    """
+    summary = simulate(total_resources, processes=processes, arrival_rate=arrival_rate, duration=duration, seed=seed).summary()
+    wall_seconds = summary.pop("wall_seconds")
+    return {
+        "key": f"simulate_n{processes}_rate{arrival_rate:g}",
+        "processes": processes,
+        "summary": summary,
+        "metrics": {"wall_seconds": wall_seconds},
+    }
+
+
 # ==============================================================================
 # 4. ФУНКЦИИ ДЛЯ ЗАПУСКА ТЕСТОВ И ПОСТРОЕНИЯ ГРАФИКОВ
 # ==============================================================================
 
 
-def plot_results(data, title, xlabel, ylabel, filename):
-    """Строит и сохраняет график."""
+def plot_results(data, title, xlabel, ylabel, filename, show=False):
+    """Строит и сохраняет график. matplotlib нужен только здесь и импортируется лениво."""
+    import matplotlib
+
+    if not show:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
     x_vals = [item[0] for item in data]
     y_vals = [item[1] for item in data]
 
@@ -151,48 +372,243 @@ def plot_results(data, title, xlabel, ylabel, filename):
     plt.xticks(x_vals)
     plt.savefig(filename)
     print(f"График сохранен в файл: {filename}")
-    plt.show()
-
-
-def run_all_benchmarks():
-    """Главная функция для запуска всех бенчмарков."""
+    if show:
+        plt.show()
+    plt.close()
+
+
+def run_all_benchmarks(
+    processes=(5, 10, 20, 50, 100, 150, 300),
+    num_resources=5,
+    threads=(1, 2, 4, 8, 12, 16, 24, 32),
+    duration=3,
+    iterations=1000,
+    algorithms=tuple(SAFETY_ALGORITHMS),
+    combining_modes=(False, True),
+    plot=False,
+):
+    """Главная функция для запуска всех бенчмарков. Возвращает результаты в виде словаря для JSON."""
+    # Консольный вывод внутри критической секции исказил бы измерения.
+    logger.set_level(LEVEL_OFF)
+    results = {
+        "config": {
+            "processes": list(processes),
+            "resources": num_resources,
+            "threads": list(threads),
+            "duration": duration,
+            "iterations": iterations,
+        },
+        "safety_check": [],
+        "latency": [],
+    }
 
     # --- Микро-бенчмарк: Зависимость от N и M ---
     print("--- 1. Запуск микро-бенчмарка (накладные расходы) ---")
 
-    processes_to_test = [5, 10, 20, 50, 100, 150]
-    times_vs_processes = []
-    for n in processes_to_test:
-        print(f"  Тестирование overhead с {n} процессами...")
-        m = generate_random_state(n, [100] * 5)
-        avg_time = benchmark_overhead(m) * 1e6  # в микросекундах
-        times_vs_processes.append((n, avg_time))
-    plot_results(
-        times_vs_processes,
-        "Зависимость времени проверки от числа процессов (N)",
-        "Количество процессов",
-        "Среднее время, мкс",
-        "overhead_vs_processes.png",
-    )
-
-    # --- Макро-бенчмарк: Пропускная способность ---
+    for algorithm in algorithms:
+        for n in processes:
+            print(f"  Тестирование overhead ({algorithm}) с {n} процессами...")
+            m = generate_random_state(n, [100] * num_resources, safety_algorithm=algorithm)
+            results["safety_check"].append(
+                {
+                    "key": f"n={n},m={num_resources},{algorithm}",
+                    "processes": n,
+                    "algorithm": algorithm,
+                    "metrics": summarize(sample_safety_check(m, iterations)),
+                }
+            )
+
+    # --- Макро-бенчмарк: Пропускная способность и задержки ---
     print("\n--- 2. Запуск макро-бенчмарка (пропускная способность) ---")
 
-    processes_to_test_throughput = [1, 2, 4, 8, 12, 16, 24, 32]
-    throughput_results = []
-    for n in processes_to_test_throughput:
-        print(f"  Тестирование throughput с {n} потоками...")
-        ops_per_sec = benchmark_throughput(num_processes=n, num_resources=5)
-        throughput_results.append((n, ops_per_sec))
-
-    plot_results(
-        throughput_results,
-        "Пропускная способность системы",
-        "Количество потоков-воркеров",
-        "Операций (запрос+освобождение)/сек",
-        "throughput_vs_threads.png",
+    for combining in combining_modes:
+        mode = "combining" if combining else "lock"
+        for n in threads:
+            print(f"  Тестирование throughput ({mode}) с {n} потоками...")
+            results["latency"].append(
+                {
+                    "key": f"threads={n},m={num_resources},{mode}",
+                    "threads": n,
+                    "mode": mode,
+                    "metrics": benchmark_latency(n, num_resources, duration=duration, combining=combining),
+                }
+            )
+
+    if plot:
+        for algorithm in algorithms:
+            plot_results(
+                [(e["processes"], e["metrics"]["mean_us"]) for e in results["safety_check"] if e["algorithm"] == algorithm],
+                f"Зависимость времени проверки от числа процессов (N), {algorithm}",
+                "Количество процессов",
+                "Среднее время, мкс",
+                f"overhead_vs_processes_{algorithm}.png",
+            )
+        for combining in combining_modes:
+            mode = "combining" if combining else "lock"
+            plot_results(
+                [(e["threads"], e["metrics"]["ops_per_sec"]) for e in results["latency"] if e["mode"] == mode],
+                f"Пропускная способность системы, {mode}",
+                "Количество потоков-воркеров",
+                "Операций (запрос+освобождение)/сек",
+                f"throughput_vs_threads_{mode}.png",
+            )
+    return results
+
+
+def _flatten(metrics, prefix=""):
+    flat = {}
+    for name, value in metrics.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{name}."))
+        elif name != "count":
+            flat[f"{prefix}{name}"] = value
+    return flat
+
+
+def flatten_results(results):
+    """{'раздел/ключ/метрика': значение} для всех числовых метрик результатов."""
+    flat = {}
+    for section in ("safety_check", "latency", "memory", "simulation"):
+        for entry in results.get(section, []):
+            for name, value in _flatten(entry["metrics"]).items():
+                flat[f"{section}/{entry['key']}/{name}"] = value
+    return flat
+
+
+def compare_results(baseline, current, tolerance=0.2):
+    """
+    Сравнивает результаты с базовыми. Возвращает список регрессий (метрика, было, стало, изменение).
+
+    Для ops_per_sec регрессия - падение больше чем на tolerance, для задержек - рост.
+    """
+    regressions = []
+    base_flat, current_flat = flatten_results(baseline), flatten_results(current)
+    for name, base_value in sorted(base_flat.items()):
+        if name not in current_flat or not base_value:
+            continue
+        change = (current_flat[name] - base_value) / base_value
+        higher_is_better = name.endswith("ops_per_sec")
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append((name, base_value, current_flat[name], change))
+    return regressions
+
+
+def report_regressions(regressions):
+    if not regressions:
+        print("Регрессий не обнаружено.")
+        return
+    print(f"Обнаружено регрессий: {len(regressions)}")
+    for name, base_value, value, change in regressions:
+        print(f"  {name}: {base_value:.2f} -> {value:.2f} ({change:+.0%})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless monitor benchmarks with JSON results and regression checks.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks (default).")
+    run_parser.add_argument("-p", "--processes", type=int, nargs="+", default=[5, 10, 20, 50, 100, 150, 300],
+                            help="Process counts for the safety-check micro-benchmark.")
+    run_parser.add_argument("-m", "--resources", type=int, default=5, help="Number of resource types.")
+    run_parser.add_argument("-t", "--threads", type=int, nargs="+", default=[1, 2, 4, 8, 12, 16, 24, 32],
+                            help="Thread counts for the throughput/latency benchmark.")
+    run_parser.add_argument("-d", "--duration", type=float, default=3, help="Seconds per throughput run.")
+    run_parser.add_argument("-i", "--iterations", type=int, default=1000, help="Safety checks per micro-benchmark.")
+    run_parser.add_argument("-a", "--algorithms", nargs="+", choices=sorted(SAFETY_ALGORITHMS),
+                            default=list(SAFETY_ALGORITHMS), help="Safety-check engines to measure.")
+    run_parser.add_argument("--modes", nargs="+", choices=["lock", "combining"], default=["lock", "combining"],
+                            help="Admission modes for the throughput benchmark.")
+    run_parser.add_argument("-o", "--output", help="Write results as JSON to this file.")
+    run_parser.add_argument("-b", "--baseline", help="Compare against a saved JSON baseline; exit 1 on regressions.")
+    run_parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative change (default 0.2).")
+    run_parser.add_argument("--plot", action="store_true", help="Save PNG plots (requires matplotlib).")
+
+    memory_parser = subparsers.add_parser("memory", help="Matrix memory and safety-check time per storage layout.")
+    memory_parser.add_argument("-p", "--processes", type=int, nargs="+", default=[1000, 10000, 50000],
+                               help="Process counts.")
+    memory_parser.add_argument("-m", "--resources", type=int, nargs="+", default=[10, 100], help="Resource counts.")
+    memory_parser.add_argument("--total", type=int, default=100, help="Units of each resource (chooses the dtype).")
+    memory_parser.add_argument("-i", "--iterations", type=int, default=20, help="Safety checks per layout.")
+    memory_parser.add_argument("-o", "--output", help="Write results as JSON to this file.")
+
+    simulate_parser = subparsers.add_parser("simulate", help="Wall time of virtual-clock simulations by process count.")
+    simulate_parser.add_argument("-p", "--processes", type=int, nargs="+", default=[1000, 10000],
+                                 help="Processes started at time 0.")
+    simulate_parser.add_argument("-r", "--resources", type=int, nargs="+", default=[50, 50, 50],
+                                 help="Total units per resource.")
+    simulate_parser.add_argument("-a", "--arrival-rate", type=float, default=0.0,
+                                 help="Additional Poisson arrivals per virtual second.")
+    simulate_parser.add_argument("-d", "--duration", type=float, default=3600.0, help="Arrival window, virtual seconds.")
+    simulate_parser.add_argument("--seed", type=int, default=1, help="Random seed.")
+    simulate_parser.add_argument("-o", "--output", help="Write results as JSON to this file.")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two saved JSON results.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative change (default 0.2).")
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in ("run", "memory", "simulate", "compare", "-h", "--help"):
+        argv.insert(0, "run")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.baseline, encoding="utf-8") as baseline_file, open(args.current, encoding="utf-8") as current_file:
+            regressions = compare_results(json.load(baseline_file), json.load(current_file), args.tolerance)
+        report_regressions(regressions)
+        return 1 if regressions else 0
+
+    if args.command == "memory":
+        logger.set_level(LEVEL_OFF)
+        results = {"memory": []}
+        for n in args.processes:
+            for m in args.resources:
+                for entry in benchmark_memory(n, m, total=args.total, iterations=args.iterations):
+                    results["memory"].append(entry)
+                    print(
+                        f"  {entry['key']:<32} {entry['dtype']:<6} {entry['matrix_bytes'] / 2**20:9.2f} MiB"
+                        f"  p50 {entry['metrics']['p50_us']:10.1f} us"
+                    )
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output_file:
+                json.dump(results, output_file, indent=2)
+        return 0
+
+    if args.command == "simulate":
+        results = {"simulation": []}
+        for n in args.processes:
+            entry = benchmark_simulation(args.resources, n, args.arrival_rate, args.duration, args.seed)
+            results["simulation"].append(entry)
+            print(
+                f"  {entry['key']:<28} {entry['metrics']['wall_seconds']:8.2f} s wall"
+                f"  {entry['summary']['virtual_seconds']:12.0f} s virtual  {entry['summary']['requests']:8d} requests"
+            )
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output_file:
+                json.dump(results, output_file, indent=2)
+        return 0
+
+    results = run_all_benchmarks(
+        processes=args.processes,
+        num_resources=args.resources,
+        threads=args.threads,
+        duration=args.duration,
+        iterations=args.iterations,
+        algorithms=args.algorithms,
+        combining_modes=[mode == "combining" for mode in args.modes],
+        plot=args.plot,
     )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+        print(f"Результаты сохранены в файл: {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare_results(json.load(baseline_file), results, args.tolerance)
+        report_regressions(regressions)
+        return 1 if regressions else 0
+    return 0
 
 
 if __name__ == "__main__":
-    run_all_benchmarks()
+    sys.exit(main())
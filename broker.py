@@ -0,0 +1,310 @@
+import queue
+import socket
+import socketserver
+import struct
+import threading
+
+import numpy as np
+
+
+# Кадр запроса: операция, номер, процесс, длина вектора, затем вектор int32.
+# Кадр ответа: номер, статус, длина вектора, затем вектор int32.
+REQUEST_HEADER = struct.Struct("!BIiH")
+RESPONSE_HEADER = struct.Struct("!IBH")
+
+OP_INFO = 0
+OP_SET_MAX_CLAIM = 1
+OP_REQUEST = 2
+OP_REQUEST_BLOCKING = 3
+OP_RELEASE = 4
+OP_MAX_SAFE_REQUEST = 5
+OP_ACQUIRE_UP_TO = 6
+
+STATUS_OK = 0
+STATUS_DENIED = 1
+STATUS_ERROR = 2
+
+
+class BrokerError(Exception):
+    """Брокер не смог выполнить операцию."""
+
+
+def parse_address(address):
+    """'unix:/path/to.sock' или 'host:port' -> (семейство сокета, адрес)."""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:") :]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def _pack_vector(values):
+    values = [int(v) for v in values]
+    return struct.pack(f"!{len(values)}i", *values)
+
+
+def _recv_exact(reader, size):
+    data = reader.read(size)
+    if len(data) < size:
+        raise ConnectionError("Соединение закрыто")
+    return data
+
+
+def encode_request(op, seq, process_id=0, vector=()):
+    return REQUEST_HEADER.pack(op, seq, process_id, len(vector)) + _pack_vector(vector)
+
+
+def encode_response(seq, status, vector=()):
+    return RESPONSE_HEADER.pack(seq, status, len(vector)) + _pack_vector(vector)
+
+
+def read_frame(reader, header):
+    *fields, count = header.unpack(_recv_exact(reader, header.size))
+    vector = struct.unpack(f"!{count}i", _recv_exact(reader, 4 * count)) if count else ()
+    return (*fields, vector)
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        if self.connection.family != socket.AF_UNIX:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        monitor = self.server.monitor
+        while True:
+            try:
+                op, seq, process_id, vector = read_frame(self.rfile, REQUEST_HEADER)
+            except ConnectionError:
+                return
+            status, payload = self.server.execute(monitor, op, process_id, vector)
+            self.wfile.write(encode_response(seq, status, payload))
+
+
+class _BrokerServerMixin:
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def execute(self, monitor, op, process_id, vector):
+        if op == OP_INFO:
+            return STATUS_OK, (monitor.num_processes, monitor.num_resources, *monitor.available)
+        if not 0 <= process_id < monitor.num_processes:
+            return STATUS_ERROR, ()
+        if op == OP_MAX_SAFE_REQUEST:
+            return STATUS_OK, monitor.max_safe_request(process_id)
+        if len(vector) != monitor.num_resources or min(vector) < 0:
+            return STATUS_ERROR, ()
+        if op == OP_SET_MAX_CLAIM:
+            monitor.set_max_claim(process_id, vector)
+            return STATUS_OK, ()
+        if op == OP_REQUEST:
+            # Сервер не должен ждать освобождения внутри соединения.
+            return (STATUS_OK if monitor.try_request(process_id, vector) else STATUS_DENIED), ()
+        if op == OP_REQUEST_BLOCKING:
+            return (STATUS_OK if monitor.request_resources(process_id, vector, blocking=True) else STATUS_DENIED), ()
+        if op == OP_RELEASE:
+            monitor.release_resources(process_id, vector)
+            return STATUS_OK, ()
+        if op == OP_ACQUIRE_UP_TO:
+            grant = monitor.acquire_up_to(process_id, vector)
+            return (STATUS_OK if np.any(grant) else STATUS_DENIED), grant
+        return STATUS_ERROR, ()
+
+
+class BrokerTCPServer(_BrokerServerMixin, socketserver.ThreadingTCPServer):
+    pass
+
+
+class BrokerUnixServer(_BrokerServerMixin, socketserver.ThreadingUnixStreamServer):
+    pass
+
+
+def create_server(monitor, address):
+    """Создает сервер-брокер для монитора. Запуск - serve_forever()."""
+    family, bind_address = parse_address(address)
+    server_class = BrokerUnixServer if family == socket.AF_UNIX else BrokerTCPServer
+    server = server_class(bind_address, _BrokerHandler)
+    server.monitor = monitor
+    return server
+
+
+class BrokerClient:
+    """Одно соединение с брокером. Не потокобезопасно - для потоков есть BrokerClientPool."""
+
+    def __init__(self, address):
+        family, connect_address = parse_address(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(connect_address)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        self._seq = 0
+
+    def _send(self, frames):
+        self.sock.sendall(b"".join(frames))
+
+    def _frame(self, op, process_id=0, vector=()):
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        return encode_request(op, self._seq, process_id, vector)
+
+    def _read_response(self):
+        seq, status, payload = read_frame(self.reader, RESPONSE_HEADER)
+        if status == STATUS_ERROR:
+            raise BrokerError(f"Брокер отклонил операцию #{seq}")
+        return status, payload
+
+    def call(self, op, process_id=0, vector=()):
+        self._send([self._frame(op, process_id, vector)])
+        return self._read_response()
+
+    def info(self):
+        _, payload = self.call(OP_INFO)
+        return payload[0], payload[1], np.array(payload[2:], dtype=int)
+
+    def set_max_claim(self, process_id, max_needs):
+        self.call(OP_SET_MAX_CLAIM, process_id, max_needs)
+
+    def request_resources(self, process_id, request, blocking=False):
+        op = OP_REQUEST_BLOCKING if blocking else OP_REQUEST
+        return self.call(op, process_id, request)[0] == STATUS_OK
+
+    def try_request(self, process_id, request):
+        return self.request_resources(process_id, request)
+
+    def release_resources(self, process_id, release):
+        self.call(OP_RELEASE, process_id, release)
+
+    def max_safe_request(self, process_id):
+        return np.array(self.call(OP_MAX_SAFE_REQUEST, process_id)[1], dtype=int)
+
+    def acquire_up_to(self, process_id, request):
+        return np.array(self.call(OP_ACQUIRE_UP_TO, process_id, request)[1], dtype=int)
+
+    def pipeline(self):
+        return Pipeline(self)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class Pipeline:
+    """Копит операции и отправляет их одной записью; ответы читаются по порядку."""
+
+    def __init__(self, client):
+        self.client = client
+        self.frames = []
+        self.ops = []
+
+    def request_resources(self, process_id, request, blocking=False):
+        if blocking:
+            # Сервер выполняет кадры соединения по порядку: ожидание задержало бы все следующие.
+            raise ValueError("Блокирующий запрос нельзя отправить в конвейере")
+        self.frames.append(self.client._frame(OP_REQUEST, process_id, request))
+        self.ops.append(OP_REQUEST)
+        return self
+
+    def release_resources(self, process_id, release):
+        self.frames.append(self.client._frame(OP_RELEASE, process_id, release))
+        self.ops.append(OP_RELEASE)
+        return self
+
+    def execute(self):
+        """Возвращает список результатов: True/False для запросов, None для освобождений."""
+        self.client._send(self.frames)
+        # Ответы дочитываются до конца даже при ошибке, иначе соединение рассинхронизируется.
+        responses = [read_frame(self.client.reader, RESPONSE_HEADER) for _ in self.ops]
+        ops, self.frames, self.ops = self.ops, [], []
+        failed = [seq for seq, status, _ in responses if status == STATUS_ERROR]
+        if failed:
+            raise BrokerError(f"Брокер отклонил операции {failed}")
+        return [None if op == OP_RELEASE else status == STATUS_OK for op, (_, status, _) in zip(ops, responses)]
+
+
+class BrokerClientPool:
+    """
+    Потокобезопасный пул соединений с тем же интерфейсом, что у монитора.
+
+    Каждый вызов берет свободное соединение из пула, поэтому объект можно
+    передавать воркерам вместо DeadlockPreventerMonitor. Блокирующий запрос
+    идет через отдельное соединение вне пула: ожидая выдачи, он не должен
+    занимать соединение, через которое другие процессы освобождают ресурсы.
+    """
+
+    def __init__(self, address, size=8):
+        self.address = address
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.num_processes, self.num_resources, _ = self._with_client(BrokerClient.info)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    return BrokerClient(self.address)
+            return self._idle.get()
+
+    def _with_client(self, method, *args):
+        client = self._acquire()
+        try:
+            result = method(client, *args)
+        except OSError:
+            # Оборванное соединение в пул не возвращается.
+            client.close()
+            with self._lock:
+                self._created -= 1
+            raise
+        except BrokerError:
+            self._idle.put(client)
+            raise
+        self._idle.put(client)
+        return result
+
+    @property
+    def available(self):
+        return self._with_client(BrokerClient.info)[2]
+
+    def set_max_claim(self, process_id, max_needs):
+        self._with_client(BrokerClient.set_max_claim, process_id, max_needs)
+
+    def request_resources(self, process_id, request, blocking=False):
+        if not blocking:
+            return self._with_client(BrokerClient.request_resources, process_id, request)
+        client = BrokerClient(self.address)
+        try:
+            return client.request_resources(process_id, request, blocking=True)
+        finally:
+            client.close()
+
+    def try_request(self, process_id, request):
+        return self._with_client(BrokerClient.request_resources, process_id, request)
+
+    def release_resources(self, process_id, release):
+        self._with_client(BrokerClient.release_resources, process_id, release)
+
+    def max_safe_request(self, process_id):
+        return self._with_client(BrokerClient.max_safe_request, process_id)
+
+    def acquire_up_to(self, process_id, request):
+        return self._with_client(BrokerClient.acquire_up_to, process_id, request)
+
+    def run_pipeline(self, build):
+        """Выполняет конвейер на одном соединении: build(pipeline) добавляет операции."""
+
+        def execute(client):
+            pipeline = client.pipeline()
+            build(pipeline)
+            return pipeline.execute()
+
+        return self._with_client(execute)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
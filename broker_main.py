@@ -0,0 +1,155 @@
+import argparse
+import os
+import signal
+import threading
+import time
+
+import numpy as np
+
+from broker import BrokerClient, BrokerClientPool, create_server
+from checkpoint import restore_checkpoint, save_checkpoint
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from logger import logger
+
+
+def checkpoint_periodically(monitor, path, interval, stop_event):
+    while not stop_event.wait(interval):
+        save_checkpoint(monitor, path)
+
+
+def serve(args):
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        monitor = restore_checkpoint(args.checkpoint)
+    elif args.processes is None or args.resources is None:
+        raise SystemExit("--processes and --resources are required without an existing --checkpoint")
+    else:
+        monitor = DeadlockPreventerMonitor(args.resources, args.processes)
+    server = create_server(monitor, args.address)
+    stop_event = threading.Event()
+    if args.checkpoint and args.checkpoint_interval:
+        threading.Thread(
+            target=checkpoint_periodically,
+            args=(monitor, args.checkpoint, args.checkpoint_interval, stop_event),
+            daemon=True,
+        ).start()
+    # Перезапуск службы приходит сигналом SIGTERM: завершаемся как по Ctrl+C и сохраняем контрольную точку.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    logger.system("Брокер слушает %s", args.address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        server.server_close()
+        if args.checkpoint:
+            save_checkpoint(monitor, args.checkpoint)
+
+
+def measure_latency(address, iterations):
+    """Последовательные запрос+освобождение одного процесса: время полного цикла."""
+    client = BrokerClient(address)
+    try:
+        _, num_resources, _ = client.info()
+        request = np.zeros(num_resources, dtype=int)
+        request[0] = 1
+        client.set_max_claim(0, request)
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            client.request_resources(0, request)
+            client.release_resources(0, request)
+            samples.append(time.perf_counter() - start)
+        return samples
+    finally:
+        client.close()
+
+
+def measure_pipelined(address, iterations, depth):
+    """Те же операции, отправленные конвейером по depth пар за запись."""
+    client = BrokerClient(address)
+    try:
+        _, num_resources, _ = client.info()
+        request = np.zeros(num_resources, dtype=int)
+        request[0] = 1
+        client.set_max_claim(0, request)
+        start = time.perf_counter()
+        for _ in range(iterations // depth):
+            pipeline = client.pipeline()
+            for _ in range(depth):
+                pipeline.request_resources(0, request).release_resources(0, request)
+            pipeline.execute()
+        return (iterations // depth) * depth / (time.perf_counter() - start)
+    finally:
+        client.close()
+
+
+def measure_throughput(address, threads, duration):
+    """Цикл BenchmarkWorkerThread, но через сокет и пул соединений."""
+    from benchmark import BenchmarkWorkerThread
+
+    pool = BrokerClientPool(address, size=threads)
+    stop_event = threading.Event()
+    results = []
+    workers = [BenchmarkWorkerThread(i, pool, stop_event, results) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop_event.set()
+    for worker in workers:
+        worker.join()
+    pool.close()
+    return sum(results) / duration
+
+
+def bench(args):
+    server = None
+    address = args.address
+    if args.local:
+        monitor = DeadlockPreventerMonitor([100] * len(args.resources), max(args.threads, 1))
+        server = create_server(monitor, "127.0.0.1:0")
+        address = "{}:{}".format(*server.server_address)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        samples = sorted(measure_latency(address, args.iterations))
+        print(f"Задержка цикла запрос+освобождение: p50 {samples[len(samples) // 2] * 1e6:.1f} мкс, "
+              f"p99 {samples[int(len(samples) * 0.99)] * 1e6:.1f} мкс")
+        print(f"Конвейер (глубина {args.depth}): {measure_pipelined(address, args.iterations, args.depth):.0f} пар/сек")
+        print(f"Пропускная способность ({args.threads} потоков): "
+              f"{measure_throughput(address, args.threads, args.duration):.0f} операций/сек")
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Standalone resource broker around DeadlockPreventerMonitor and its load generator.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the broker.")
+    serve_parser.add_argument("-a", "--address", default="127.0.0.1:7700", help="host:port or unix:/path/to.sock")
+    serve_parser.add_argument("-p", "--processes", type=int, help="Number of process slots.")
+    serve_parser.add_argument("-r", "--resources", type=int, nargs="+", help="Total units per resource.")
+    serve_parser.add_argument("--checkpoint", help="Restore state from this file if it exists and save it on shutdown.")
+    serve_parser.add_argument("--checkpoint-interval", type=float, default=0,
+                              help="Also save the checkpoint every N seconds (0 - only on shutdown).")
+    serve_parser.set_defaults(handler=serve)
+
+    bench_parser = subparsers.add_parser("bench", help="Measure round-trip latency and ops/sec against a broker.")
+    bench_parser.add_argument("-a", "--address", default="127.0.0.1:7700", help="host:port or unix:/path/to.sock")
+    bench_parser.add_argument("--local", action="store_true", help="Start a broker in this process on a free port.")
+    bench_parser.add_argument("-r", "--resources", type=int, nargs="+", default=[100] * 5,
+                              help="Resources of the local broker (only the count is used).")
+    bench_parser.add_argument("-t", "--threads", type=int, default=8, help="Worker threads for the throughput run.")
+    bench_parser.add_argument("-d", "--duration", type=float, default=3, help="Throughput run duration, seconds.")
+    bench_parser.add_argument("-n", "--iterations", type=int, default=2000, help="Round trips for latency runs.")
+    bench_parser.add_argument("--depth", type=int, default=32, help="Pipeline depth.")
+    bench_parser.set_defaults(handler=bench)
+
+    args = parser.parse_args()
+    args.handler(args)
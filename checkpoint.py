@@ -0,0 +1,154 @@
+import argparse
+import os
+import struct
+
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from derived_need_monitor import DerivedNeedMonitor
+from logger import logger
+from packed_monitor import PackedMonitor
+from sparse_monitor import SparseMonitor
+
+MAGIC = b"DPMC"
+VERSION = 1
+# magic, версия, хранилище (номер в STORAGE_CLASSES), тип матриц (dtype.str), число ресурсов, число процессов.
+HEADER = struct.Struct("<4sHH4sIQ")
+HEADER_SIZE = 64
+# Массивы выравниваются по строке кеша: np.memmap отдает их без копирования.
+ALIGNMENT = 64
+# Хранилище записывается в файл, чтобы restore_checkpoint по умолчанию создал монитор того же класса.
+STORAGE_CLASSES = (DeadlockPreventerMonitor, DerivedNeedMonitor, SparseMonitor, PackedMonitor)
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def layout(num_resources, num_processes, dtype):
+    """Смещения available, live, max_claim, allocation и полный размер файла."""
+    matrix_bytes = num_processes * num_resources * dtype.itemsize
+    available = HEADER_SIZE
+    live = _aligned(available + 8 * num_resources)
+    max_claim = _aligned(live + num_processes)
+    allocation = _aligned(max_claim + matrix_bytes)
+    return available, live, max_claim, allocation, allocation + matrix_bytes
+
+
+def save_checkpoint(monitor, path):
+    """
+    Записывает полное состояние монитора: available, max_claim, allocation и
+    регистрации процессов (число слотов и живые слоты).
+
+    Под блокировкой состояние только копируется, запись идет без нее. Файл
+    пишется рядом и подменяется через os.replace: читатель видит старую или
+    новую контрольную точку целиком, а отображенный в память старый файл не
+    обрезается.
+    """
+    storage = STORAGE_CLASSES.index(type(monitor)) if type(monitor) in STORAGE_CLASSES else 0
+    with monitor.lock:
+        num_processes = monitor.num_processes
+        available = monitor.available.astype("<i8")
+        live = monitor._live[:num_processes].astype(np.uint8)
+        max_claim = np.array(monitor.max_claim[:num_processes])
+        allocation = np.array(monitor.allocation[:num_processes])
+
+    dtype = max_claim.dtype.newbyteorder("<")
+    arrays = (available, live, max_claim.astype(dtype, copy=False), allocation.astype(dtype, copy=False))
+    offsets = layout(monitor.num_resources, num_processes, dtype)
+    header = HEADER.pack(MAGIC, VERSION, storage, dtype.str.encode(), monitor.num_resources, num_processes)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file_handle:
+        file_handle.write(header.ljust(HEADER_SIZE, b"\0"))
+        for offset, array in zip(offsets, arrays):
+            file_handle.write(b"\0" * (offset - file_handle.tell()))
+            file_handle.write(array.tobytes())
+        file_handle.flush()
+        os.fsync(file_handle.fileno())
+    os.replace(temporary, path)
+
+
+def read_checkpoint(path, mmap=True):
+    """
+    Читает контрольную точку: (класс хранилища, available, live, max_claim, allocation).
+
+    При mmap=True матрицы - отображение файла с копированием при записи:
+    страницы читаются по мере обращения, а изменения монитора в файл не попадают.
+    """
+    with open(path, "rb") as file_handle:
+        header = file_handle.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path}: не контрольная точка монитора")
+    magic, version, storage, dtype, num_resources, num_processes = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or storage >= len(STORAGE_CLASSES):
+        raise ValueError(f"{path}: не контрольная точка монитора")
+    dtype = np.dtype(dtype.rstrip(b"\0").decode())
+    offsets = layout(num_resources, num_processes, dtype)
+    if os.path.getsize(path) < offsets[-1]:
+        raise ValueError(f"{path}: контрольная точка обрезана")
+
+    def array(offset, array_dtype, shape):
+        if not mmap or not np.prod(shape):
+            count = int(np.prod(shape))
+            return np.fromfile(path, dtype=array_dtype, count=count, offset=offset).reshape(shape)
+        # np.asarray снимает подкласс memmap: дальше это обычные массивы поверх отображения.
+        return np.asarray(np.memmap(path, dtype=array_dtype, mode="c", offset=offset, shape=shape))
+
+    shape = (num_processes, num_resources)
+    available = array(offsets[0], np.dtype("<i8"), (num_resources,)).astype(int)
+    live = array(offsets[1], np.uint8, (num_processes,)).astype(bool)
+    max_claim = array(offsets[2], dtype, shape)
+    allocation = array(offsets[3], dtype, shape)
+    return STORAGE_CLASSES[storage], available, live, max_claim, allocation
+
+
+def restore_checkpoint(path, monitor_class=None, mmap=True, **options):
+    """
+    Создает монитор из контрольной точки path.
+
+    Запросы не проигрываются: матрицы подставляются целиком, регистрации
+    восстанавливаются по маске живых слотов, а состояние проверяется одним
+    проходом алгоритма банкира, который заодно заполняет кеш безопасной
+    последовательности. monitor_class по умолчанию - хранилище сохраненного
+    монитора; options передаются конструктору. Несогласованное или небезопасное
+    состояние - ValueError. При стратегии обнаружения небезопасное состояние
+    допустимо и не проверяется.
+    """
+    stored_class, available, live, max_claim, allocation = read_checkpoint(path, mmap)
+    if np.any(available < 0) or np.any(allocation < 0) or np.any(allocation > max_claim):
+        raise ValueError(f"{path}: несогласованное состояние (отрицательные ресурсы или выделение сверх потребности)")
+    if np.any(max_claim[~live]) or np.any(allocation[~live]):
+        raise ValueError(f"{path}: у снятых с учета процессов остались ресурсы")
+
+    # Пустой монитор: матрицы на num_processes строк все равно были бы заменены.
+    monitor = (monitor_class or stored_class)(available, 0, **options)
+    with monitor.lock:
+        monitor.num_processes = len(live)
+        monitor._load_state(available, max_claim, allocation)
+        monitor._live = live
+        # Отсортированный список - уже корректная куча.
+        monitor._free_slots = np.flatnonzero(~live).tolist()
+        monitor._update_live_ids()
+        if monitor.detector is None:
+            if not monitor._is_safe_state():
+                raise ValueError(f"{path}: состояние небезопасно")
+            monitor._safe_sequence = monitor._last_safe_sequence
+        if monitor.matrix_logger:
+            monitor.matrix_logger.log_state(f"Состояние восстановлено из {path}", monitor)
+    logger.system("Восстановлен из %s: %d процессов, свободно %s", path, live.sum(), monitor.available)
+    return monitor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and verify a monitor checkpoint file.")
+    parser.add_argument("checkpoint", help="Checkpoint file written by save_checkpoint.")
+    args = parser.parse_args()
+
+    stored_class, available, live, max_claim, allocation = read_checkpoint(args.checkpoint)
+    print(f"Хранилище: {stored_class.__name__}, тип матриц: {max_claim.dtype}")
+    print(f"Процессов: {int(live.sum())} из {len(live)} слотов, ресурсов: {len(available)}")
+    print(f"Свободно: {available}")
+    print(f"Выделено: {allocation.sum(axis=0, dtype=int)}")
+    restore_checkpoint(args.checkpoint)
+    print("Состояние безопасно")
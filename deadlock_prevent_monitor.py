@@ -1,105 +1,1133 @@
+import heapq
+import itertools
 import threading
+import time
+from collections import deque
 
 import numpy as np
 
-from logger import logger
+from detection import DetectionStrategy
+from logger import (
+    EVENT_BATCH_GRANTED,
+    EVENT_GRANTED,
+    EVENT_MAX_CLAIM,
+    EVENT_RELEASE,
+    EVENT_ROLLBACK,
+    EVENT_TENTATIVE,
+    logger,
+)
+from metrics import InstrumentedLock
+from safety import SAFETY_ALGORITHMS, find_deadlocked_processes, find_safe_sequences_batch
+from scheduler import SCHEDULER_POLICIES
+from snapshot import Change, MonitorSnapshot, SeqLock, read_consistent
+
+
+# Наибольшее число элементов промежуточных массивов при пакетном отборе ожидающих запросов.
+DISPATCH_BATCH_ELEMENTS = 1 << 22
+# Размер первого пакета, которым _dispatch_waiters отбирает запросы за обойденным.
+DISPATCH_FIRST_CHUNK = 64
+
+# Типы элементов матриц от узкого к широкому.
+MATRIX_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def fitting_dtype(largest):
+    """Самый узкий тип из MATRIX_DTYPES, вмещающий значения от -largest до largest."""
+    for dtype in MATRIX_DTYPES:
+        if largest <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class _Waiter:
+    """Запрос, поставленный монитором в очередь ожидания. У каждого свое условие."""
+
+    __slots__ = (
+        "process_id",
+        "request",
+        "condition",
+        "granted",
+        "retired",
+        "priority",
+        "deadline",
+        "sequence",
+        "enqueued_at",
+        "bypassed",
+    )
+
+    def __init__(self, process_id, request, lock, priority=0, deadline=None):
+        self.process_id = process_id
+        self.request = request
+        self.condition = threading.Condition(lock)
+        self.granted = False
+        self.retired = False
+        self.priority = priority
+        self.deadline = deadline
+        self.sequence = None
+        self.enqueued_at = None
+        # Сколько раз выдали запросу, который стоял за этим в порядке политики или пришел позже.
+        self.bypassed = 0
+
+    def wait(self):
+        """Ждет выдачи или вывода из работы. False - истек deadline."""
+        while not (self.granted or self.retired):
+            if self.deadline is None:
+                self.condition.wait()
+                continue
+            remaining = self.deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self.condition.wait(remaining)
+        return True
+
+    def notify(self):
+        self.condition.notify()
+
+
+class _Publication:
+    """Запрос, опубликованный для обработки потоком-комбинатором."""
+
+    __slots__ = ("process_id", "request", "result")
+
+    def __init__(self, process_id, request):
+        self.process_id = process_id
+        self.request = request
+        self.result = None
 
 
 class DeadlockPreventerMonitor:
-    def __init__(self, available_resources, num_processes, matrix_logger=None):
+    # Матрицы N×M, которые хранит монитор; у них общий тип элементов.
+    _MATRICES = ("max_claim", "allocation", "need")
+
+    def __init__(
+        self,
+        available_resources,
+        num_processes,
+        matrix_logger=None,
+        safety_algorithm="vectorized",
+        incremental_safety=True,
+        combining=False,
+        metrics=None,
+        snapshot_history=None,
+        scheduler="fifo",
+        strategy="avoidance",
+        matrix_dtype=None,
+    ):
+        if safety_algorithm not in SAFETY_ALGORITHMS:
+            raise ValueError(f"Неизвестный алгоритм проверки безопасности: {safety_algorithm}")
+        if isinstance(scheduler, str):
+            if scheduler not in SCHEDULER_POLICIES:
+                raise ValueError(f"Неизвестная политика планировщика: {scheduler}")
+            scheduler = SCHEDULER_POLICIES[scheduler]()
+        if strategy == "detection":
+            strategy = DetectionStrategy()
+        elif strategy == "avoidance":
+            strategy = None
+        elif not isinstance(strategy, DetectionStrategy):
+            raise ValueError(f"Неизвестная стратегия: {strategy}")
         self.num_resources = len(available_resources)
+        # Число занятых когда-либо слотов процессов; строк в матрицах может быть больше (запас роста).
         self.num_processes = num_processes
-        self.available = np.array(available_resources, dtype=int)
-        self.max_claim = np.zeros((num_processes, self.num_resources), dtype=int)
-        self.allocation = np.zeros((num_processes, self.num_resources), dtype=int)
-        self.need = np.zeros((num_processes, self.num_resources), dtype=int)
-        self.lock = threading.Lock()
-        self.condition = threading.Condition(self.lock)
+        # MonitorMetrics или None. Выключенные метрики стоят одну проверку на None.
+        self.metrics = metrics
+        # None - snapshot() копирует под блокировкой. Число - блокировка становится
+        # seqlock, snapshot() ее не берет, а последние snapshot_history изменений
+        # доступны через changes_since().
+        self._history = deque(maxlen=snapshot_history) if snapshot_history is not None else None
+        self._history_floor = 0
+        self._seqlock = None
+        # None - самый узкий целый тип, вмещающий общее число единиц каждого ресурса.
+        # Тип расширяется, если объявленная потребность в него не помещается.
+        self.matrix_dtype = matrix_dtype
+        self._init_state(available_resources)
+        self.lock, self.condition = self._create_lock()
         self.matrix_logger = matrix_logger
+        self.safety_algorithm = safety_algorithm
+        self._safety_check = SAFETY_ALGORITHMS[safety_algorithm]
+        self.incremental_safety = incremental_safety
+        # Последняя доказанная безопасная последовательность (None - неизвестна).
+        # В ней все держатели ресурсов, процессы без выделения завершаются после нее.
+        # Освобождение ресурсов и откат выделения ее не портят, а объявление
+        # новой максимальной потребности сбрасывает.
+        self._safe_sequence = None
+        self._last_safe_sequence = None
+        self._wait_queue = deque()
+        # Невыданные запросы из очереди по номерам процессов.
+        self._queued = {}
+        # Политика определяет, в каком порядке ожидающие запросы рассматриваются при освобождении.
+        self.scheduler = scheduler
+        self._waiter_sequence = itertools.count()
+        # В режиме комбинирования неблокирующие запросы публикуются здесь и
+        # обрабатываются пакетом тем потоком, который захватил блокировку.
+        self.combining = combining
+        self._publications = deque()
+        # Слоты, освобожденные unregister_process, выдаются повторно, начиная с меньшего.
+        self._free_slots = []
+        self._live = np.ones(num_processes, dtype=bool)
+        # Номера живых процессов для проверки безопасности; None - живы все слоты.
+        self._live_ids = None
+        # DetectionStrategy или None (предотвращение: проверка безопасности при каждой выдаче).
+        self.detector = strategy
+        if strategy is not None:
+            strategy.attach(self)
+
+        logger.system("Инициализирован с ресурсами: %s", self.available)
 
-        logger.system(f"Инициализирован с ресурсами: {self.available}")
+    def _init_state(self, available_resources):
+        self.available, self.max_claim, self.allocation, self.need = self._create_matrices(available_resources)
 
-    def _log_matrix_state(self, description):
+    def _create_matrices(self, available_resources):
+        shape = (self.num_processes, self.num_resources)
+        available = np.array(available_resources, dtype=int)
+        dtype = self._initial_dtype(available)
+        return available, np.zeros(shape, dtype=dtype), np.zeros(shape, dtype=dtype), np.zeros(shape, dtype=dtype)
+
+    def _initial_dtype(self, available):
+        if self.matrix_dtype is not None:
+            return np.dtype(self.matrix_dtype)
+        return fitting_dtype(int(np.abs(available).max(initial=0)))
+
+    def _fit_values(self, values):
+        """Расширяет тип матриц, если values в него не помещаются."""
+        dtype = fitting_dtype(int(np.abs(values).max(initial=0)))
+        if dtype.itemsize > getattr(self, self._MATRICES[0]).dtype.itemsize:
+            for name in self._MATRICES:
+                setattr(self, name, getattr(self, name).astype(dtype))
+
+    def _create_lock(self):
+        lock = threading.Lock()
+        if self.metrics is not None:
+            lock = InstrumentedLock(lock, self.metrics)
+        if self._history is not None:
+            lock = self._seqlock = SeqLock(lock)
+        return lock, threading.Condition(lock)
+
+    def snapshot(self):
+        """Согласованная копия available, max_claim и allocation (MonitorSnapshot)."""
+
+        def read():
+            # Снимок не зависит от типа матриц монитора: он может расшириться позже.
+            return self.available.copy(), self.max_claim.astype(int), self.allocation.astype(int)
+
+        if self._seqlock is None:
+            with self.lock:
+                return MonitorSnapshot(None, *read())
+        version, state = read_consistent(self._seqlock, read, self.lock)
+        return MonitorSnapshot(version, *state)
+
+    def changes_since(self, version):
+        """
+        Изменения после снимка версии version: (текущая версия, список Change).
+
+        None, если история выключена или уже не хранит все изменения после
+        version; тогда нужен новый snapshot().
+        """
+        if self._history is None:
+            return None
+        current, (floor, changes) = read_consistent(
+            self._seqlock, lambda: (self._history_floor, list(self._history)), self.lock
+        )
+        if version < floor:
+            return None
+        return current, [change for change in changes if change.version >= version]
+
+    def _record_change(self, event, process_id, vector):
+        history = self._history
+        if len(history) == history.maxlen:
+            self._history_floor = (history[0].version if history else self._seqlock.version) + 1
+        history.append(Change(self._seqlock.version, event, process_id, np.array(vector)))
+
+    def metrics_snapshot(self):
+        """Согласованный снимок метрик (None, если метрики выключены)."""
+        if self.metrics is None:
+            return None
+        with self.lock:
+            return self.metrics.snapshot()
+
+    def _log_matrix_state(self, event, process_id, vector):
+        if self._history is not None:
+            self._record_change(event, process_id, vector)
         if self.matrix_logger:
-            self.matrix_logger.log_state(description, self)
+            self.matrix_logger.log_event(event, process_id, vector, self)
+
+    def _grow(self, capacity):
+        """Увеличивает max_claim, allocation, need до capacity строк с сохранением текущих."""
+        for name in self._MATRICES:
+            matrix = getattr(self, name)
+            grown = np.zeros((capacity, self.num_resources), dtype=matrix.dtype)
+            grown[: len(matrix)] = matrix
+            setattr(self, name, grown)
+
+    def _load_state(self, available, max_claim, allocation):
+        """
+        Подставляет сохраненные available, max_claim и allocation (restore_checkpoint).
+
+        Матрицы берутся как есть, без копирования; безопасность проверяет вызывающий.
+        """
+        if self.matrix_dtype is not None:
+            max_claim = max_claim.astype(self.matrix_dtype, copy=False)
+            allocation = allocation.astype(self.matrix_dtype, copy=False)
+        self.available = np.array(available, dtype=int)
+        self.max_claim = max_claim
+        self.allocation = allocation
+        if "need" in self._MATRICES:
+            self.need = max_claim - allocation
+
+    # Доступ к строкам матриц. Другое хранилище (SparseMonitor) переопределяет эти методы.
+
+    def _need_row(self, process_id):
+        return self.need[process_id]
+
+    def _allocation_row(self, process_id):
+        return self.allocation[process_id]
+
+    def _needs_fit(self, process_ids):
+        """Покрываются ли остатки потребностей процессов свободными ресурсами."""
+        return np.all(self.need[process_ids] <= self.available)
+
+    def _store_max_claim(self, process_id, max_needs):
+        self._fit_values(max_needs)
+        self.max_claim[process_id] = max_needs
+        self.need[process_id] = max_needs - self.allocation[process_id]
+
+    def _update_live_ids(self):
+        live = np.flatnonzero(self._live[: self.num_processes])
+        self._live_ids = None if len(live) == self.num_processes else live
+
+    def _set_max_claim(self, process_id, max_needs):
+        max_needs = np.array(max_needs, dtype=int)
+        self._store_max_claim(process_id, max_needs)
+        logger.info(process_id, "Объявил макс. потребность: %s", max_needs)
+        self._safe_sequence = None
+        self._log_matrix_state(EVENT_MAX_CLAIM, process_id, max_needs)
 
     def set_max_claim(self, process_id, max_needs):
         with self.lock:
-            self.max_claim[process_id] = np.array(max_needs, dtype=int)
-            self.need[process_id] = self.max_claim[process_id] - self.allocation[process_id]
-            logger.info(process_id, f"Объявил макс. потребность: {self.max_claim[process_id]}")
-            self._log_matrix_state(f"P{process_id} объявил максимальную потребность")
+            self._set_max_claim(process_id, max_needs)
+            self._dispatch_waiters()
+
+    def register_process(self, max_needs=None):
+        """
+        Регистрирует новый процесс и возвращает его номер.
+
+        Сначала повторно используются слоты снятых с учета процессов; если
+        свободных нет, матрицы при необходимости увеличиваются вдвое.
+        """
+        with self.lock:
+            if self._free_slots:
+                process_id = heapq.heappop(self._free_slots)
+            else:
+                process_id = self.num_processes
+                if process_id == len(self._live):
+                    capacity = max(2 * process_id, 1)
+                    self._grow(capacity)
+                    self._live = np.concatenate([self._live, np.zeros(capacity - len(self._live), dtype=bool)])
+                    if self.matrix_logger:
+                        self.matrix_logger.log_state(f"Матрицы увеличены до {capacity} процессов", self)
+                self.num_processes += 1
+            self._live[process_id] = True
+            self._update_live_ids()
+            logger.info(process_id, "Зарегистрирован")
+            if max_needs is not None:
+                self._set_max_claim(process_id, max_needs)
+            return process_id
+
+    def unregister_process(self, process_id):
+        """
+        Снимает процесс с учета: возвращает все его ресурсы и освобождает слот.
+
+        У процесса не должно быть запросов в очереди ожидания.
+        """
+        with self.lock:
+            if not (0 <= process_id < self.num_processes and self._live[process_id]):
+                raise ValueError(f"Процесс {process_id} не зарегистрирован")
+            if process_id in self._queued:
+                raise ValueError(f"Процесс {process_id} ожидает ресурсы")
+
+            held = self._allocation_row(process_id).copy()
+            if np.any(held):
+                self._release(process_id, held)
+            cleared = np.zeros(self.num_resources, dtype=int)
+            self._store_max_claim(process_id, cleared)
+            self._log_matrix_state(EVENT_MAX_CLAIM, process_id, cleared)
+
+            self._live[process_id] = False
+            heapq.heappush(self._free_slots, process_id)
+            self._update_live_ids()
+            # Процесс без выделения и потребности ничего не менял в последовательности.
+            if self._safe_sequence is not None and process_id in self._safe_sequence:
+                self._safe_sequence.remove(process_id)
+            logger.info(process_id, "Снят с учета")
+
+            self._dispatch_waiters()
+            self.condition.notify_all()
+
+    def _safety_rows(self, rows):
+        """allocation и need строк rows (срез или массив номеров) для проверки безопасности."""
+        return self.allocation[rows], self.need[rows]
+
+    def _holder_ids(self):
+        """Номера процессов, которым выделено хоть что-то. Их не больше общего числа единиц."""
+        # nonzero по булеву массиву заметно быстрее, чем по целочисленному.
+        return np.unique(np.flatnonzero(self.allocation[: self.num_processes] != 0) // self.num_resources)
+
+    def _claims_fit(self, total):
+        """Не превышают ли максимальные потребности процессов общего числа единиц total."""
+        max_claim = self.max_claim[: self.num_processes]
+        # Поэлементное сравнение с вектором дорого при малом числе ресурсов,
+        # поэтому сначала наибольшая потребность сравнивается с наименьшим итогом.
+        return max_claim.max(initial=0) <= total.min() or bool(np.all(max_claim <= total))
 
     def _is_safe_state(self):
-        # 1. Банкир считает свои деньги в сейфе.
-        work = np.copy(self.available)
+        """
+        Проверяет безопасность текущего состояния и запоминает безопасную последовательность.
 
-        # 2. Составляет список клиентов, которых еще нужно обслужить.
-        finish = [False] * self.num_processes
+        Процесс без выделения ничего не возвращает и может завершиться последним,
+        когда свободно все, если его потребность не больше общего числа единиц.
+        Поэтому алгоритм банкира проходит только держателей ресурсов: стоимость
+        не зависит от числа процессов. Последовательность содержит только их,
+        остальные процессы завершаются после. Максимальная потребность больше
+        общего числа единиц делает небезопасным любое состояние.
+        """
+        holders = self._holder_ids()
+        allocation, need = self._safety_rows(holders)
+        sequence = None
+        if self._claims_fit(self.available + allocation.sum(axis=0)):
+            sequence = self._safety_check(self.available, allocation, need)
+            if sequence is not None:
+                sequence = holders[sequence].tolist()
+        self._last_safe_sequence = sequence
+        return sequence is not None
 
-        # 3. Повторяет попытки, пока находит кого обслужить.
-        while True:
-            found_process = False
-            # 4. Просматривает всех клиентов.
-            for i in range(self.num_processes):
-                # 5. Ищет клиента (i), которого еще не обслужили И которому хватит денег из сейфа.
-                if not finish[i] and np.all(self.need[i] <= work):
-                    # 6. НАШЕЛ! Гипотетически обслуживает его и забирает весь его кредит.
-                    #    Денег в сейфе (work) становится больше.
-                    work += self.allocation[i]
-                    finish[i] = True  # Помечает клиента как обслуженного.
-                    found_process = True
-                    break  # Начинает поиск заново с увеличенным капиталом.
-
-            # 7. Если просмотрел всех клиентов и ни одного не смог обслужить - выхода нет.
-            if not found_process:
+    def _sequence_is_safe(self, sequence):
+        """
+        Проверяет, что известная последовательность остается безопасной в текущем состоянии.
+
+        Процессы, которых нет в последовательности, не должны ничего держать: они завершаются после нее.
+        """
+        allocation, need = self._safety_rows(np.asarray(sequence, dtype=np.intp))
+        # Суммы не превышают общего числа единиц, поэтому считаются в типе матриц без расширения.
+        work_before = np.cumsum(allocation, axis=0, dtype=need.dtype)
+        work_before -= allocation
+        work_before += self.available.astype(need.dtype)
+        return bool(np.all(need <= work_before))
+
+    def _grant_is_safe(self, process_ids):
+        """Проверяет безопасность после гипотетического выделения процессам process_ids."""
+        if self.detector is not None:
+            # Стратегия обнаружения: безопасность не проверяется, взаимоблокировки разрешает детектор.
+            return True
+        metrics = self.metrics
+        sequence = self._safe_sequence
+        if self.incremental_safety and sequence is not None:
+            # Достаточное условие: остатки потребностей покрываются свободными ресурсами.
+            # Тогда эти процессы могут завершиться первыми, вернув не меньше, чем было
+            # в сейфе до выделения, а дальше подходит прежняя последовательность.
+            if self._needs_fit(process_ids):
+                for process_id in process_ids:
+                    if process_id in sequence:
+                        sequence.remove(process_id)
+                sequence[:0] = process_ids
+                if metrics is not None:
+                    metrics.inc("safety_fast_path")
+                return True
+            # Процесс, которому раньше ничего не выделялось, встает в конец последовательности.
+            absent = [process_id for process_id in process_ids if process_id not in sequence]
+            if self._sequence_is_safe(sequence + absent):
+                sequence += absent
+                if metrics is not None:
+                    metrics.inc("safety_cached_sequence")
+                return True
+
+        self._last_safe_sequence = None
+        if metrics is not None:
+            start = time.perf_counter()
+            safe = self._is_safe_state()
+            metrics.safety_check_seconds.record(time.perf_counter() - start)
+            metrics.inc("safety_full_check")
+        else:
+            safe = self._is_safe_state()
+        if not safe:
+            return False
+        self._safe_sequence = self._last_safe_sequence
+        return True
+
+    def _allocate(self, process_id, request):
+        self.available -= request
+        self.allocation[process_id] += request
+        self.need[process_id] -= request
+
+    def _deallocate(self, process_id, release):
+        self.available += release
+        self.allocation[process_id] -= release
+        self.need[process_id] += release
+
+    def _try_grant(self, process_id, request):
+        """Гипотетически выделяет ресурсы и оставляет выделение, только если состояние безопасно."""
+        self._allocate(process_id, request)
+        self._log_matrix_state(EVENT_TENTATIVE, process_id, request)
+
+        if self._grant_is_safe([process_id]):
+            logger.success(process_id, request, self.available)
+            self._log_matrix_state(EVENT_GRANTED, process_id, request)
+            if self.metrics is not None:
+                self.metrics.inc("granted")
+            return True
+
+        self._deallocate(process_id, request)
+        if self.metrics is not None:
+            self.metrics.inc("deferred_unsafe")
+        logger.deferred(process_id, request)
+        self._log_matrix_state(EVENT_ROLLBACK, process_id, request)
+        return False
+
+    def _admit_batch(self, operations):
+        """
+        Выдает ресурсы как можно большему числу запросов пакета. Возвращает список результатов.
+
+        Сначала все помещающиеся в available запросы выделяются разом и проверяются
+        одной проверкой безопасности. Если пакет целиком небезопасен, он откатывается
+        и запросы выдаются жадно по одному.
+        """
+        results = [False] * len(operations)
+        fitting = []
+        remaining = self.available.copy()
+        for index, (process_id, request) in enumerate(operations):
+            if self._holds_line(process_id):
+                self._log_deferred(process_id, request)
+            elif np.all(request <= remaining):
+                remaining -= request
+                fitting.append(index)
+            else:
+                if self.metrics is not None:
+                    self.metrics.inc("blocked_insufficient")
+                logger.wait(process_id, request, remaining)
+
+        if not fitting:
+            return results
+
+        if len(fitting) > 1:
+            for index in fitting:
+                self._allocate(*operations[index])
+            if self._grant_is_safe(list(dict.fromkeys(operations[index][0] for index in fitting))):
+                for index in fitting:
+                    process_id, request = operations[index]
+                    logger.success(process_id, request, self.available)
+                    self._log_matrix_state(EVENT_BATCH_GRANTED, process_id, request)
+                    results[index] = True
+                if self.metrics is not None:
+                    self.metrics.inc("granted", len(fitting))
+                self._bypass_queue(len(fitting))
+                return results
+            for index in fitting:
+                self._deallocate(*operations[index])
+
+        for index in fitting:
+            results[index] = self._try_grant(*operations[index])
+        self._bypass_queue(sum(results))
+        return results
+
+    def _validate_request(self, process_id, request):
+        if self.metrics is not None:
+            self.metrics.inc("requests")
+        if not self._live[process_id]:
+            if self.metrics is not None:
+                self.metrics.inc("rejected")
+            logger.error(process_id, "Запрос от незарегистрированного процесса")
+            return False
+        need = self._need_row(process_id)
+        if np.any(request > need):
+            if self.metrics is not None:
+                self.metrics.inc("rejected")
+            logger.error(process_id, "Запрос %s превышает оставшуюся потребность %s", request, need)
+            return False
+        return True
+
+    def _validate_batch(self, operations):
+        """
+        Номера допустимых запросов пакета.
+
+        Допущенные запросы выделяются вместе, поэтому запросы одного процесса
+        проверяются по потребности за вычетом уже допущенных в этом пакете.
+        """
+        admitted = []
+        claimed = {}
+        for index, (process_id, request) in enumerate(operations):
+            logger.request(process_id, request)
+            if not self._validate_request(process_id, request):
+                continue
+            earlier = claimed.get(process_id)
+            if earlier is not None:
+                total = earlier + request
+                need = self._need_row(process_id)
+                if np.any(total > need):
+                    if self.metrics is not None:
+                        self.metrics.inc("rejected")
+                    logger.error(process_id, "Запросы пакета %s превышают оставшуюся потребность %s", total, need)
+                    continue
+                request = total
+            claimed[process_id] = request
+            admitted.append(index)
+        return admitted
+
+    def _combine(self):
+        """Обрабатывает все опубликованные запросы одним пакетом и раздает результаты."""
+        batch = []
+        while self._publications:
+            batch.append(self._publications.popleft())
+
+        for record in batch:
+            record.result = False
+        admitted = [batch[index] for index in self._validate_batch([(r.process_id, r.request) for r in batch])]
+
+        results = self._admit_batch([(record.process_id, record.request) for record in admitted])
+        for record, result in zip(admitted, results):
+            record.result = result
+
+    def _request_combined(self, process_id, request):
+        record = _Publication(process_id, request)
+        self._publications.append(record)
+        with self.lock:
+            # Пока поток ждал блокировку, его запрос мог обработать другой поток-комбинатор.
+            if record.result is None:
+                self._combine()
+        return record.result
+
+    def _dispatch_rows(self):
+        """
+        (номера, allocation, need) держателей ресурсов для отбора запросов из очереди.
+
+        None - хранилище не дает плотных строк дешево; тогда запросы отбираются
+        только по available, а безопасность проверяется для каждого отдельно.
+        """
+        holders = self._holder_ids()
+        return (holders, *self._safety_rows(holders))
+
+    def _dispatch_candidates(self, process_ids, requests):
+        """
+        Маска запросов очереди, которые помещаются в available и безопасны в текущем состоянии.
+
+        Выдачи только уменьшают available, поэтому запрос, небезопасный сейчас,
+        остается небезопасным до конца прохода _dispatch_waiters. Процесс без
+        выделения ничего не возвращает и может завершиться последним, когда work
+        равен общему числу единиц (если потребность его не превышает), поэтому
+        каждое гипотетическое состояние составляется из держателей ресурсов и
+        самого запрашивающего: их не больше общего числа единиц, как бы ни было
+        велико N. Сначала отбрасываются
+        запросы, после которых не может завершиться ни один процесс, остальные
+        проверяются одним пакетным проходом алгоритма банкира.
+        """
+        fitting = np.all(requests <= self.available, axis=1)
+        rows = self._dispatch_rows() if self.detector is None else None
+        if rows is None or not fitting.any():
+            return fitting
+        holders, allocation, need = rows
+        candidates = fitting.copy()
+        indexes = np.flatnonzero(candidates)
+        requesters = process_ids[indexes]
+        request = requests[indexes]
+        # Строка запрашивающего после выдачи.
+        own_allocation, own_need = self._safety_rows(requesters)
+        own_allocation = own_allocation + request
+        own_need = own_need - request
+
+        if not self._claims_fit(self.available + allocation.sum(axis=0)):
+            candidates[:] = False
+        else:
+            ready = np.all(need <= self.available, axis=1)
+            # Процесс q готов и после выдачи r, если r <= available - need_q.
+            slack = self.available - need[ready]
+            possible = np.all(own_need <= self.available - request, axis=1)
+            chunk = max(1, DISPATCH_BATCH_ELEMENTS // max(slack.size, 1))
+            for start in range(0, len(request), chunk):
+                part = request[start : start + chunk, None, :] <= slack
+                possible[start : start + chunk] |= np.all(part, axis=2).any(axis=1)
+            candidates[indexes[~possible]] = False
+
+            # Строка запрашивающего среди держателей обнуляется и добавляется отдельной последней строкой.
+            keep = np.flatnonzero(possible)
+            owner = np.full(len(keep), -1)
+            if len(holders):
+                found = np.minimum(np.searchsorted(holders, requesters[keep]), len(holders) - 1)
+                match = holders[found] == requesters[keep]
+                owner[match] = found[match]
+            chunk = max(1, DISPATCH_BATCH_ELEMENTS // max(need.size + need.shape[1], 1))
+            for start in range(0, len(keep), chunk):
+                part = keep[start : start + chunk]
+                states = np.arange(len(part))
+                hypothetical_allocation = np.zeros((len(part), len(holders) + 1, self.num_resources), dtype=int)
+                hypothetical_need = np.zeros_like(hypothetical_allocation)
+                hypothetical_allocation[:, :-1] = allocation
+                hypothetical_need[:, :-1] = need
+                inside = owner[start : start + chunk]
+                hypothetical_allocation[states[inside >= 0], inside[inside >= 0]] = 0
+                hypothetical_need[states[inside >= 0], inside[inside >= 0]] = 0
+                hypothetical_allocation[:, -1] = own_allocation[part]
+                hypothetical_need[:, -1] = own_need[part]
+                safe = find_safe_sequences_batch(
+                    self.available - request[part], hypothetical_allocation, hypothetical_need
+                )
+                candidates[indexes[part[~safe]]] = False
+        if self.metrics is not None:
+            self.metrics.inc("deferred_unsafe", int(np.count_nonzero(fitting & ~candidates)))
+        return candidates
+
+    def _dispatch_waiters(self):
+        """
+        Выдает ресурсы тем запросам из очереди, которые стали выполнимыми и безопасными, и будит только их.
+
+        Запросы рассматриваются в порядке политики планировщика. Невыполнимый
+        запрос, который уже обошли scheduler.max_bypass раз, останавливает
+        проход: стоящие за ним ждут, пока он не будет выдан. Поэтому запросы
+        с начала очереди проверяются по одному, пока выдаются. Остаток
+        отбирается пакетами (_dispatch_rest), только если невыполнимый запрос
+        можно обойти, а если его приходится обойти, потому что ресурсы держат
+        только ожидающие, - рассматриваются запросы держателей
+        (_unblock_holders). Стоимость прохода зависит от того, сколько выдано,
+        а не от длины очереди.
+        """
+        if not self._wait_queue:
+            return
+        waiters = iter(self.scheduler.order(self._wait_queue, self))
+        granted = []
+        for waiter in waiters:
+            if not (np.all(waiter.request <= self.available) and self._try_grant(waiter.process_id, waiter.request)):
+                if waiter.bypassed < self.scheduler.max_bypass:
+                    granted += self._dispatch_rest(waiter, waiters)
+                elif not self._releases_pending():
+                    granted += self._unblock_holders(waiter, waiters)
                 break
+            self._grant_waiter(waiter, ())
+            granted.append(waiter)
+            if not np.any(self.available):
+                break
+        for waiter in granted:
+            self._wait_queue.remove(waiter)
+
+    def _unblock_holders(self, blocked, waiters):
+        """
+        Выдает первый в порядке политики выполнимый запрос держателя ресурсов, когда их держат только ожидающие.
+
+        В безопасном состоянии остаток потребности первого процесса безопасной
+        последовательности помещается в available, поэтому запрос хотя бы
+        одного держателя выполним. После его выдачи держатель больше не ждет,
+        и очередь снова держит строй, так что всю очередь просматривать не
+        нужно. Если выполнимых запросов у держателей нет (например, при
+        стратегии обнаружения), проход продолжается по остатку очереди.
+        """
+        queued = [waiter for holder in self._holder_ids().tolist() for waiter in self._queued.get(holder, ())]
+        queued.sort(key=lambda waiter: waiter.sequence)
+        for waiter in self.scheduler.order(queued, self):
+            if waiter is blocked:
+                continue
+            if np.all(waiter.request <= self.available) and self._try_grant(waiter.process_id, waiter.request):
+                passed = [blocked]
+                if self.scheduler.max_bypass:
+                    passed += itertools.takewhile(lambda other: other is not waiter, waiters)
+                self._grant_waiter(waiter, passed)
+                return [waiter]
+        return self._dispatch_rest(blocked, waiters)
+
+    def _dispatch_rest(self, blocked, waiters):
+        """
+        Продолжает проход _dispatch_waiters за запросом blocked, который невыполним, но его можно обойти.
+
+        Следующие запросы берутся из итератора waiters пакетами, растущими
+        вдвое от DISPATCH_FIRST_CHUNK, и отбираются _dispatch_candidates: полная
+        проверка безопасности нужна только кандидатам. Возвращает выданные запросы.
+        """
+        limit = self.scheduler.max_bypass
+        passed = [blocked]
+        granted = []
+        size = DISPATCH_FIRST_CHUNK
+        releases_pending = None
+        while True:
+            chunk = list(itertools.islice(waiters, size))
+            if not chunk:
+                return granted
+            size *= 2
+            process_ids = np.array([waiter.process_id for waiter in chunk])
+            requests = np.array([waiter.request for waiter in chunk]).reshape(len(chunk), self.num_resources)
+            candidates = self._dispatch_candidates(process_ids, requests)
+            for index, waiter in enumerate(chunk):
+                if not (candidates[index] and self._try_grant(waiter.process_id, waiter.request)):
+                    if waiter.bypassed >= limit:
+                        if releases_pending is None:
+                            releases_pending = self._releases_pending()
+                        if releases_pending:
+                            return granted
+                    passed.append(waiter)
+                    continue
+                self._grant_waiter(waiter, passed)
+                granted.append(waiter)
+                releases_pending = None
+                if not np.any(self.available):
+                    return granted
+                rest = slice(index + 1, len(chunk))
+                candidates[rest] &= self._dispatch_candidates(process_ids[rest], requests[rest])
+
+    def _grant_waiter(self, waiter, passed):
+        """Отмечает запрос из очереди выданным в обход запросов passed и будит его. Из очереди его убирает вызывающий."""
+        waiter.granted = True
+        self._unqueue(waiter)
+        for skipped in passed:
+            skipped.bypassed += 1
+        if self.metrics is not None and waiter.enqueued_at is not None:
+            self.metrics.record_process_wait(waiter.process_id, time.perf_counter() - waiter.enqueued_at)
+        waiter.notify()
+
+    def _unqueue(self, waiter):
+        """Исключает запрос из учета ожидающих процессов (_queued)."""
+        waiters = self._queued[waiter.process_id]
+        waiters.remove(waiter)
+        if not waiters:
+            del self._queued[waiter.process_id]
+
+    def _releases_pending(self, process_id=None):
+        """
+        Держит ли ресурсы кто-то, кроме процессов с запросами в очереди и process_id.
+
+        Процессы, ждущие в очереди, ничего не освобождают. Если ресурсы держат
+        только они, очередь не может держать строй: иначе никто не будет выдан.
+        Держателей не больше общего числа единиц, поэтому перебираются только они.
+        """
+        return any(holder != process_id and holder not in self._queued for holder in self._holder_ids().tolist())
+
+    def _holds_line(self, process_id):
+        """
+        Должен ли новый запрос процесса встать за очередью ожидания, а не обходить ее.
+
+        Новый запрос обходит очередь, только пока каждый ожидающий обойден
+        меньше scheduler.max_bypass раз и пока освобождать ресурсы некому.
+        """
+        if not self._wait_queue:
+            return False
+        limit = self.scheduler.max_bypass
+        if all(waiter.bypassed < limit for waiter in self._wait_queue):
+            return False
+        return self._releases_pending(process_id)
+
+    def _bypass_queue(self, count=1):
+        """Учитывает выдачу count запросов в обход всех ожидающих."""
+        # Счетчики сравниваются только с max_bypass: при строгом порядке (0) их не нужно вести.
+        if count and self.scheduler.max_bypass:
+            for waiter in self._wait_queue:
+                waiter.bypassed += count
+
+    def _log_deferred(self, process_id, request):
+        """Учитывает запрос, отложенный, чтобы не обходить очередь ожидания. В очередь он не ставится."""
+        if self.metrics is not None:
+            self.metrics.inc("deferred_queue")
+        logger.deferred(process_id, request)
+
+    def _try_immediate(self, process_id, request):
+        """Пытается выдать новый запрос без ожидания, если он не должен встать за очередью."""
+        if self._holds_line(process_id):
+            self._log_deferred(process_id, request)
+            return False
+        if not self._grant_now(process_id, request):
+            return False
+        self._bypass_queue()
+        return True
+
+    def _grant_now(self, process_id, request):
+        """Выдает запрос, если он помещается в available и безопасен; при нехватке ресурсов только логирует ожидание."""
+        if np.all(request <= self.available):
+            return self._try_grant(process_id, request)
+        if self.metrics is not None:
+            self.metrics.inc("blocked_insufficient")
+        logger.wait(process_id, request, self.available)
+        return False
+
+    def _enqueue_waiter(self, waiter):
+        waiter.sequence = next(self._waiter_sequence)
+        self._wait_queue.append(waiter)
+        self._queued.setdefault(waiter.process_id, []).append(waiter)
+        if self.metrics is not None:
+            waiter.enqueued_at = time.perf_counter()
+            self.metrics.wait_queue_depth.record(len(self._wait_queue))
+        if self.detector is not None:
+            self.detector.notify_contention()
+
+    def _cancel_waiter(self, waiter):
+        """Снимает запрос с ожидания. Если он успел быть выдан, ресурсы возвращаются."""
+        if waiter.retired:
+            # Уже снят с очереди при разрешении взаимоблокировки или выводе монитора из работы.
+            return
+        if waiter.granted:
+            if self._release(waiter.process_id, waiter.request):
+                self._dispatch_waiters()
+                self.condition.notify_all()
+        else:
+            self._wait_queue.remove(waiter)
+            self._unqueue(waiter)
+
+    def _expire_waiter(self, waiter):
+        """Снимает с очереди запрос, срок ожидания которого истек."""
+        self._wait_queue.remove(waiter)
+        self._unqueue(waiter)
+        if self.metrics is not None:
+            self.metrics.inc("timed_out")
+        logger.info(waiter.process_id, "Истек срок ожидания запроса %s", waiter.request)
+
+    def _admit_or_enqueue(self, waiter):
+        """
+        Выдает запрос нового ожидающего сразу (True) или ставит его в очередь (False).
+
+        Запрос, который не должен обходить очередь, встает в нее и сразу
+        рассматривается вместе с остальными в порядке политики: если он первый,
+        он выдается проходом _dispatch_waiters.
+        """
+        if self._holds_line(waiter.process_id):
+            self._enqueue_waiter(waiter)
+            self._dispatch_waiters()
+            return False
+        if self._grant_now(waiter.process_id, waiter.request):
+            self._bypass_queue()
+            return True
+        self._enqueue_waiter(waiter)
+        # Держатель ресурсов встал в очередь и больше ничего не освободит: очередь
+        # могла держать строй ради него, поэтому ее нужно пересмотреть.
+        if len(self._wait_queue) > 1 and np.any(self._allocation_row(waiter.process_id)):
+            self._dispatch_waiters()
+        return False
+
+    def _request_blocking(self, process_id, request, priority=0, deadline=None):
+        waiter = _Waiter(process_id, request, self.lock, priority, deadline)
+        if self._admit_or_enqueue(waiter):
+            return True
+        if not waiter.wait():
+            self._expire_waiter(waiter)
+            return False
+        return waiter.granted
 
-        # 8. Если в итоге все клиенты помечены как обслуженные - план существует, состояние безопасное.
-        return all(finish)
+    def _find_deadlocked(self):
+        """Номера процессов во взаимоблокировке по allocation и запросам из очереди ожидания."""
+        requests = np.zeros((self.num_processes, self.num_resources), dtype=int)
+        for waiter in self._wait_queue:
+            requests[waiter.process_id] += waiter.request
+        live = self._live_ids if self._live_ids is not None else np.arange(self.num_processes)
+        deadlocked = find_deadlocked_processes(self.available, self.allocation[live], requests[live])
+        return live[deadlocked].tolist()
 
-    def request_resources(self, process_id, request):
+    def _fail_waiters(self, process_id):
+        """Отклоняет ожидающие запросы процесса: они вернут False."""
+        for waiter in list(self._queued.get(process_id, ())):
+            self._wait_queue.remove(waiter)
+            self._unqueue(waiter)
+            waiter.retired = True
+            waiter.notify()
+            if self.metrics is not None:
+                self.metrics.inc("deadlock_victims")
+            logger.info(process_id, "Запрос %s отклонен для разрешения взаимоблокировки", waiter.request)
+
+    def _retire_waiters(self):
+        """Будит все ожидающие запросы без выдачи (False): монитор выводится из работы."""
+        for waiter in self._wait_queue:
+            waiter.retired = True
+            waiter.notify()
+        self._wait_queue = deque()
+        self._queued.clear()
+        self.condition.notify_all()
+
+    def request_resources(self, process_id, request, blocking=False, timeout=None, deadline=None, priority=0):
+        """
+        Запрашивает ресурсы для процесса.
+
+        В режиме blocking=True отложенный или невыполнимый сейчас запрос ставится
+        во внутреннюю очередь монитора, и вызов возвращает True после выдачи.
+        Без него отложенный запрос ждет любого освобождения и возвращает False,
+        а в режиме комбинирования сразу возвращает False без ожидания. Так же
+        откладывается запрос, который не должен обходить непустую очередь
+        ожидания (см. SchedulerPolicy).
+
+        timeout (секунды) или deadline (момент по time.monotonic()) включают
+        ожидание в очереди, но ограничивают его: по истечении запрос снимается
+        с очереди и вызов возвращает False. priority и deadline учитывает
+        политика планировщика, выбирая, какой из ожидающих запросов выдать первым.
+
+        При стратегии обнаружения запрос вне режима комбинирования всегда ждет
+        в очереди; запрос жертвы взаимоблокировки возвращает False.
+        """
         request = np.array(request, dtype=int)
+        if timeout is not None:
+            expires = time.monotonic() + timeout
+            deadline = expires if deadline is None else min(deadline, expires)
+        blocking = blocking or deadline is not None
+        if self.combining and not blocking:
+            return self._request_combined(process_id, request)
+
         with self.lock:
             logger.request(process_id, request)
 
-            if np.any(request > self.need[process_id]):
-                logger.error(process_id, f"Запрос {request} превышает оставшуюся потребность {self.need[process_id]}")
+            if not self._validate_request(process_id, request):
                 return False
 
+            if blocking or self.detector is not None:
+                # Детектор видит только запросы из очереди ожидания, поэтому при обнаружении ждут в ней.
+                return self._request_blocking(process_id, request, priority, deadline)
+
             while np.any(request > self.available):
+                if self.metrics is not None:
+                    self.metrics.inc("blocked_insufficient")
                 logger.wait(process_id, request, self.available)
                 self.condition.wait()
 
-            self.available -= request
-            self.allocation[process_id] += request
-            self.need[process_id] -= request
-            self._log_matrix_state(f"P{process_id} запросил {request}. Гипотетическое выделение.")
-
-            if self._is_safe_state():
-                logger.success(process_id, request, self.available)
-                self._log_matrix_state(f"ЗАПРОС P{process_id} УДОВЛЕТВОРЕН. Состояние безопасное.")
+            # Запрос, который не должен обходить очередь, откладывается, как небезопасный.
+            if self._holds_line(process_id):
+                self._log_deferred(process_id, request)
+            elif self._try_grant(process_id, request):
+                self._bypass_queue()
                 return True
+            self.condition.wait()
+            return False
+
+    def try_request(self, process_id, request):
+        """Неблокирующий запрос: выдает ресурсы сразу или возвращает False, не дожидаясь освобождений."""
+        request = np.array(request, dtype=int)
+        with self.lock:
+            logger.request(process_id, request)
+            return self._validate_request(process_id, request) and self._try_immediate(process_id, request)
+
+    def _probe_is_safe(self, process_id, request):
+        """Проверяет, было бы безопасно выдать request, не меняя состояния."""
+        # Последовательность, безопасная после выдачи, остается безопасной и после отката,
+        # поэтому обновленный кеш последовательности можно оставить.
+        self._allocate(process_id, request)
+        try:
+            return self._grant_is_safe([process_id])
+        finally:
+            self._deallocate(process_id, request)
+
+    def _largest_safe_amount(self, process_id, base, resource, upper):
+        """Наибольшее k <= upper, при котором безопасно выдать base плюс k единиц ресурса resource."""
+        probe = base.copy()
+        probe[resource] += upper
+        if self._probe_is_safe(process_id, probe):
+            return upper
+        # Безопасность монотонна: если безопасна выдача k единиц, безопасна и меньшая.
+        low, high = 0, upper - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            probe[resource] = base[resource] + middle
+            if self._probe_is_safe(process_id, probe):
+                low = middle
             else:
-                self.available += request
-                self.allocation[process_id] -= request
-                self.need[process_id] += request
-                logger.deferred(process_id, request)
-                self._log_matrix_state(f"ЗАПРОС P{process_id} ОТЛОЖЕН. Откат к предыдущему состоянию.")
-                self.condition.wait()
-                return False
+                high = middle - 1
+        return low
+
+    def _max_safe_grant(self, process_id, limit, per_resource=False):
+        """
+        Наибольшая безопасная выдача в пределах limit (limit <= need и available).
+
+        per_resource=True - для каждого ресурса отдельно наибольший запрос только
+        этого ресурса. Иначе - покомпонентно максимальный вектор: сначала
+        проверяется limit целиком, затем ресурсы добираются по порядку двоичным
+        поиском, каждый поверх уже набранных.
+        """
+        zero = np.zeros(self.num_resources, dtype=int)
+        if not np.any(limit):
+            return zero
+        if not per_resource and self._probe_is_safe(process_id, limit):
+            return limit.copy()
+        grant = zero.copy()
+        for resource in np.flatnonzero(limit):
+            base = zero if per_resource else grant
+            grant[resource] = self._largest_safe_amount(process_id, base, resource, int(limit[resource]))
+        return grant
+
+    def allocated(self, process_id):
+        """Копия текущего выделения процесса, прочитанная под блокировкой."""
+        with self.lock:
+            return np.array(self._allocation_row(process_id), dtype=int)
+
+    def max_safe_request(self, process_id, per_resource=False):
+        """
+        Наибольший запрос, который процесс может получить прямо сейчас без потери безопасности.
+
+        По умолчанию - покомпонентно максимальный вектор: ни одну его компоненту
+        нельзя увеличить. Таких векторов может быть несколько; возвращается
+        найденный при добавлении ресурсов по порядку. per_resource=True
+        возвращает для каждого ресурса наибольшее количество при запросе
+        только его одного.
+        """
+        with self.lock:
+            if not self._live[process_id]:
+                return np.zeros(self.num_resources, dtype=int)
+            limit = np.minimum(self._need_row(process_id), self.available)
+            return self._max_safe_grant(process_id, limit, per_resource)
+
+    def _acquire_up_to(self, process_id, request):
+        if self._holds_line(process_id):
+            self._log_deferred(process_id, request)
+            return np.zeros(self.num_resources, dtype=int)
+        grant = self._max_safe_grant(process_id, np.minimum(request, self.available))
+        if np.any(grant):
+            self._try_grant(process_id, grant)
+            self._bypass_queue()
+        elif np.any(request):
+            logger.deferred(process_id, request)
+        return grant
+
+    def acquire_up_to(self, process_id, request):
+        """
+        Неблокирующий запрос «сколько можно»: выдает наибольшую безопасную часть request.
+
+        Возвращает выданный вектор (нулевой, если сейчас нельзя выдать ничего
+        или запрос некорректен). Выдача - покомпонентно максимальная, как в
+        max_safe_request.
+        """
+        request = np.array(request, dtype=int)
+        with self.lock:
+            logger.request(process_id, request)
+            if not self._validate_request(process_id, request):
+                return np.zeros(self.num_resources, dtype=int)
+            return self._acquire_up_to(process_id, request)
+
+    def request_many(self, operations):
+        """
+        Пакетный неблокирующий запрос: operations - пары (process_id, request).
+
+        Все запросы проверяются за один захват блокировки. Возвращает список
+        результатов в порядке операций.
+        """
+        operations = [(process_id, np.array(request, dtype=int)) for process_id, request in operations]
+        with self.lock:
+            results = [False] * len(operations)
+            admitted = self._validate_batch(operations)
+            granted = self._admit_batch([operations[index] for index in admitted])
+            for index, result in zip(admitted, granted):
+                results[index] = result
+            return results
+
+    def _release(self, process_id, release):
+        allocation = self._allocation_row(process_id)
+        if np.any(release > allocation):
+            logger.error(process_id, "Попытка освободить %s, когда выделено %s", release, allocation)
+            return False
+
+        self._deallocate(process_id, release)
+        if self.metrics is not None:
+            self.metrics.inc("released")
+        logger.release(process_id, release, self.available)
+        self._log_matrix_state(EVENT_RELEASE, process_id, release)
+        return True
 
     def release_resources(self, process_id, release):
         release = np.array(release, dtype=int)
         with self.lock:
-            if np.any(release > self.allocation[process_id]):
-                logger.error(process_id, f"Попытка освободить {release}, когда выделено {self.allocation[process_id]}")
+            if not self._release(process_id, release):
                 return
 
-            self.allocation[process_id] -= release
-            self.available += release
-            self.need[process_id] += release
-            logger.release(process_id, release, self.available)
-            self._log_matrix_state(f"P{process_id} освободил {release}")
-
+            self._dispatch_waiters()
             self.condition.notify_all()
+
+    def release_many(self, operations):
+        """Пакетное освобождение: operations - пары (process_id, release). Ожидающие будятся один раз."""
+        operations = [(process_id, np.array(release, dtype=int)) for process_id, release in operations]
+        with self.lock:
+            results = [self._release(process_id, release) for process_id, release in operations]
+            if any(results):
+                self._dispatch_waiters()
+                self.condition.notify_all()
+            return results
@@ -0,0 +1,51 @@
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+
+
+class DerivedNeedMonitor(DeadlockPreventerMonitor):
+    """
+    Плотный монитор без матрицы need.
+
+    need всегда равна max_claim - allocation, поэтому хранятся только max_claim и
+    allocation: матрицы занимают две трети обычной памяти, а выдача и
+    освобождение обновляют одну строку вместо двух. Проверка безопасности
+    вычисляет need только для проверяемых строк; при проверке подмножества живых
+    процессов строки и так копируются, и разница почти не видна. Атрибут need -
+    вычисляемая копия.
+    """
+
+    _MATRICES = ("max_claim", "allocation")
+
+    def _init_state(self, available_resources):
+        shape = (self.num_processes, self.num_resources)
+        self.available = np.array(available_resources, dtype=int)
+        dtype = self._initial_dtype(self.available)
+        self.max_claim = np.zeros(shape, dtype=dtype)
+        self.allocation = np.zeros(shape, dtype=dtype)
+
+    @property
+    def need(self):
+        return self.max_claim - self.allocation
+
+    def _need_row(self, process_id):
+        return self.max_claim[process_id] - self.allocation[process_id]
+
+    def _needs_fit(self, process_ids):
+        return np.all(self.max_claim[process_ids] - self.allocation[process_ids] <= self.available)
+
+    def _store_max_claim(self, process_id, max_needs):
+        self._fit_values(max_needs)
+        self.max_claim[process_id] = max_needs
+
+    def _allocate(self, process_id, request):
+        self.available -= request
+        self.allocation[process_id] += request
+
+    def _deallocate(self, process_id, release):
+        self.available += release
+        self.allocation[process_id] -= release
+
+    def _safety_rows(self, rows):
+        allocation = self.allocation[rows]
+        return allocation, self.max_claim[rows] - allocation
@@ -0,0 +1,105 @@
+import threading
+
+import numpy as np
+
+from logger import logger
+
+
+def fail_request(monitor, process_id):
+    """Отклоняет ожидающие запросы жертвы: они возвращают False, выделенное остается у нее."""
+    monitor._fail_waiters(process_id)
+
+
+def preempt(monitor, process_id):
+    """
+    Отклоняет ожидающие запросы жертвы и отбирает все выделенные ей ресурсы.
+
+    Жертва узнает об этом по отказу (False) и должна считать, что больше ничего
+    не держит.
+    """
+    monitor._fail_waiters(process_id)
+    held = monitor._allocation_row(process_id).copy()
+    if np.any(held):
+        logger.info(process_id, "Ресурсы %s отобраны для разрешения взаимоблокировки", held)
+        monitor._release(process_id, held)
+        monitor._dispatch_waiters()
+        monitor.condition.notify_all()
+
+
+RECOVERY_POLICIES = {
+    "fail": fail_request,
+    "preempt": preempt,
+}
+
+
+def least_allocated(monitor, process_ids):
+    """Жертва по умолчанию: процесс с наименьшим выделением, при равенстве - с меньшим номером."""
+    return min(process_ids, key=lambda process_id: (int(monitor._allocation_row(process_id).sum()), process_id))
+
+
+class DetectionStrategy:
+    """
+    Стратегия обнаружения вместо предотвращения.
+
+    Монитор с этой стратегией выдает любой запрос, помещающийся в available,
+    без проверки безопасности. Фоновый поток раз в interval секунд, а также
+    сразу после постановки запроса в очередь ожидания ищет взаимоблокировку
+    по allocation и ожидающим запросам. Для каждого найденного множества
+    victim(monitor, process_ids) выбирает жертву, а recovery(monitor, process_id)
+    (имя из RECOVERY_POLICIES или функция) ее обрабатывает, пока
+    взаимоблокировок не останется.
+    """
+
+    def __init__(self, interval=1.0, recovery="preempt", victim=least_allocated):
+        if isinstance(recovery, str):
+            if recovery not in RECOVERY_POLICIES:
+                raise ValueError(f"Неизвестная политика восстановления: {recovery}")
+            recovery = RECOVERY_POLICIES[recovery]
+        self.interval = interval
+        self.recovery = recovery
+        self.victim = victim
+        self.monitor = None
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def attach(self, monitor):
+        if self.monitor is not None:
+            raise ValueError("Стратегия уже подключена к монитору")
+        self.monitor = monitor
+        self._thread = threading.Thread(target=self._run, name="deadlock-detector", daemon=True)
+        self._thread.start()
+
+    def notify_contention(self):
+        """Вызывается монитором под его блокировкой: только будит детектор."""
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopped:
+                return
+            self.detect()
+
+    def detect(self):
+        """Находит и разрешает взаимоблокировки. Возвращает список жертв."""
+        monitor = self.monitor
+        victims = []
+        with monitor.lock:
+            while True:
+                deadlocked = monitor._find_deadlocked()
+                if not deadlocked:
+                    return victims
+                if monitor.metrics is not None:
+                    monitor.metrics.inc("deadlocks_detected")
+                logger.system("Взаимоблокировка: процессы %s", deadlocked)
+                victim = self.victim(monitor, deadlocked)
+                self.recovery(monitor, victim)
+                victims.append(victim)
@@ -0,0 +1,208 @@
+import argparse
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from logger import ALLOCATION_DELTA, EVENT_MAX_CLAIM, describe_event, format_matrix_state
+
+# Записи снимка: заголовок (process_id = число строк, vector = available),
+# затем по строке max_claim и allocation на каждый процесс.
+EVENT_SNAPSHOT = 100
+EVENT_SNAPSHOT_MAX_CLAIM = 101
+EVENT_SNAPSHOT_ALLOCATION = 102
+
+MAGIC = b"DPMJ"
+VERSION = 1
+# magic, версия, число ресурсов, интервал снимков, wall-clock и monotonic время начала (нс).
+HEADER = struct.Struct("<4sHHIqq")
+HEADER_SIZE = 64
+
+
+def record_dtype(num_resources):
+    return np.dtype(
+        [
+            ("timestamp_ns", "<i8"),
+            ("process_id", "<i4"),
+            ("event", "<u1"),
+            ("_pad", "V3"),
+            ("vector", "<i8", (num_resources,)),
+        ]
+    )
+
+
+class StateJournal:
+    """
+    Бинарный журнал состояния монитора вместо текстовых дампов MatrixFileLogger.
+
+    Каждое событие - запись фиксированного размера: время monotonic, процесс,
+    событие и вектор. Каждые snapshot_interval событий пишется полный снимок
+    матриц, чтобы декодер не проигрывал журнал с начала. Подключается к монитору
+    как matrix_logger.
+    """
+
+    def __init__(self, filename, num_resources, snapshot_interval=1000):
+        self.num_resources = num_resources
+        self.snapshot_interval = snapshot_interval
+        self.dtype = record_dtype(num_resources)
+        self.lock = threading.Lock()
+        self.file_handle = open(filename, "wb")
+        header = HEADER.pack(MAGIC, VERSION, num_resources, snapshot_interval, time.time_ns(), time.monotonic_ns())
+        self.file_handle.write(header.ljust(HEADER_SIZE, b"\0"))
+        self._events_since_snapshot = None
+        self._record = np.zeros(1, dtype=self.dtype)
+
+    def _write(self, event, process_id, vector):
+        record = self._record
+        record["timestamp_ns"] = time.monotonic_ns()
+        record["process_id"] = process_id
+        record["event"] = event
+        record["vector"] = vector
+        self.file_handle.write(record.tobytes())
+
+    def _write_snapshot(self, monitor_state):
+        num_processes = len(monitor_state.allocation)
+        records = np.zeros(1 + 2 * num_processes, dtype=self.dtype)
+        records["timestamp_ns"] = time.monotonic_ns()
+        records[0]["process_id"] = num_processes
+        records[0]["event"] = EVENT_SNAPSHOT
+        records[0]["vector"] = monitor_state.available
+        for offset, event, matrix in (
+            (1, EVENT_SNAPSHOT_MAX_CLAIM, monitor_state.max_claim),
+            (1 + num_processes, EVENT_SNAPSHOT_ALLOCATION, monitor_state.allocation),
+        ):
+            rows = records[offset : offset + num_processes]
+            rows["process_id"] = np.arange(num_processes)
+            rows["event"] = event
+            rows["vector"] = matrix
+        self.file_handle.write(records.tobytes())
+        self._events_since_snapshot = 0
+
+    def log_event(self, event, process_id, vector, monitor_state):
+        with self.lock:
+            if self._events_since_snapshot is None:
+                # Первый снимок - состояние до события, от него декодер проигрывает дельты.
+                self._write_snapshot(_state_before(event, process_id, vector, monitor_state))
+            self._write(event, process_id, vector)
+            self._events_since_snapshot += 1
+            if self._events_since_snapshot >= self.snapshot_interval:
+                self._write_snapshot(monitor_state)
+
+    def log_state(self, event_description, monitor_state):
+        """Журнал хранит только события; произвольные описания пишутся снимком."""
+        with self.lock:
+            self._write_snapshot(monitor_state)
+
+    def flush(self):
+        with self.lock:
+            self.file_handle.flush()
+
+    def close(self):
+        with self.lock:
+            self.file_handle.close()
+
+
+class _StateView:
+    def __init__(self, available, max_claim, allocation):
+        self.available = available
+        self.max_claim = max_claim
+        self.allocation = allocation
+
+
+def _state_before(event, process_id, vector, monitor_state):
+    available = monitor_state.available.copy()
+    max_claim = monitor_state.max_claim.copy()
+    allocation = monitor_state.allocation.copy()
+    sign = ALLOCATION_DELTA.get(event, 0)
+    allocation[process_id] -= sign * np.asarray(vector)
+    available += sign * np.asarray(vector)
+    if event == EVENT_MAX_CLAIM:
+        # Прежнее значение неизвестно, но дельта его все равно перезапишет.
+        max_claim[process_id] = 0
+    return _StateView(available, max_claim, allocation)
+
+
+class JournalReader:
+    """Чтение журнала через np.memmap и восстановление состояния для любого события."""
+
+    def __init__(self, filename):
+        with open(filename, "rb") as file_handle:
+            header = file_handle.read(HEADER.size)
+        magic, version, num_resources, self.snapshot_interval, self.wall_start_ns, self.monotonic_start_ns = (
+            HEADER.unpack(header)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename}: не журнал состояния монитора")
+        self.num_resources = num_resources
+        dtype = record_dtype(num_resources)
+        # Незаписанный до конца хвост (журнал еще открыт на запись) не читается.
+        count = (os.path.getsize(filename) - HEADER_SIZE) // dtype.itemsize
+        if count > 0:
+            self.records = np.memmap(filename, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=dtype)
+        events = self.records["event"]
+        self.snapshots = np.flatnonzero(events == EVENT_SNAPSHOT)
+        # Номера событий - индексы записей, не относящихся к снимкам.
+        self.events = np.flatnonzero(events < EVENT_SNAPSHOT)
+
+    def __len__(self):
+        return len(self.events)
+
+    def wall_time(self, record_index):
+        elapsed = int(self.records[record_index]["timestamp_ns"]) - self.monotonic_start_ns
+        return (self.wall_start_ns + elapsed) / 1e9
+
+    def state_at(self, event_number):
+        """(available, max_claim, allocation) сразу после события event_number."""
+        target = self.events[event_number]
+        start = self.snapshots[np.searchsorted(self.snapshots, target, side="right") - 1]
+        num_processes = int(self.records[start]["process_id"])
+        available = self.records[start]["vector"].copy()
+        rows = self.records[start + 1 : start + 1 + 2 * num_processes]["vector"]
+        max_claim = rows[:num_processes].copy()
+        allocation = rows[num_processes:].copy()
+
+        deltas = self.records[start + 1 + 2 * num_processes : target + 1]
+        for record in deltas[deltas["event"] < EVENT_SNAPSHOT]:
+            event, process_id, vector = int(record["event"]), int(record["process_id"]), record["vector"]
+            if event == EVENT_MAX_CLAIM:
+                max_claim[process_id] = vector
+            sign = ALLOCATION_DELTA.get(event, 0)
+            if sign:
+                allocation[process_id] += sign * vector
+                available -= sign * vector
+        return available, max_claim, allocation
+
+    def render(self, event_number, resource_names=None):
+        """Текстовое представление события в формате MatrixFileLogger."""
+        record = self.records[self.events[event_number]]
+        available, max_claim, allocation = self.state_at(event_number)
+        description = describe_event(int(record["event"]), int(record["process_id"]), record["vector"])
+        return format_matrix_state(
+            description,
+            self.wall_time(self.events[event_number]),
+            available,
+            allocation,
+            max_claim - allocation,
+            resource_names or [f"R{i}" for i in range(self.num_resources)],
+            len(allocation),
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode a binary monitor state journal into the text matrix view.")
+    parser.add_argument("journal", help="Journal file written by StateJournal.")
+    parser.add_argument("-e", "--event", type=int, nargs="*", help="Event numbers to render (default: all).")
+    parser.add_argument("-n", "--names", nargs="+", help="Resource names for the matrix header.")
+    parser.add_argument("--summary", action="store_true", help="Only print the number of events and snapshots.")
+    args = parser.parse_args()
+
+    reader = JournalReader(args.journal)
+    if args.summary:
+        print(f"Событий: {len(reader)}, снимков: {len(reader.snapshots)}, ресурсов: {reader.num_resources}")
+    else:
+        for number in args.event if args.event is not None else range(len(reader)):
+            print(reader.render(number, args.names))
@@ -1,52 +1,235 @@
+import atexit
 import os
+import queue
 import threading
 import time
 
 import numpy as np
 
 
+LEVEL_DEBUG = 10
+LEVEL_INFO = 20
+LEVEL_WARNING = 30
+LEVEL_ERROR = 40
+LEVEL_OFF = 100
+
+
+def _format_request(request_vec):
+    return f">> Запрашивает:  {request_vec}"
+
+
+def _format_success(request_vec, available_vec):
+    return f"++ УДОВЛЕТВОРЕН запрос {request_vec}. Доступно: {available_vec}"
+
+
+def _format_release(release_vec, available_vec):
+    return f"<< Освободил ресурсы: {release_vec}. Доступно: {available_vec}"
+
+
+def _format_wait(request_vec, available_vec):
+    return f"-- ЖДЕТ. Запрос {request_vec} > Доступно {available_vec}"
+
+
+def _format_deferred(request_vec):
+    return f"-- ОТЛОЖЕНО! Запрос {request_vec} ведет к небезопасной ситуации. Откат."
+
+
+def _format_error(message, *args):
+    return f"!! ОШИБКА: {_format_message(message, *args)}"
+
+
+def _format_message(message, *args):
+    # Как в logging: аргументы подставляются в сообщение, только если оно выводится.
+    return message % args if args else message
+
+
+def _disabled(*args, **kwargs):
+    pass
+
+
 class ConsoleLogger:
-    def __init__(self):
+    """
+    Консольный логгер событий монитора.
+
+    Каждый метод - отдельная категория со своим уровнем. Отключенные уровнем или
+    фильтром категории методы подменяются пустой функцией, поэтому ничего не стоят.
+    В асинхронном режиме вызов только кладет компактную запись в очередь, а
+    форматирование и вывод выполняет фоновый поток.
+
+    Текстовые сообщения (system, error, info, log) принимают строку формата
+    с %-подстановками и аргументы отдельно, как logging: строка собирается
+    только для включенной категории. Поэтому вызывающему коду не нужны ни
+    f-строки, ни проверки is_enabled.
+    """
+
+    CATEGORY_LEVELS = {
+        "system": LEVEL_INFO,
+        "request": LEVEL_DEBUG,
+        "success": LEVEL_INFO,
+        "release": LEVEL_INFO,
+        "wait": LEVEL_INFO,
+        "deferred": LEVEL_WARNING,
+        "error": LEVEL_ERROR,
+        "info": LEVEL_INFO,
+    }
+
+    def __init__(self, level=LEVEL_DEBUG, categories=None, asynchronous=False):
         self.log_lock = threading.Lock()
+        self.asynchronous = asynchronous
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self.set_level(level, categories)
 
-    def log(self, message, process_id=None):
-        """Основной метод логирования с префиксом."""
-        with self.log_lock:
-            timestamp = f"{time.strftime('%H:%M:%S', time.localtime())}"
-            if process_id is not None:
-                prefix = f"{timestamp} [P{process_id}]"
-                print(f"{prefix} {message}")
+    def set_level(self, level, categories=None):
+        """Включает категории с уровнем не ниже level; categories дополнительно ограничивает их набор."""
+        self.level = level
+        self.categories = None if categories is None else set(categories)
+        for category, category_level in self.CATEGORY_LEVELS.items():
+            enabled = category_level >= level and (self.categories is None or category in self.categories)
+            if enabled:
+                self.__dict__.pop(category, None)
             else:
-                prefix = f"{timestamp} [Monitor]"
-                print(f"{prefix} {message}")
+                setattr(self, category, _disabled)
+
+    def is_enabled(self, category):
+        return category not in self.__dict__
+
+    def _format_line(self, timestamp, process_id, message):
+        timestamp = f"{time.strftime('%H:%M:%S', time.localtime(timestamp))}"
+        if process_id is not None:
+            prefix = f"{timestamp} [P{process_id}]"
+        else:
+            prefix = f"{timestamp} [Monitor]"
+        return f"{prefix} {message}"
 
-    def system(self, message):
-        self.log(f"{message}")
+    def _emit(self, process_id, formatter, *args):
+        if not self.asynchronous:
+            with self.log_lock:
+                print(self._format_line(time.time(), process_id, formatter(*args)))
+            return
+        # Векторы монитора меняются на месте, поэтому в запись попадает их копия.
+        args = tuple(arg.copy() if isinstance(arg, np.ndarray) else arg for arg in args)
+        self._queue.put((time.time(), process_id, formatter, args))
+        if self._writer is None:
+            self._start_writer()
+
+    def _start_writer(self):
+        with self.log_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._drain, name="console-logger", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _drain(self):
+        while True:
+            records = [self._queue.get()]
+            # Забираем все, что накопилось, и пишем одним вызовом.
+            try:
+                while len(records) < 1024:
+                    records.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            lines = []
+            flushed = []
+            for record in records:
+                if isinstance(record, threading.Event):
+                    flushed.append(record)
+                    continue
+                timestamp, process_id, formatter, args = record
+                lines.append(self._format_line(timestamp, process_id, formatter(*args)))
+            if lines:
+                print("\n".join(lines), flush=True)
+            for done in flushed:
+                done.set()
+
+    def flush(self, timeout=5):
+        """Дожидается вывода всех записей, поставленных в очередь до вызова."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def log(self, message, *args, process_id=None):
+        """Основной метод логирования с префиксом."""
+        self._emit(process_id, _format_message, message, *args)
+
+    def system(self, message, *args):
+        self._emit(None, _format_message, message, *args)
 
     def request(self, pid, request_vec):
-        self.log(f">> Запрашивает:  {request_vec}", process_id=pid)
+        self._emit(pid, _format_request, request_vec)
 
     def success(self, pid, request_vec, available_vec):
-        msg = f"++ УДОВЛЕТВОРЕН запрос {request_vec}. Доступно: {available_vec}"
-        self.log(msg, process_id=pid)
+        self._emit(pid, _format_success, request_vec, available_vec)
 
     def release(self, pid, release_vec, available_vec):
-        msg = f"<< Освободил ресурсы: {release_vec}. Доступно: {available_vec}"
-        self.log(msg, process_id=pid)
+        self._emit(pid, _format_release, release_vec, available_vec)
 
     def wait(self, pid, request_vec, available_vec):
-        msg = f"-- ЖДЕТ. Запрос {request_vec} > Доступно {available_vec}"
-        self.log(msg, process_id=pid)
+        self._emit(pid, _format_wait, request_vec, available_vec)
 
     def deferred(self, pid, request_vec):
-        msg = f"-- ОТЛОЖЕНО! Запрос {request_vec} ведет к небезопасной ситуации. Откат."
-        self.log(msg, process_id=pid)
+        self._emit(pid, _format_deferred, request_vec)
+
+    def error(self, pid, message, *args):
+        self._emit(pid, _format_error, message, *args)
+
+    def info(self, pid, message, *args):
+        self._emit(pid, _format_message, message, *args)
+
+
+# События, меняющие матрицы монитора. Записываются MatrixFileLogger и журналом.
+EVENT_MAX_CLAIM = 1
+EVENT_TENTATIVE = 2
+EVENT_GRANTED = 3
+EVENT_ROLLBACK = 4
+EVENT_RELEASE = 5
+EVENT_BATCH_GRANTED = 6
+
+# Знак изменения allocation для каждого события; available меняется с обратным знаком.
+ALLOCATION_DELTA = {
+    EVENT_TENTATIVE: 1,
+    EVENT_BATCH_GRANTED: 1,
+    EVENT_ROLLBACK: -1,
+    EVENT_RELEASE: -1,
+}
+
+_EVENT_DESCRIPTIONS = {
+    EVENT_MAX_CLAIM: "P{pid} объявил максимальную потребность",
+    EVENT_TENTATIVE: "P{pid} запросил {vector}. Гипотетическое выделение.",
+    EVENT_GRANTED: "ЗАПРОС P{pid} УДОВЛЕТВОРЕН. Состояние безопасное.",
+    EVENT_ROLLBACK: "ЗАПРОС P{pid} ОТЛОЖЕН. Откат к предыдущему состоянию.",
+    EVENT_RELEASE: "P{pid} освободил {vector}",
+    EVENT_BATCH_GRANTED: "ЗАПРОС P{pid} {vector} УДОВЛЕТВОРЕН В ПАКЕТЕ. Состояние безопасное.",
+}
 
-    def error(self, pid, message):
-        self.log(f"!! ОШИБКА: {message}", process_id=pid)
 
-    def info(self, pid, message):
-        self.log(f"{message}", process_id=pid)
+def describe_event(event, process_id, vector):
+    return _EVENT_DESCRIPTIONS[event].format(pid=process_id, vector=vector)
+
+
+def format_matrix_state(event_description, timestamp, available, allocation, need, resource_names, num_processes):
+    """Текстовое представление состояния монитора, как в файле MatrixFileLogger."""
+    np_format = {"suppress_small": True, "precision": 0}
+    lines = [
+        f"\n{'='*80}",
+        f"СОБЫТИЕ: {event_description}",
+        f"Время:   {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}",
+        f"{'-'*80}",
+        f"Доступно (Available): {np.array2string(available, **np_format)}\n",
+    ]
+    header = "         " + "  ".join([f"{name:<4}" for name in resource_names[: len(available)]])
+
+    for title, matrix in (("Матрица выделено (Allocation):", allocation), ("\nМатрица потребностей (Need):", need)):
+        lines.append(title)
+        lines.append(header)
+        for i in range(num_processes):
+            row = np.array2string(matrix[i], **np_format).replace("[", "").replace("]", "").strip()
+            lines.append(f"Процесс P{i}: {row}")
+
+    lines.append(f"{'='*80}\n")
+    return "\n".join(lines)
 
 
 class MatrixFileLogger:
@@ -58,36 +241,22 @@ class MatrixFileLogger:
         self.num_processes = num_processes
         self.resource_names = resource_names or [f"R{i}" for i in range(10)]
 
+    def log_event(self, event, process_id, vector, monitor_state):
+        self.log_state(describe_event(event, process_id, vector), monitor_state)
+
     def log_state(self, event_description, monitor_state):
         with self.lock:
-            np_format = {"suppress_small": True, "precision": 0}
-            self.file_handle.write(f"\n{'='*80}\n")
-            self.file_handle.write(f"СОБЫТИЕ: {event_description}\n")
-            self.file_handle.write(f"Время:   {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())}\n")
-            self.file_handle.write(f"{'-'*80}\n")
-
-            available_str = np.array2string(monitor_state.available, **np_format)
-            self.file_handle.write(f"Доступно (Available): {available_str}\n\n")
-
-            header = "         " + "  ".join(
-                [f"{name:<4}" for name in self.resource_names[: monitor_state.num_resources]]
-            )
-
-            self.file_handle.write("Матрица выделено (Allocation):\n")
-            self.file_handle.write(header + "\n")
-            for i in range(self.num_processes):
-                row = (
-                    np.array2string(monitor_state.allocation[i], **np_format).replace("[", "").replace("]", "").strip()
+            self.file_handle.write(
+                format_matrix_state(
+                    event_description,
+                    time.time(),
+                    monitor_state.available,
+                    monitor_state.allocation,
+                    monitor_state.need,
+                    self.resource_names,
+                    self.num_processes,
                 )
-                self.file_handle.write(f"Процесс P{i}: {row}\n")
-
-            self.file_handle.write("\nМатрица потребностей (Need):\n")
-            self.file_handle.write(header + "\n")
-            for i in range(self.num_processes):
-                row = np.array2string(monitor_state.need[i], **np_format).replace("[", "").replace("]", "").strip()
-                self.file_handle.write(f"Процесс P{i}: {row}\n")
-
-            self.file_handle.write(f"{'='*80}\n")
+            )
             self.file_handle.flush()
 
     def close(self):
@@ -95,4 +264,4 @@ class MatrixFileLogger:
             self.file_handle.close()
 
 
-logger = ConsoleLogger()
+logger = ConsoleLogger(asynchronous=True)
@@ -4,9 +4,13 @@ import sys
 
 import numpy as np
 
-from deadlock_prevent_monitor import DeadlockPreventerMonitor
-from logger import MatrixFileLogger, logger
+from journal import StateJournal
+from logger import LEVEL_DEBUG, LEVEL_ERROR, LEVEL_INFO, LEVEL_OFF, LEVEL_WARNING, MatrixFileLogger, logger
+from metrics import MonitorMetrics, to_json, to_prometheus
+from scheduler import SCHEDULER_POLICIES
+from sparse_monitor import create_monitor
 from thread import WorkerThread
+from trace_replay import TraceRecorder
 
 if __name__ == "__main__":
     RESOURCE_NAMES = ["CPU", "RAM", "Disk"]
@@ -29,7 +33,59 @@ if __name__ == "__main__":
         f"Must provide {len(RESOURCE_NAMES)} values for: {' '.join(RESOURCE_NAMES)}",
     )
 
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        choices=["debug", "info", "warning", "error", "off"],
+        default="debug",
+        help="Console log level. Logging is asynchronous and filtered before any formatting.",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--journal",
+        help="Write a compact binary state journal to this file instead of the text matrix log.\n"
+        "Decode it with: python journal.py FILE",
+    )
+
+    parser.add_argument(
+        "-t",
+        "--trace",
+        help="Record every monitor call to this trace file for replay benchmarks (see trace_replay.py).",
+    )
+
+    parser.add_argument(
+        "-s",
+        "--scheduler",
+        choices=sorted(SCHEDULER_POLICIES),
+        default="fifo",
+        help="Order in which blocked requests are considered when resources are released.",
+    )
+
+    parser.add_argument(
+        "--strategy",
+        choices=["avoidance", "detection"],
+        default="avoidance",
+        help="avoidance: banker's check on every grant.\n"
+        "detection: grant whatever fits, a background detector preempts a victim on deadlock.",
+    )
+
+    parser.add_argument(
+        "-m",
+        "--metrics",
+        choices=["json", "prometheus"],
+        help="Collect monitor metrics (counters, safety-check, lock and wait histograms) and print them at exit.",
+    )
+
     args = parser.parse_args()
+    LOG_LEVELS = {
+        "debug": LEVEL_DEBUG,
+        "info": LEVEL_INFO,
+        "warning": LEVEL_WARNING,
+        "error": LEVEL_ERROR,
+        "off": LEVEL_OFF,
+    }
+    logger.set_level(LOG_LEVELS[args.log_level])
 
     NUM_PROCESSES = args.processes
     TOTAL_RESOURCES = args.resources
@@ -46,9 +102,23 @@ if __name__ == "__main__":
     print(f"Log File:            {LOG_FILE_NAME}")
     print("------------------------------\n")
 
-    file_logger = MatrixFileLogger(LOG_FILE_NAME, num_processes=NUM_PROCESSES, resource_names=RESOURCE_NAMES)
-
-    monitor = DeadlockPreventerMonitor(TOTAL_RESOURCES, NUM_PROCESSES, matrix_logger=file_logger)
+    if args.journal:
+        LOG_FILE_NAME = args.journal
+        file_logger = StateJournal(LOG_FILE_NAME, num_resources=len(RESOURCE_NAMES))
+    else:
+        file_logger = MatrixFileLogger(LOG_FILE_NAME, num_processes=NUM_PROCESSES, resource_names=RESOURCE_NAMES)
+
+    metrics = MonitorMetrics() if args.metrics else None
+    # Для трех ресурсов и умеренного числа процессов выбирается упакованное хранилище (PackedMonitor).
+    monitor = create_monitor(
+        TOTAL_RESOURCES,
+        NUM_PROCESSES,
+        matrix_logger=file_logger,
+        metrics=metrics,
+        scheduler=args.scheduler,
+        strategy=args.strategy,
+    )
+    recorder = TraceRecorder().attach(monitor) if args.trace else None
 
     threads = []
     for i in range(NUM_PROCESSES):
@@ -60,13 +130,22 @@ if __name__ == "__main__":
     for thread in threads:
         thread.join()
 
+    logger.flush()
     print("\n" + "=" * 50)
     logger.system("Все потоки завершили свою работу.")
-    logger.system(f"Подробный лог состояния сохранен в файле: {LOG_FILE_NAME}")
-    logger.system(f"Итоговое состояние ресурсов: {monitor.available}")
-    logger.system(f"Ожидаемое состояние:          {TOTAL_RESOURCES}")
+    logger.system("Подробный лог состояния сохранен в файле: %s", LOG_FILE_NAME)
+    logger.system("Итоговое состояние ресурсов: %s", monitor.available)
+    logger.system("Ожидаемое состояние:          %s", TOTAL_RESOURCES)
     assert np.all(monitor.available == np.array(TOTAL_RESOURCES)), "Ошибка: не все ресурсы были возвращены!"
     logger.system("Проверка успешна: все ресурсы возвращены в систему.")
+    logger.flush()
     print("=" * 50)
 
     file_logger.close()
+    if recorder:
+        recorder.save(args.trace)
+        logger.system("Трасса вызовов сохранена в файле: %s", args.trace)
+        logger.flush()
+    if metrics:
+        snapshot = monitor.metrics_snapshot()
+        print(to_json(snapshot) if args.metrics == "json" else to_prometheus(snapshot), end="")
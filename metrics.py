@@ -0,0 +1,198 @@
+import bisect
+import json
+import time
+
+
+def exponential_bounds(start, factor, count):
+    return [start * factor**i for i in range(count)]
+
+
+# Границы по умолчанию: от 1 мкс до ~8 с для времени и от 1 до 65536 для длины очереди.
+SECONDS_BOUNDS = exponential_bounds(1e-6, 2, 24)
+DEPTH_BOUNDS = exponential_bounds(1, 2, 17)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин, как в Prometheus."""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Оценка квантиля по верхней границе корзины."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def merge(self, other):
+        """Добавляет наблюдения гистограммы other с теми же границами."""
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": list(zip(self.bounds + [float("inf")], self.counts)),
+        }
+
+
+class MonitorMetrics:
+    """
+    Счетчики и гистограммы монитора.
+
+    Все обновления выполняются под блокировкой монитора, поэтому собственной
+    блокировки здесь нет. Выключенные метрики (metrics=None у монитора) стоят
+    одну проверку атрибута на вызов.
+    """
+
+    COUNTERS = (
+        "requests",
+        "granted",
+        "deferred_unsafe",
+        "blocked_insufficient",
+        "deferred_queue",
+        "rejected",
+        "timed_out",
+        "released",
+        "safety_fast_path",
+        "safety_cached_sequence",
+        "safety_full_check",
+        "deadlocks_detected",
+        "deadlock_victims",
+    )
+
+    def __init__(self):
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.safety_check_seconds = Histogram(SECONDS_BOUNDS)
+        self.lock_wait_seconds = Histogram(SECONDS_BOUNDS)
+        self.lock_hold_seconds = Histogram(SECONDS_BOUNDS)
+        self.wait_queue_depth = Histogram(DEPTH_BOUNDS)
+        self.process_wait_seconds = Histogram(SECONDS_BOUNDS)
+        # process_id -> [число ожиданий, суммарное время ожидания]
+        self.per_process_wait = {}
+
+    def inc(self, counter, amount=1):
+        self.counters[counter] += amount
+
+    def record_process_wait(self, process_id, seconds):
+        self.process_wait_seconds.record(seconds)
+        entry = self.per_process_wait.setdefault(process_id, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def merge(self, other, process_ids=None):
+        """
+        Добавляет показания other, например метрик другого монитора.
+
+        process_ids переводит номера процессов other в номера этих метрик:
+        процесс i из other учитывается как process_ids[i].
+        """
+        for counter, value in other.counters.items():
+            self.counters[counter] += value
+        theirs = other.histograms()
+        for name, histogram in self.histograms().items():
+            histogram.merge(theirs[name])
+        for process_id, (count, total) in other.per_process_wait.items():
+            if process_ids is not None:
+                process_id = int(process_ids[process_id])
+            entry = self.per_process_wait.setdefault(process_id, [0, 0.0])
+            entry[0] += count
+            entry[1] += total
+
+    def histograms(self):
+        return {
+            "safety_check_seconds": self.safety_check_seconds,
+            "lock_wait_seconds": self.lock_wait_seconds,
+            "lock_hold_seconds": self.lock_hold_seconds,
+            "wait_queue_depth": self.wait_queue_depth,
+            "process_wait_seconds": self.process_wait_seconds,
+        }
+
+    def snapshot(self):
+        return {
+            "counters": dict(self.counters),
+            "histograms": {name: histogram.snapshot() for name, histogram in self.histograms().items()},
+            "per_process_wait": {
+                str(process_id): {"count": count, "sum": total}
+                for process_id, (count, total) in sorted(self.per_process_wait.items())
+            },
+        }
+
+
+def to_json(snapshot):
+    return json.dumps(snapshot, indent=2)
+
+
+def to_prometheus(snapshot, prefix="deadlock_monitor"):
+    """Текстовый формат экспозиции Prometheus для снимка MonitorMetrics.snapshot()."""
+    lines = []
+    for name, value in snapshot["counters"].items():
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        lines.append(f"{prefix}_{name}_total {value}")
+    for name, histogram in snapshot["histograms"].items():
+        metric = f"{prefix}_{name}"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, count in histogram["buckets"]:
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"{metric}_sum {histogram['sum']}")
+        lines.append(f"{metric}_count {histogram['count']}")
+    per_process = snapshot["per_process_wait"]
+    if per_process:
+        lines.append(f"# TYPE {prefix}_process_wait_seconds_total counter")
+        for process_id, entry in per_process.items():
+            lines.append(f'{prefix}_process_wait_seconds_total{{pid="{process_id}"}} {entry["sum"]}')
+        lines.append(f"# TYPE {prefix}_process_waits_total counter")
+        for process_id, entry in per_process.items():
+            lines.append(f'{prefix}_process_waits_total{{pid="{process_id}"}} {entry["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+class InstrumentedLock:
+    """Блокировка монитора, которая пишет время ожидания и удержания в метрики."""
+
+    def __init__(self, lock, metrics):
+        self._lock = lock
+        self._metrics = metrics
+        self._acquired_at = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            # Запись уже под блокировкой, поэтому гонок с другими потоками нет.
+            self._acquired_at = now = time.perf_counter()
+            self._metrics.lock_wait_seconds.record(now - start)
+        return acquired
+
+    def release(self):
+        self._metrics.lock_hold_seconds.record(time.perf_counter() - self._acquired_at)
+        self._lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,317 @@
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from logger import EVENT_GRANTED, EVENT_RELEASE, EVENT_ROLLBACK, EVENT_TENTATIVE, logger
+
+# Наибольшее число ресурсов, при котором create_monitor выбирает упакованное хранилище.
+PACKED_MAX_RESOURCES = 8
+# Полная проверка безопасности здесь - цикл Python по процессам; дальше NumPy быстрее.
+PACKED_MAX_PROCESSES = 128
+
+
+def _unpack(packed, width, shifts):
+    mask = (1 << width) - 1
+    return np.array([(packed >> shift) & mask for shift in shifts], dtype=int)
+
+
+class _LoggedVector:
+    """Упакованный вектор в записи журнала: распаковывается, только если запись выводится."""
+
+    __slots__ = ("packed", "width", "shifts")
+
+    def __init__(self, packed, width, shifts):
+        # Ширина поля запоминается: к выводу записи монитор может перепаковать векторы.
+        self.packed = packed
+        self.width = width
+        self.shifts = shifts
+
+    def __str__(self):
+        return str(_unpack(self.packed, self.width, self.shifts))
+
+
+class PackedMonitor(DeadlockPreventerMonitor):
+    """
+    Монитор для малого числа ресурсов: вектор хранится одним целым числом Python.
+
+    Ресурс r занимает поле из width бит, начиная с бита r·width; старший бит
+    поля - защитный и в хранимых значениях всегда равен нулю. Тогда сравнение
+    a <= b по всем ресурсам сразу - одно вычитание: ((b | guard) - a) & guard
+    сохраняет все защитные биты, только если ни одно поле не заняло единицу у
+    соседнего. Сложение и вычитание векторов - обычные + и -, пока значения
+    полей не выходят за пределы. Вызовы NumPy на каждый запрос заменяются
+    несколькими операциями над int.
+
+    Хранятся available, max_claim и allocation; need = max_claim - allocation
+    в проверках не нужен: need <= work равносильно max_claim <= work + allocation.
+    Ширина поля выбирается по наибольшему из общего числа единиц ресурса и
+    объявленных потребностей и растет вместе с ними.
+
+    Атрибуты available, max_claim, allocation и need - распакованные копии
+    NumPy, как у SparseMonitor. Блокирующие ожидания, пакетные запросы и
+    комбинирование работают через общий код монитора с векторами NumPy.
+    """
+
+    def _init_state(self, available_resources):
+        total = [int(value) for value in available_resources]
+        self._set_width(max(total, default=0))
+        self._available = self._pack(total)
+        self._claim = [0] * self.num_processes
+        self._alloc = [0] * self.num_processes
+
+    def _set_width(self, largest):
+        # Еще один бит запаса: в поле помещается любое допустимое значение и «слишком большое» limit.
+        self._width = max(largest.bit_length(), 1) + 2
+        self._limit = (1 << (self._width - 1)) - 1
+        self._shifts = [resource * self._width for resource in range(self.num_resources)]
+        self._guard = sum(1 << (shift + self._width - 1) for shift in self._shifts)
+
+    def _repack(self, largest):
+        available = self._unpack(self._available)
+        claims = [self._unpack(value) for value in self._claim]
+        allocations = [self._unpack(value) for value in self._alloc]
+        self._set_width(largest)
+        self._available = self._pack(available)
+        self._claim = [self._pack(value) for value in claims]
+        self._alloc = [self._pack(value) for value in allocations]
+
+    def _pack(self, values):
+        """Упаковывает вектор. Отрицательные и слишком большие значения заменяются на limit: такой запрос отклоняется."""
+        limit = self._limit
+        packed = 0
+        for shift, value in zip(self._shifts, values):
+            value = int(value)
+            packed |= (value if 0 <= value <= limit else limit) << shift
+        return packed
+
+    def _packed(self, vector):
+        return vector if type(vector) is int else self._pack(vector)
+
+    def _unpack(self, packed):
+        return _unpack(packed, self._width, self._shifts)
+
+    def _fits(self, smaller, larger):
+        """smaller <= larger покомпонентно."""
+        guard = self._guard
+        return ((larger | guard) - smaller) & guard == guard
+
+    def _dense(self, rows):
+        matrix = np.zeros((len(rows), self.num_resources), dtype=int)
+        for process_id, packed in enumerate(rows):
+            if packed:
+                matrix[process_id] = self._unpack(packed)
+        return matrix
+
+    @property
+    def available(self):
+        return self._unpack(self._available)
+
+    @property
+    def max_claim(self):
+        return self._dense(self._claim)
+
+    @property
+    def allocation(self):
+        return self._dense(self._alloc)
+
+    @property
+    def need(self):
+        return self.max_claim - self.allocation
+
+    def _grow(self, capacity):
+        extra = capacity - len(self._claim)
+        self._claim.extend([0] * extra)
+        self._alloc.extend([0] * extra)
+
+    def _load_state(self, available, max_claim, allocation):
+        total = available + allocation.sum(axis=0, dtype=int)
+        self._set_width(int(max(total.max(initial=0), max_claim.max(initial=0))))
+        self._available = self._pack(available)
+        self._claim = [self._pack(row) for row in max_claim.tolist()]
+        self._alloc = [self._pack(row) for row in allocation.tolist()]
+
+    def _dispatch_rows(self):
+        # Плотные строки пришлось бы собирать заново на каждое освобождение.
+        return None
+
+    def _need_row(self, process_id):
+        return self._unpack(self._claim[process_id]) - self._unpack(self._alloc[process_id])
+
+    def _allocation_row(self, process_id):
+        return self._unpack(self._alloc[process_id])
+
+    def _needs_fit(self, process_ids):
+        available = self._available
+        return all(self._fits(self._claim[p], available + self._alloc[p]) for p in process_ids)
+
+    def _store_max_claim(self, process_id, max_needs):
+        largest = int(max_needs.max(initial=0))
+        if largest > self._limit >> 1:
+            total = self.available + self.allocation.sum(axis=0)
+            self._repack(max(largest, int(total.max(initial=0))))
+        self._claim[process_id] = self._pack(max_needs)
+
+    def _allocate(self, process_id, request):
+        request = self._packed(request)
+        self._available -= request
+        self._alloc[process_id] += request
+
+    def _deallocate(self, process_id, release):
+        release = self._packed(release)
+        self._available += release
+        self._alloc[process_id] -= release
+
+    def _is_safe_state(self):
+        live = self._live_ids
+        pending = range(self.num_processes) if live is None else live.tolist()
+        claim, alloc, fits = self._claim, self._alloc, self._fits
+        work = self._available
+        sequence = []
+        # Как в эталонном алгоритме, вернувший ресурсы процесс сразу увеличивает work
+        # для следующих в том же проходе.
+        while pending:
+            waiting = []
+            for process_id in pending:
+                held = alloc[process_id]
+                if fits(claim[process_id], work + held):
+                    work += held
+                    sequence.append(process_id)
+                else:
+                    waiting.append(process_id)
+            if len(waiting) == len(pending):
+                self._last_safe_sequence = None
+                return False
+            pending = waiting
+        self._last_safe_sequence = sequence
+        return True
+
+    def _sequence_is_safe(self, sequence):
+        claim, alloc, fits = self._claim, self._alloc, self._fits
+        work = self._available
+        for process_id in sequence:
+            held = alloc[process_id]
+            work += held
+            if not fits(claim[process_id], work):
+                return False
+        return True
+
+    def _log_matrix_state(self, event, process_id, vector):
+        if self._history is not None or self.matrix_logger:
+            super()._log_matrix_state(event, process_id, self._unpack(vector) if type(vector) is int else vector)
+
+    def _validate_request(self, process_id, request):
+        if self.metrics is not None:
+            self.metrics.inc("requests")
+        if not self._live[process_id]:
+            if self.metrics is not None:
+                self.metrics.inc("rejected")
+            logger.error(process_id, "Запрос от незарегистрированного процесса")
+            return False
+        # request <= need равносильно request + allocation <= max_claim; сумма не должна задеть защитные биты.
+        total = self._packed(request) + self._alloc[process_id]
+        if total & self._guard or not self._fits(total, self._claim[process_id]):
+            if self.metrics is not None:
+                self.metrics.inc("rejected")
+            need = self._claim[process_id] - self._alloc[process_id]
+            logger.error(
+                process_id, "Запрос %s превышает оставшуюся потребность %s", self._logged(request), self._logged(need)
+            )
+            return False
+        return True
+
+    def _vector(self, vector):
+        return self._unpack(vector) if type(vector) is int else vector
+
+    def _logged(self, vector):
+        """Аргумент журнала: упакованный вектор распаковывается только при выводе записи."""
+        return _LoggedVector(vector, self._width, self._shifts) if type(vector) is int else vector
+
+    def _grant_now(self, process_id, request):
+        if self._fits(self._packed(request), self._available):
+            return self._try_grant(process_id, request)
+        if self.metrics is not None:
+            self.metrics.inc("blocked_insufficient")
+        logger.wait(process_id, self._logged(request), self._logged(self._available))
+        return False
+
+    def _try_grant(self, process_id, request):
+        packed = self._packed(request)
+        self._allocate(process_id, packed)
+        self._log_matrix_state(EVENT_TENTATIVE, process_id, packed)
+
+        if self._grant_is_safe([process_id]):
+            logger.success(process_id, self._logged(request), self._logged(self._available))
+            self._log_matrix_state(EVENT_GRANTED, process_id, packed)
+            if self.metrics is not None:
+                self.metrics.inc("granted")
+            return True
+
+        self._deallocate(process_id, packed)
+        if self.metrics is not None:
+            self.metrics.inc("deferred_unsafe")
+        logger.deferred(process_id, self._logged(request))
+        self._log_matrix_state(EVENT_ROLLBACK, process_id, packed)
+        return False
+
+    def _log_deferred(self, process_id, request):
+        if self.metrics is not None:
+            self.metrics.inc("deferred_queue")
+        logger.deferred(process_id, self._logged(request))
+
+    def _enqueue_waiter(self, waiter):
+        # Очередь ожидания обслуживает общий код монитора, ему нужны векторы NumPy.
+        waiter.request = self._vector(waiter.request)
+        super()._enqueue_waiter(waiter)
+
+    def _release(self, process_id, release):
+        packed = self._packed(release)
+        if not self._fits(packed, self._alloc[process_id]):
+            allocation = self._logged(self._alloc[process_id])
+            logger.error(process_id, "Попытка освободить %s, когда выделено %s", self._logged(release), allocation)
+            return False
+
+        self._deallocate(process_id, packed)
+        if self.metrics is not None:
+            self.metrics.inc("released")
+        logger.release(process_id, self._logged(release), self._logged(self._available))
+        self._log_matrix_state(EVENT_RELEASE, process_id, packed)
+        return True
+
+    def request_resources(self, process_id, request, blocking=False, timeout=None, deadline=None, priority=0):
+        if self.combining or self.detector is not None or timeout is not None or deadline is not None:
+            return super().request_resources(process_id, request, blocking, timeout, deadline, priority)
+
+        packed = self._pack(request)
+        with self.lock:
+            logger.request(process_id, self._logged(packed))
+            if not self._validate_request(process_id, packed):
+                return False
+            if blocking:
+                return self._request_blocking(process_id, packed, priority)
+
+            while not self._fits(packed, self._available):
+                if self.metrics is not None:
+                    self.metrics.inc("blocked_insufficient")
+                logger.wait(process_id, self._logged(packed), self._logged(self._available))
+                self.condition.wait()
+
+            if self._holds_line(process_id):
+                self._log_deferred(process_id, packed)
+            elif self._try_grant(process_id, packed):
+                self._bypass_queue()
+                return True
+            self.condition.wait()
+            return False
+
+    def try_request(self, process_id, request):
+        packed = self._pack(request)
+        with self.lock:
+            logger.request(process_id, self._logged(packed))
+            return self._validate_request(process_id, packed) and self._try_immediate(process_id, packed)
+
+    def release_resources(self, process_id, release):
+        packed = self._pack(release)
+        with self.lock:
+            if not self._release(process_id, packed):
+                return
+            self._dispatch_waiters()
+            self.condition.notify_all()
@@ -0,0 +1,286 @@
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from logger import logger
+from metrics import MonitorMetrics
+
+
+class _Component:
+    """Независимая группа: процессы, ресурсы, на которые они заявили потребность, и свой монитор."""
+
+    __slots__ = ("number", "processes", "resources", "monitor", "retired")
+
+    def __init__(self, number, processes, resources, monitor):
+        self.number = number
+        self.processes = processes
+        self.resources = resources
+        self.monitor = monitor
+        # Компонента, слитая с другой. Ее монитор больше не используется.
+        self.retired = False
+
+    def row(self, process_id):
+        """Номер процесса в мониторе компоненты: строки идут в порядке processes."""
+        return int(np.searchsorted(self.processes, process_id))
+
+
+class PartitionedMonitor:
+    """
+    Монитор, разбитый на независимые компоненты по объявленным потребностям.
+
+    Процесс и ресурс связаны, если max_claim процесса по ресурсу ненулевой.
+    Каждая компонента связности - отдельный DeadlockPreventerMonitor со своей
+    блокировкой, условием и проверкой безопасности. Состояние безопасно, если
+    безопасна каждая компонента, так как процессы одной компоненты не ждут
+    ресурсов другой. Новая потребность, связывающая компоненты, сливает их в
+    одну; обратно компоненты не разделяются.
+
+    Номера процессов глобальные, векторы ресурсов - полной длины. Неблокирующий
+    запрос, который нельзя выдать сейчас, сразу возвращает False. Монитор
+    компоненты хранит только ее процессы и ресурсы и нумерует процессы по
+    порядку processes; в его журнале и метриках номера локальные.
+
+    У каждой компоненты свои метрики (metrics=MonitorMetrics() включает их),
+    сводку по всем компонентам дает metrics_snapshot(). strategy="detection"
+    запускает детектор в каждой компоненте; детекторы слитых компонент
+    останавливаются.
+    """
+
+    def __init__(self, available_resources, num_processes, **options):
+        self.num_resources = len(available_resources)
+        self.num_processes = num_processes
+        # Показания слитых компонент; метрики живых компонент добавляются при чтении.
+        self._metrics = options.pop("metrics", None)
+        # Параметры мониторов компонент (safety_algorithm, incremental_safety, scheduler, strategy).
+        self._options = options
+        # Слияния выполняются по одному; запросы и освобождения эту блокировку не берут.
+        self._structure_lock = threading.Lock()
+        self._numbers = itertools.count()
+        # Ресурсы и процессы без компоненты: на них еще никто не заявил потребность.
+        self._unowned_available = np.array(available_resources, dtype=int)
+        self._process_component = [None] * num_processes
+        self._resource_component = [None] * self.num_resources
+
+    @property
+    def components(self):
+        with self._structure_lock:
+            return list({id(c): c for c in self._process_component if c is not None}.values())
+
+    @property
+    def available(self):
+        """Сводный вектор available. Компоненты читаются без блокировок, по очереди."""
+        available = self._unowned_available.copy()
+        for component in self.components:
+            available[component.resources] = component.monitor.available
+        return available
+
+    def _global_matrix(self, name):
+        matrix = np.zeros((self.num_processes, self.num_resources), dtype=int)
+        for component in self.components:
+            matrix[np.ix_(component.processes, component.resources)] = getattr(component.monitor, name)
+        return matrix
+
+    def metrics_snapshot(self):
+        """Сводный снимок метрик всех компонент, номера процессов - глобальные (None, если метрики выключены)."""
+        if self._metrics is None:
+            return None
+        total = MonitorMetrics()
+        with self._structure_lock:
+            total.merge(self._metrics)
+            for component in {id(c): c for c in self._process_component if c is not None}.values():
+                with component.monitor.lock:
+                    total.merge(component.monitor.metrics, component.processes)
+        return total.snapshot()
+
+    @property
+    def max_claim(self):
+        return self._global_matrix("max_claim")
+
+    @property
+    def allocation(self):
+        return self._global_matrix("allocation")
+
+    @property
+    def need(self):
+        return self._global_matrix("need")
+
+    def _build_component(self, processes, resources, parts):
+        """Новая компонента с состоянием, скопированным из частей parts и свободных ресурсов."""
+        available = np.zeros(len(resources), dtype=int)
+        loose = [r for r in resources if self._resource_component[r] is None]
+        available[np.searchsorted(resources, loose)] = self._unowned_available[loose]
+        for part in parts:
+            available[np.searchsorted(resources, part.resources)] = part.monitor.available
+
+        metrics = MonitorMetrics() if self._metrics is not None else None
+        monitor = DeadlockPreventerMonitor(available, len(processes), metrics=metrics, **self._options)
+        for part in parts:
+            # Потребности частей могут не помещаться в тип, выбранный по ресурсам новой компоненты.
+            monitor._fit_values(part.monitor.max_claim)
+        for part in parts:
+            block = np.ix_(np.searchsorted(processes, part.processes), np.searchsorted(resources, part.resources))
+            monitor.max_claim[block] = part.monitor.max_claim
+            monitor.allocation[block] = part.monitor.allocation
+            monitor.need[block] = part.monitor.need
+        return _Component(next(self._numbers), processes, resources, monitor)
+
+    def _merge(self, parts, processes, resources):
+        # Блокировки частей берутся в порядке номеров, поэтому два слияния не ждут друг друга.
+        parts = sorted(parts, key=lambda part: part.number)
+        for part in parts:
+            part.monitor.lock.acquire()
+        try:
+            component = self._build_component(processes, resources, parts)
+            for process_id in processes:
+                self._process_component[process_id] = component
+            for resource in resources:
+                self._resource_component[resource] = component
+            self._unowned_available[resources] = 0
+            for part in parts:
+                part.retired = True
+                # Разбуженные ожидающие повторят запрос уже в новой компоненте.
+                part.monitor._retire_waiters()
+                if self._metrics is not None:
+                    self._metrics.merge(part.monitor.metrics, part.processes)
+        finally:
+            for part in parts:
+                part.monitor.lock.release()
+        # Детектор берет блокировку своего монитора, поэтому останавливается после ее освобождения.
+        for part in parts:
+            if part.monitor.detector is not None:
+                part.monitor.detector.stop()
+        logger.system("Компонента: процессы %s, ресурсы %s", processes.tolist(), resources.tolist())
+        return component
+
+    def set_max_claim(self, process_id, max_needs):
+        max_needs = np.array(max_needs, dtype=int)
+        with self._structure_lock:
+            component = self._process_component[process_id]
+            claimed = np.flatnonzero(max_needs)
+            parts = {id(c): c for c in [component, *(self._resource_component[r] for r in claimed)] if c is not None}
+            parts = list(parts.values())
+            outside = component is None or any(self._resource_component[r] is None for r in claimed)
+
+            if not parts and not len(claimed):
+                return
+            if len(parts) > 1 or outside:
+                processes = np.unique(np.concatenate([*(part.processes for part in parts), [process_id]]))
+                resources = np.unique(np.concatenate([*(part.resources for part in parts), claimed]))
+                component = self._merge(parts, processes, resources)
+            component.monitor.set_max_claim(component.row(process_id), max_needs[component.resources])
+
+    def _lock_component(self, process_id):
+        """Захватывает блокировку компоненты процесса. None - у процесса нет компоненты."""
+        while True:
+            component = self._process_component[process_id]
+            if component is None:
+                return None
+            component.monitor.lock.acquire()
+            if not component.retired:
+                return component
+            component.monitor.lock.release()
+
+    def _localize(self, component, process_id, vector):
+        """Вектор в ресурсах компоненты или None, если он задевает чужие ресурсы."""
+        local = vector[component.resources] if component is not None else vector[:0]
+        if np.count_nonzero(local) != np.count_nonzero(vector):
+            logger.error(process_id, "Вектор %s задевает ресурсы вне объявленной потребности", vector)
+            return None
+        return local
+
+    def request_resources(self, process_id, request, blocking=False, timeout=None, deadline=None, priority=0):
+        """Те же параметры, что у DeadlockPreventerMonitor.request_resources; политика - своя у каждой компоненты."""
+        request = np.array(request, dtype=int)
+        if timeout is not None:
+            expires = time.monotonic() + timeout
+            deadline = expires if deadline is None else min(deadline, expires)
+        blocking = blocking or deadline is not None
+        while True:
+            component = self._lock_component(process_id)
+            if component is None:
+                # Без объявленной потребности выполним только пустой запрос.
+                return self._localize(None, process_id, request) is not None
+            monitor = component.monitor
+            row = component.row(process_id)
+            try:
+                logger.request(process_id, request)
+                local = self._localize(component, process_id, request)
+                if local is None or not monitor._validate_request(row, local):
+                    return False
+                if not blocking:
+                    return monitor._try_immediate(row, local)
+                if monitor._request_blocking(row, local, priority, deadline):
+                    return True
+                if not component.retired:
+                    return False
+                # Компоненту слили с другой, пока запрос ждал: повтор в новой.
+            finally:
+                monitor.lock.release()
+
+    def try_request(self, process_id, request):
+        return self.request_resources(process_id, request)
+
+    def allocated(self, process_id):
+        """Как DeadlockPreventerMonitor.allocated; ресурсы вне компоненты процесса - нули."""
+        result = np.zeros(self.num_resources, dtype=int)
+        component = self._lock_component(process_id)
+        if component is None:
+            return result
+        try:
+            result[component.resources] = component.monitor._allocation_row(component.row(process_id))
+        finally:
+            component.monitor.lock.release()
+        return result
+
+    def max_safe_request(self, process_id, per_resource=False):
+        """Как DeadlockPreventerMonitor.max_safe_request; ресурсы вне компоненты процесса - нули."""
+        result = np.zeros(self.num_resources, dtype=int)
+        component = self._lock_component(process_id)
+        if component is None:
+            return result
+        monitor = component.monitor
+        row = component.row(process_id)
+        try:
+            limit = np.minimum(monitor._need_row(row), monitor.available)
+            result[component.resources] = monitor._max_safe_grant(row, limit, per_resource)
+        finally:
+            monitor.lock.release()
+        return result
+
+    def acquire_up_to(self, process_id, request):
+        """Как DeadlockPreventerMonitor.acquire_up_to; возвращает выданный вектор полной длины."""
+        request = np.array(request, dtype=int)
+        result = np.zeros(self.num_resources, dtype=int)
+        component = self._lock_component(process_id)
+        if component is None:
+            self._localize(None, process_id, request)
+            return result
+        monitor = component.monitor
+        row = component.row(process_id)
+        try:
+            logger.request(process_id, request)
+            local = self._localize(component, process_id, request)
+            if local is None or not monitor._validate_request(row, local):
+                return result
+            result[component.resources] = monitor._acquire_up_to(row, local)
+        finally:
+            monitor.lock.release()
+        return result
+
+    def release_resources(self, process_id, release):
+        release = np.array(release, dtype=int)
+        component = self._lock_component(process_id)
+        if component is None:
+            self._localize(None, process_id, release)
+            return
+        monitor = component.monitor
+        try:
+            local = self._localize(component, process_id, release)
+            if local is not None and monitor._release(component.row(process_id), local):
+                monitor._dispatch_waiters()
+                monitor.condition.notify_all()
+        finally:
+            monitor.lock.release()
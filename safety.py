@@ -0,0 +1,190 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def find_safe_sequence_reference(available, allocation, need):
+    """Эталонный алгоритм банкира. Возвращает безопасную последовательность или None."""
+    # 1. Банкир считает свои деньги в сейфе.
+    work = np.copy(available)
+    num_processes = len(need)
+
+    # 2. Составляет список клиентов, которых еще нужно обслужить.
+    finish = [False] * num_processes
+    sequence = []
+
+    # 3. Повторяет попытки, пока находит кого обслужить.
+    while True:
+        found_process = False
+        # 4. Просматривает всех клиентов.
+        for i in range(num_processes):
+            # 5. Ищет клиента (i), которого еще не обслужили И которому хватит денег из сейфа.
+            if not finish[i] and np.all(need[i] <= work):
+                # 6. НАШЕЛ! Гипотетически обслуживает его и забирает весь его кредит.
+                #    Денег в сейфе (work) становится больше.
+                work += allocation[i]
+                finish[i] = True  # Помечает клиента как обслуженного.
+                sequence.append(i)
+                found_process = True
+                break  # Начинает поиск заново с увеличенным капиталом.
+
+        # 7. Если просмотрел всех клиентов и ни одного не смог обслужить - выхода нет.
+        if not found_process:
+            break
+
+    # 8. Если в итоге все клиенты помечены как обслуженные - план существует, состояние безопасное.
+    return sequence if all(finish) else None
+
+
+def find_safe_sequence_vectorized(available, allocation, need):
+    """
+    Векторизованный алгоритм банкира.
+
+    За один проход одним сравнением need <= work находит сразу всех клиентов,
+    которых можно обслужить, и забирает их кредит целиком. Так как work только
+    растет, порядок обслуживания не влияет на вердикт: результат совпадает с
+    эталонным, а число проходов не превышает N.
+
+    work хранится в типе матриц: сравнение узких матриц с int64 расширяло бы их
+    на каждом проходе. Монитор выбирает тип, вмещающий общее число единиц.
+    """
+    work = np.array(available, dtype=need.dtype)
+    pending = np.arange(len(need))
+    sequence = []
+
+    while len(pending):
+        ready = np.all(need[pending] <= work, axis=1)
+        if not ready.any():
+            return None
+        finished = pending[ready]
+        work += allocation[finished].sum(axis=0)
+        sequence.extend(finished.tolist())
+        pending = pending[~ready]
+
+    return sequence
+
+
+def find_deadlocked_processes(available, allocation, request):
+    """
+    Алгоритм обнаружения взаимоблокировки.
+
+    Тот же проход, что у find_safe_sequence_vectorized, но вместо оставшейся
+    потребности need берутся текущие запросы request: процесс без запроса
+    считается способным завершиться и вернуть выделенное. Возвращает номера
+    строк, которые не завершатся ни при каком порядке; пустой список -
+    взаимоблокировки нет.
+    """
+    work = np.array(available, copy=True)
+    pending = np.arange(len(request))
+
+    while len(pending):
+        ready = np.all(request[pending] <= work, axis=1)
+        if not ready.any():
+            break
+        work += allocation[pending[ready]].sum(axis=0)
+        pending = pending[~ready]
+
+    return pending.tolist()
+
+
+def find_safe_sequences_batch(available, allocation, need, sequences=False):
+    """
+    Алгоритм банкира сразу для пачки состояний.
+
+    available - (B, M), allocation и need - (B, N, M); входы с меньшим числом
+    измерений размножаются по пачке (например, одни матрицы и много векторов
+    available). Каждый проход - тот же шаг, что и в
+    find_safe_sequence_vectorized, но для всех состояний одним сравнением
+    need <= work. Проходов не больше N; состояния, где обслуживать больше
+    некого, просто перестают меняться.
+
+    Возвращает булев вектор вердиктов длины B, а при sequences=True - еще и
+    список безопасных последовательностей (None для небезопасных состояний).
+    """
+    available, allocation, need = _broadcast_batch(available, allocation, need)
+    size, num_processes = need.shape[:2]
+    pending = np.ones((size, num_processes), dtype=bool)
+    # Номер прохода, на котором обслужен процесс: порядок для безопасной последовательности.
+    finished_at = np.full((size, num_processes), num_processes, dtype=np.intp)
+    # Состояния, по которым еще идут проходы, и их work. Состояние без продвижения выбывает.
+    active = np.arange(size)
+    work = available.copy()
+
+    for step in range(num_processes):
+        rows = pending[active]
+        ready = rows & np.all(need[active] <= work[:, None, :], axis=2)
+        moved = ready.any(axis=1)
+        active, ready, work = active[moved], ready[moved], work[moved]
+        if not len(active):
+            break
+        work += np.einsum("bn,bnm->bm", ready, allocation[active], dtype=work.dtype)
+        finished_at[active[:, None], np.arange(num_processes)] = np.where(ready, step, finished_at[active])
+        pending[active] = rows[moved] & ~ready
+
+    safe = ~pending.any(axis=1)
+    if not sequences:
+        return safe
+    order = np.argsort(finished_at, axis=1, kind="stable")
+    return safe, [order[b].tolist() if safe[b] else None for b in range(len(safe))]
+
+
+def _broadcast_batch(available, allocation, need):
+    available = np.asarray(available)
+    allocation = np.asarray(allocation)
+    need = np.asarray(need)
+    batch = np.broadcast_shapes(available.shape[:-1], allocation.shape[:-2], need.shape[:-2])
+    if len(batch) > 1:
+        raise ValueError(f"Ожидалась одна ось пачки, получено {batch}")
+    size = batch[0] if batch else 1
+    rows, resources = np.broadcast_shapes(allocation.shape[-2:], need.shape[-2:])
+    return (
+        np.broadcast_to(available, (size, resources)).astype(np.int64),
+        np.broadcast_to(allocation, (size, rows, resources)),
+        np.broadcast_to(need, (size, rows, resources)),
+    )
+
+
+# Пачки больше этого числа состояний делятся между процессами.
+BATCH_SHARD_SIZE = 16384
+
+
+def _evaluate_shard(shard):
+    return find_safe_sequences_batch(*shard)
+
+
+def evaluate_states(available, allocation, need, sequences=False, workers=None, shard_size=BATCH_SHARD_SIZE):
+    """
+    Проверяет безопасность пачки гипотетических состояний, не трогая мониторы.
+
+    Параметры и результат - как у find_safe_sequences_batch. Пачка больше
+    shard_size режется на части по shard_size состояний, которые считаются в
+    ProcessPoolExecutor(workers); workers=0 - всегда в текущем процессе.
+    Результаты частей склеиваются в исходном порядке.
+    """
+    available, allocation, need = _broadcast_batch(available, allocation, need)
+    size = len(available)
+    if workers == 0 or size <= shard_size:
+        return find_safe_sequences_batch(available, allocation, need, sequences)
+
+    # Каждой части - свои непрерывные копии: размноженные представления иначе раздуются при передаче.
+    shards = [
+        (np.ascontiguousarray(available[i : i + shard_size]),
+         np.ascontiguousarray(allocation[i : i + shard_size]),
+         np.ascontiguousarray(need[i : i + shard_size]),
+         sequences)
+        for i in range(0, size, shard_size)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_evaluate_shard, shards))
+    if not sequences:
+        return np.concatenate(results)
+    return (
+        np.concatenate([safe for safe, _ in results]),
+        [sequence for _, shard_sequences in results for sequence in shard_sequences],
+    )
+
+
+SAFETY_ALGORITHMS = {
+    "reference": find_safe_sequence_reference,
+    "vectorized": find_safe_sequence_vectorized,
+}
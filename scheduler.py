@@ -0,0 +1,67 @@
+import abc
+import math
+
+
+class SchedulerPolicy(abc.ABC):
+    """
+    Порядок, в котором монитор рассматривает ожидающие запросы.
+
+    max_bypass - сколько раз запрос в очереди могут обойти: выдать ресурсы
+    запросу, который стоит за ним в порядке политики, или новому запросу.
+    По умолчанию 0 - строгий порядок: пока первый ожидающий не выдан, за ним
+    не выдается никто. Обойденный max_bypass раз запрос снова держит очередь.
+    """
+
+    def __init__(self, max_bypass=0):
+        self.max_bypass = max_bypass
+
+    @abc.abstractmethod
+    def order(self, waiters, monitor):
+        """Ожидающие waiters в порядке рассмотрения."""
+
+
+class FifoPolicy(SchedulerPolicy):
+    """Ожидающие рассматриваются в порядке постановки в очередь."""
+
+    def order(self, waiters, monitor):
+        return waiters
+
+
+class _KeyPolicy(SchedulerPolicy):
+    """Сортировка по key(); при равных ключах - по порядку постановки в очередь."""
+
+    @abc.abstractmethod
+    def key(self, waiter, monitor):
+        """Ключ сортировки: меньший рассматривается раньше."""
+
+    def order(self, waiters, monitor):
+        return sorted(waiters, key=lambda waiter: (self.key(waiter, monitor), waiter.sequence))
+
+
+class PriorityPolicy(_KeyPolicy):
+    """Сначала запросы с большим priority, при равенстве - по очереди."""
+
+    def key(self, waiter, monitor):
+        return -waiter.priority
+
+
+class ShortestNeedPolicy(_KeyPolicy):
+    """Сначала процессы с наименьшей оставшейся потребностью: они быстрее завершатся и вернут ресурсы."""
+
+    def key(self, waiter, monitor):
+        return int(monitor._need_row(waiter.process_id).sum())
+
+
+class DeadlinePolicy(_KeyPolicy):
+    """Сначала запросы с ближайшим сроком (earliest deadline first); без срока - последними."""
+
+    def key(self, waiter, monitor):
+        return waiter.deadline if waiter.deadline is not None else math.inf
+
+
+SCHEDULER_POLICIES = {
+    "fifo": FifoPolicy,
+    "priority": PriorityPolicy,
+    "shortest-need": ShortestNeedPolicy,
+    "deadline": DeadlinePolicy,
+}
@@ -0,0 +1,152 @@
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from logger import logger
+
+_DTYPE = np.int64
+
+
+class SharedMonitorHandle:
+    """
+    Все, что нужно дочернему процессу, чтобы подключиться к монитору.
+
+    Блокировки multiprocessing передаются только при создании процесса,
+    поэтому дескриптор передается через initargs пула или аргументы Process.
+    """
+
+    def __init__(self, name, num_processes, num_resources, lock, condition):
+        self.name = name
+        self.num_processes = num_processes
+        self.num_resources = num_resources
+        self.lock = lock
+        self.condition = condition
+
+
+class SharedMemoryMonitor(DeadlockPreventerMonitor):
+    """
+    Монитор, матрицы которого лежат в multiprocessing.shared_memory.
+
+    Процесс-владелец создает монитор и передает handle() рабочим процессам,
+    которые подключаются через attach() и вызывают request/release напрямую.
+    Кэш безопасной последовательности, история изменений и очередь ожидания
+    локальны для процесса, поэтому инкрементальная проверка и lock-free снимки
+    отключены, а блокирующие запросы ждут на общем межпроцессном условии.
+
+    Маска зарегистрированных процессов тоже лежит в общей памяти: любой
+    процесс может снять слот с учета и занять свободный. Число слотов
+    (num_processes) задается при создании и не растет; сначала заняты все.
+    """
+
+    def __init__(self, available_resources, num_processes, matrix_logger=None, name=None, handle=None, **options):
+        self._handle = handle
+        self._name = name
+        self._owner = handle is None
+        options["incremental_safety"] = False
+        options["snapshot_history"] = None
+        super().__init__(available_resources, num_processes, matrix_logger=matrix_logger, **options)
+        self._live = self._shared_live
+
+    @property
+    def _live_ids(self):
+        # Маску мог изменить другой процесс, поэтому номера не кешируются.
+        live = np.flatnonzero(self._live)
+        return None if len(live) == self.num_processes else live
+
+    @_live_ids.setter
+    def _live_ids(self, value):
+        pass
+
+    @classmethod
+    def attach(cls, handle, matrix_logger=None, **options):
+        """Подключается к монитору, созданному в другом процессе."""
+        return cls([0] * handle.num_resources, handle.num_processes, matrix_logger=matrix_logger, handle=handle, **options)
+
+    def _create_matrices(self, available_resources):
+        m, n = self.num_resources, self.num_processes
+        # За матрицами - маска зарегистрированных процессов, по байту на слот.
+        matrices_size = (m + 3 * n * m) * np.dtype(_DTYPE).itemsize
+        size = matrices_size + n
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(name=self._name, create=True, size=max(size, 1))
+        else:
+            self._shm = shared_memory.SharedMemory(name=self._handle.name)
+
+        buffer = np.ndarray((m + 3 * n * m,), dtype=_DTYPE, buffer=self._shm.buf)
+        available = buffer[:m]
+        max_claim, allocation, need = (buffer[m + k * n * m : m + (k + 1) * n * m].reshape(n, m) for k in range(3))
+        self._shared_live = np.ndarray((n,), dtype=bool, buffer=self._shm.buf, offset=matrices_size)
+        if self._owner:
+            buffer[:] = 0
+            available[:] = available_resources
+            self._shared_live[:] = True
+        return available, max_claim, allocation, need
+
+    def _create_lock(self):
+        if self._owner:
+            lock = multiprocessing.Lock()
+            return lock, multiprocessing.Condition(lock)
+        return self._handle.lock, self._handle.condition
+
+    def register_process(self, max_needs=None):
+        """
+        Занимает свободный слот с наименьшим номером и возвращает его.
+
+        Общий блок памяти не растет: если свободных слотов нет - RuntimeError.
+        """
+        with self.lock:
+            free = np.flatnonzero(~self._live)
+            if not len(free):
+                raise RuntimeError(f"Все {self.num_processes} слотов монитора в общей памяти заняты")
+            process_id = int(free[0])
+            self._live[process_id] = True
+            logger.info(process_id, "Зарегистрирован")
+            if max_needs is not None:
+                self._set_max_claim(process_id, max_needs)
+            return process_id
+
+    def unregister_process(self, process_id):
+        super().unregister_process(process_id)
+        # Свободные слоты ищутся по общей маске; локальный список не нужен.
+        self._free_slots.clear()
+
+    def handle(self):
+        return SharedMonitorHandle(self._shm.name, self.num_processes, self.num_resources, self.lock, self.condition)
+
+    def _request_blocking(self, process_id, request, priority=0, deadline=None):
+        # Очередь ожидания локальна, поэтому priority здесь не учитывается.
+        while not self._try_immediate(process_id, request):
+            if deadline is None:
+                self.condition.wait()
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self.condition.wait(remaining)
+        return True
+
+    def close(self):
+        """Отключается от общей памяти; владелец также удаляет блок."""
+        # Представления numpy держат буфер, их нужно отпустить до закрытия.
+        self.available = self.max_claim = self.allocation = self.need = None
+        self._live = self._shared_live = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+_worker_monitor = None
+
+
+def init_worker(handle):
+    """Инициализатор для ProcessPoolExecutor: подключает процесс к общему монитору."""
+    global _worker_monitor
+    _worker_monitor = SharedMemoryMonitor.attach(handle)
+
+
+def worker_monitor():
+    """Монитор, подключенный в текущем рабочем процессе через init_worker."""
+    return _worker_monitor
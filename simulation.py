@@ -0,0 +1,335 @@
+import argparse
+import heapq
+import itertools
+import json
+import random
+import time
+
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from logger import LEVEL_OFF, logger
+from scheduler import SCHEDULER_POLICIES
+
+
+class Sleep:
+    __slots__ = ("seconds",)
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+
+class Claim:
+    __slots__ = ("process_id", "max_claim")
+
+    def __init__(self, process_id, max_claim):
+        self.process_id = process_id
+        self.max_claim = max_claim
+
+
+class Register:
+    """Регистрирует процесс; генератор получает его номер."""
+
+    __slots__ = ("max_claim",)
+
+    def __init__(self, max_claim):
+        self.max_claim = max_claim
+
+
+class Unregister:
+    __slots__ = ("process_id",)
+
+    def __init__(self, process_id):
+        self.process_id = process_id
+
+
+class Request:
+    """Блокирующий запрос; генератор продолжается после выдачи и получает True (False - отклонен)."""
+
+    __slots__ = ("process_id", "vector")
+
+    def __init__(self, process_id, vector):
+        self.process_id = process_id
+        self.vector = vector
+
+
+class Release:
+    __slots__ = ("process_id", "vector")
+
+    def __init__(self, process_id, vector):
+        self.process_id = process_id
+        self.vector = vector
+
+
+class _SimWaiter:
+    """Ожидающий запрос процесса симуляции: выдача планирует продолжение процесса на виртуальных часах."""
+
+    __slots__ = (
+        "process_id",
+        "request",
+        "granted",
+        "retired",
+        "priority",
+        "deadline",
+        "sequence",
+        "enqueued_at",
+        "bypassed",
+        "simulation",
+        "process",
+        "since",
+    )
+
+    def __init__(self, simulation, process, process_id, request):
+        self.process_id = process_id
+        self.request = request
+        self.granted = False
+        self.retired = False
+        self.priority = 0
+        self.deadline = None
+        self.sequence = None
+        self.enqueued_at = None
+        self.bypassed = 0
+        self.simulation = simulation
+        self.process = process
+        self.since = simulation.now
+
+    def notify(self):
+        simulation = self.simulation
+        simulation.wait_times.append(simulation.now - self.since)
+        simulation.schedule(0, simulation._step, self.process, self.granted)
+
+
+class Simulation:
+    """
+    Дискретно-событийная симуляция нагрузки на монитор с виртуальными часами.
+
+    Процессы - генераторы, которые выдают команды Sleep, Claim, Register,
+    Unregister, Request и Release. Решения принимает тот же
+    DeadlockPreventerMonitor (очередь ожидания, планировщик, проверка
+    безопасности), но без потоков: ожидание - это событие в куче, а не sleep.
+    """
+
+    def __init__(self, monitor, seed=None):
+        self.monitor = monitor
+        self.random = random.Random(seed)
+        self.now = 0.0
+        self._heap = []
+        self._sequence = itertools.count()
+        self._total = monitor.available.copy()
+        # Статистика: время ожидания выданных запросов и интеграл занятых ресурсов по времени.
+        self.requests = 0
+        self.wait_times = []
+        self.completed = 0
+        self.busy_seconds = np.zeros(monitor.num_resources)
+        self.peak_processes = 0
+        self._running = 0
+
+    def schedule(self, delay, callback, *args):
+        heapq.heappush(self._heap, (self.now + delay, next(self._sequence), callback, args))
+
+    def spawn(self, process, delay=0):
+        self._running += 1
+        self.peak_processes = max(self.peak_processes, self._running)
+        self.schedule(delay, self._step, process, None)
+
+    def run(self, until=None):
+        """Обрабатывает события до опустошения кучи или до момента until."""
+        heap = self._heap
+        monitor = self.monitor
+        wall_start = time.perf_counter()
+        while heap and (until is None or heap[0][0] <= until):
+            when, _, callback, args = heapq.heappop(heap)
+            if when > self.now:
+                self.busy_seconds += (self._total - monitor.available) * (when - self.now)
+                self.now = when
+            callback(*args)
+        if until is not None and until > self.now:
+            self.busy_seconds += (self._total - monitor.available) * (until - self.now)
+            self.now = until
+        return SimulationResult(self, time.perf_counter() - wall_start)
+
+    def _step(self, process, value):
+        try:
+            command = process.send(value)
+        except StopIteration:
+            self._running -= 1
+            self.completed += 1
+            return
+
+        monitor = self.monitor
+        if isinstance(command, Sleep):
+            self.schedule(command.seconds, self._step, process, None)
+        elif isinstance(command, Request):
+            self._request(process, command.process_id, np.array(command.vector, dtype=int))
+        elif isinstance(command, Release):
+            monitor.release_resources(command.process_id, command.vector)
+            self.schedule(0, self._step, process, None)
+        elif isinstance(command, Claim):
+            monitor.set_max_claim(command.process_id, command.max_claim)
+            self.schedule(0, self._step, process, None)
+        elif isinstance(command, Register):
+            self.schedule(0, self._step, process, monitor.register_process(command.max_claim))
+        elif isinstance(command, Unregister):
+            monitor.unregister_process(command.process_id)
+            self.schedule(0, self._step, process, None)
+        else:
+            raise TypeError(f"Неизвестная команда симуляции: {command!r}")
+
+    def _request(self, process, process_id, request):
+        monitor = self.monitor
+        self.requests += 1
+        with monitor.lock:
+            logger.request(process_id, request)
+            if not monitor._validate_request(process_id, request):
+                self.schedule(0, self._step, process, False)
+                return
+            if monitor._admit_or_enqueue(_SimWaiter(self, process, process_id, request)):
+                self.wait_times.append(0.0)
+                self.schedule(0, self._step, process, True)
+
+
+class SimulationResult:
+    def __init__(self, simulation, wall_seconds):
+        self.virtual_seconds = simulation.now
+        self.wall_seconds = wall_seconds
+        self.completed = simulation.completed
+        self.requests = simulation.requests
+        self.peak_processes = simulation.peak_processes
+        self.wait_times = np.array(simulation.wait_times)
+        total = simulation._total
+        duration = simulation.now or 1.0
+        self.utilization = np.divide(simulation.busy_seconds / duration, total, where=total > 0, out=np.zeros(len(total)))
+
+    def summary(self):
+        waits = self.wait_times
+        percentile = (lambda q: float(np.percentile(waits, q))) if len(waits) else (lambda q: 0.0)
+        return {
+            "virtual_seconds": self.virtual_seconds,
+            "wall_seconds": self.wall_seconds,
+            "completed_processes": self.completed,
+            "peak_processes": self.peak_processes,
+            "requests": self.requests,
+            "granted": len(waits),
+            "wait_mean": float(waits.mean()) if len(waits) else 0.0,
+            "wait_p50": percentile(50),
+            "wait_p99": percentile(99),
+            "utilization": [round(float(u), 4) for u in self.utilization],
+        }
+
+
+def worker_body(simulation, process_id, max_claim):
+    """Сценарий WorkerThread.run: те же случайные запросы, удержания и освобождения."""
+    rng = simulation.random
+    max_claim = np.array(max_claim, dtype=int)
+    allocated = np.zeros(len(max_claim), dtype=int)
+
+    for _ in range(rng.randint(2, 4)):
+        yield Sleep(rng.uniform(0.5, 1.5))
+        needed = max_claim - allocated
+        if np.all(needed == 0):
+            break
+
+        request = np.array([rng.randint(0, n) if n > 0 else 0 for n in needed], dtype=int)
+        if np.all(request == 0):
+            continue
+
+        yield Request(process_id, request)
+        allocated += request
+        yield Sleep(rng.uniform(1, 2.0))
+
+        if np.any(allocated > 0):
+            release = np.array([rng.randint(0, a) for a in allocated], dtype=int)
+            if np.any(release > 0):
+                yield Release(process_id, release)
+                allocated -= release
+
+    if np.any(allocated > 0):
+        yield Release(process_id, allocated)
+
+
+def random_max_claim(rng, total_resources):
+    """Максимальная потребность, как в main.py: от 2 (или меньше, если ресурса меньше) до всего ресурса."""
+    return [rng.randint(min(2, total), total) for total in total_resources]
+
+
+def fixed_worker(simulation, process_id, total_resources):
+    """Процесс с заранее выделенным номером, как поток WorkerThread в main.py."""
+    max_claim = random_max_claim(simulation.random, total_resources)
+    yield Claim(process_id, max_claim)
+    yield from worker_body(simulation, process_id, max_claim)
+
+
+def arriving_worker(simulation, total_resources):
+    """Процесс, который регистрируется при появлении и снимается с учета по завершении."""
+    max_claim = random_max_claim(simulation.random, total_resources)
+    process_id = yield Register(max_claim)
+    yield from worker_body(simulation, process_id, max_claim)
+    yield Unregister(process_id)
+
+
+def poisson_arrivals(simulation, rate, until, factory):
+    """Планирует пуассоновский поток новых процессов с интенсивностью rate в секунду до момента until."""
+
+    def schedule_next():
+        delay = simulation.random.expovariate(rate)
+        if simulation.now + delay <= until:
+            simulation.schedule(delay, arrive)
+
+    def arrive():
+        simulation.spawn(factory(simulation))
+        schedule_next()
+
+    schedule_next()
+
+
+def simulate(total_resources, processes=0, arrival_rate=0.0, duration=3600.0, seed=None, **options):
+    """
+    Симулирует processes процессов, стартующих сразу, и/или пуассоновский поток
+    arrival_rate процессов в секунду в течение duration секунд.
+
+    Консольный лог на время симуляции выключается: иначе форматирование и
+    вывод каждого события занимают больше времени, чем сами решения монитора.
+    """
+    level, categories = logger.level, logger.categories
+    logger.set_level(LEVEL_OFF)
+    try:
+        monitor = DeadlockPreventerMonitor(total_resources, processes, **options)
+        simulation = Simulation(monitor, seed)
+        for process_id in range(processes):
+            simulation.spawn(fixed_worker(simulation, process_id, total_resources))
+        if arrival_rate > 0:
+            poisson_arrivals(simulation, arrival_rate, duration, lambda sim: arriving_worker(sim, total_resources))
+        return simulation.run()
+    finally:
+        logger.set_level(level, categories)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Discrete-event simulation of the monitor workload on a virtual clock.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("-r", "--resources", type=int, nargs="+", required=True, help="Total units per resource.")
+    parser.add_argument("-p", "--processes", type=int, default=0, help="Processes started at time 0 (as in main.py).")
+    parser.add_argument("-a", "--arrival-rate", type=float, default=0.0,
+                        help="Poisson arrivals of new processes per virtual second.")
+    parser.add_argument("-d", "--duration", type=float, default=3600.0, help="Arrival window, virtual seconds.")
+    parser.add_argument("--seed", type=int, help="Random seed for a reproducible run.")
+    parser.add_argument("-s", "--scheduler", choices=sorted(SCHEDULER_POLICIES), default="fifo")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    args = parser.parse_args()
+
+    result = simulate(
+        args.resources,
+        processes=args.processes,
+        arrival_rate=args.arrival_rate,
+        duration=args.duration,
+        seed=args.seed,
+        scheduler=args.scheduler,
+    )
+    summary = result.summary()
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for key, value in summary.items():
+            print(f"{key:<20} {value}")
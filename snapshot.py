@@ -0,0 +1,116 @@
+import time
+
+import numpy as np
+
+from logger import ALLOCATION_DELTA, EVENT_MAX_CLAIM
+
+# Столько попыток прочитать состояние без блокировки, прежде чем взять ее.
+SNAPSHOT_RETRIES = 100
+
+
+class SeqLock:
+    """
+    Блокировка монитора со счетчиком версий (seqlock).
+
+    Версия нечетная, пока блокировка захвачена, и четная, когда свободна.
+    Читатель копирует состояние без блокировки и принимает копию, только если
+    версия до и после копирования одинакова и четна. Условия монитора работают
+    поверх этой обертки, поэтому ожидание на условии тоже меняет версию.
+    """
+
+    def __init__(self, lock):
+        self._lock = lock
+        self.version = 0
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(blocking, timeout):
+            self.version += 1
+            return True
+        return False
+
+    def release(self):
+        self.version += 1
+        self._lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class Change:
+    """Изменение состояния: событие монитора и версия, при которой оно произошло."""
+
+    __slots__ = ("version", "event", "process_id", "vector")
+
+    def __init__(self, version, event, process_id, vector):
+        self.version = version
+        self.event = event
+        self.process_id = process_id
+        self.vector = vector
+
+
+class MonitorSnapshot:
+    """Согласованная копия матриц монитора на момент версии version."""
+
+    def __init__(self, version, available, max_claim, allocation):
+        self.version = version
+        self.available = available
+        self.max_claim = max_claim
+        self.allocation = allocation
+
+    @property
+    def need(self):
+        return self.max_claim - self.allocation
+
+    def apply(self, changes):
+        """Переносит снимок вперед по списку изменений из changes_since()."""
+        start = self.version
+        for change in changes:
+            if change.version < start:
+                continue
+            if change.process_id >= len(self.allocation):
+                # Монитор увеличил матрицы: новые строки нулевые.
+                rows = max(change.process_id + 1, 2 * len(self.allocation))
+                self.max_claim = _grow(self.max_claim, rows)
+                self.allocation = _grow(self.allocation, rows)
+            if change.event == EVENT_MAX_CLAIM:
+                self.max_claim[change.process_id] = change.vector
+            sign = ALLOCATION_DELTA.get(change.event, 0)
+            if sign:
+                self.allocation[change.process_id] += sign * change.vector
+                self.available -= sign * change.vector
+            self.version = change.version + 1
+        return self
+
+
+def _grow(matrix, rows):
+    grown = np.zeros((rows, matrix.shape[1]), dtype=matrix.dtype)
+    grown[: len(matrix)] = matrix
+    return grown
+
+
+def read_consistent(seqlock, read, fallback_lock):
+    """
+    Выполняет read() без блокировки до получения согласованного результата.
+
+    Возвращает (версия, результат). После SNAPSHOT_RETRIES неудачных попыток
+    читает под fallback_lock, чтобы постоянная запись не откладывала читателя
+    бесконечно.
+    """
+    for _ in range(SNAPSHOT_RETRIES):
+        version = seqlock.version
+        if version & 1:
+            time.sleep(0)
+            continue
+        try:
+            result = read()
+        except (ValueError, IndexError, RuntimeError):
+            # Копия попала на перестройку массивов писателем.
+            continue
+        if seqlock.version == version:
+            return version, result
+    with fallback_lock:
+        # Под блокировкой версия нечетная; снимок соответствует версии после ее освобождения.
+        return seqlock.version + 1, read()
@@ -0,0 +1,204 @@
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from derived_need_monitor import DerivedNeedMonitor
+from packed_monitor import PACKED_MAX_PROCESSES, PACKED_MAX_RESOURCES, PackedMonitor
+
+# Порог плотности max_claim, ниже которого create_monitor выбирает разреженное хранилище.
+SPARSE_DENSITY = 0.1
+# Без известных заранее потребностей разреженное хранилище выбирается по числу ресурсов.
+SPARSE_MIN_RESOURCES = 256
+
+
+class SparseMonitor(DeadlockPreventerMonitor):
+    """
+    Монитор с разреженными матрицами в формате CSR.
+
+    Для каждого процесса хранятся только ресурсы, на которые он заявил
+    потребность (или которые ему еще выделены): у allocation и need тот же
+    шаблон ненулевых элементов, что у max_claim. Память и проверка безопасности
+    пропорциональны числу ненулевых потребностей, а не N·M. Атрибуты max_claim,
+    allocation и need собирают плотные копии и нужны только для логов и отладки.
+
+    Параметр safety_algorithm не используется: проверка всегда разреженная.
+    """
+
+    def _init_state(self, available_resources):
+        self.available = np.array(available_resources, dtype=int)
+        # Строка p занимает элементы _indptr[p]:_indptr[p + 1]; _indices - номера ресурсов.
+        self._indptr = np.zeros(self.num_processes + 1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int64)
+        self._claim = np.zeros(0, dtype=int)
+        self._alloc = np.zeros(0, dtype=int)
+        self._need = np.zeros(0, dtype=int)
+
+    @property
+    def nnz(self):
+        return len(self._indices)
+
+    def _dense(self, data):
+        rows = len(self._indptr) - 1
+        matrix = np.zeros((rows, self.num_resources), dtype=int)
+        matrix[np.repeat(np.arange(rows), np.diff(self._indptr)), self._indices] = data
+        return matrix
+
+    @property
+    def max_claim(self):
+        return self._dense(self._claim)
+
+    @property
+    def allocation(self):
+        return self._dense(self._alloc)
+
+    @property
+    def need(self):
+        return self._dense(self._need)
+
+    def _grow(self, capacity):
+        extra = capacity + 1 - len(self._indptr)
+        self._indptr = np.concatenate([self._indptr, np.full(extra, self._indptr[-1])])
+
+    def _load_state(self, available, max_claim, allocation):
+        self.available = np.array(available, dtype=int)
+        stored = (max_claim != 0) | (allocation != 0)
+        # np.nonzero перечисляет элементы по строкам - это и есть порядок CSR.
+        _, self._indices = np.nonzero(stored)
+        self._indptr = np.zeros(len(stored) + 1, dtype=np.int64)
+        np.cumsum(stored.sum(axis=1), out=self._indptr[1:])
+        self._claim = max_claim[stored].astype(int)
+        self._alloc = allocation[stored].astype(int)
+        self._need = self._claim - self._alloc
+
+    def _span(self, process_id):
+        return self._indptr[process_id], self._indptr[process_id + 1]
+
+    def _row(self, data, process_id):
+        start, end = self._span(process_id)
+        row = np.zeros(self.num_resources, dtype=int)
+        row[self._indices[start:end]] = data[start:end]
+        return row
+
+    def _dispatch_rows(self):
+        # Плотные строки пришлось бы собирать заново на каждое освобождение.
+        return None
+
+    def _need_row(self, process_id):
+        return self._row(self._need, process_id)
+
+    def _allocation_row(self, process_id):
+        return self._row(self._alloc, process_id)
+
+    def _needs_fit(self, process_ids):
+        for process_id in process_ids:
+            start, end = self._span(process_id)
+            if np.any(self._need[start:end] > self.available[self._indices[start:end]]):
+                return False
+        return True
+
+    def _store_max_claim(self, process_id, max_needs):
+        start, end = self._span(process_id)
+        allocation = self._allocation_row(process_id)
+        columns = np.flatnonzero((max_needs != 0) | (allocation != 0))
+        claim = max_needs[columns]
+        held = allocation[columns]
+
+        self._indices = np.concatenate([self._indices[:start], columns, self._indices[end:]])
+        self._claim = np.concatenate([self._claim[:start], claim, self._claim[end:]])
+        self._alloc = np.concatenate([self._alloc[:start], held, self._alloc[end:]])
+        self._need = np.concatenate([self._need[:start], claim - held, self._need[end:]])
+        self._indptr[process_id + 1 :] += len(columns) - (end - start)
+
+    def _allocate(self, process_id, request):
+        start, end = self._span(process_id)
+        # Проверенный запрос ненулевой только в столбцах строки.
+        part = request[self._indices[start:end]]
+        self.available -= request
+        self._alloc[start:end] += part
+        self._need[start:end] -= part
+
+    def _deallocate(self, process_id, release):
+        start, end = self._span(process_id)
+        part = release[self._indices[start:end]]
+        self.available += release
+        self._alloc[start:end] -= part
+        self._need[start:end] += part
+
+    def _entries(self):
+        """(строка, столбец, need, allocation) ненулевых элементов живых процессов."""
+        rows = np.repeat(np.arange(len(self._indptr) - 1), np.diff(self._indptr))
+        if self._live_ids is None:
+            return rows, self._indices, self._need, self._alloc
+        live = self._live[rows]
+        return rows[live], self._indices[live], self._need[live], self._alloc[live]
+
+    def _is_safe_state(self):
+        rows, columns, need, allocation = self._entries()
+        pending = self._live_ids if self._live_ids is not None else np.arange(self.num_processes)
+        work = self.available.copy()
+        blocked = np.zeros(len(self._indptr) - 1, dtype=bool)
+        sequence = []
+
+        while len(pending):
+            # Процесс готов, если ни один его элемент need не превышает work.
+            blocked[:] = False
+            blocked[rows[need > work[columns]]] = True
+            ready = ~blocked[pending]
+            if not ready.any():
+                self._last_safe_sequence = None
+                return False
+            finished = pending[ready]
+            sequence.extend(finished.tolist())
+            pending = pending[~ready]
+
+            done = ~blocked[rows]
+            np.add.at(work, columns[done], allocation[done])
+            rows, columns, need, allocation = rows[~done], columns[~done], need[~done], allocation[~done]
+
+        self._last_safe_sequence = sequence
+        return True
+
+    def _sequence_is_safe(self, sequence):
+        rows, columns, need, allocation = self._entries()
+        rank = np.empty(len(self._indptr) - 1, dtype=np.int64)
+        rank[np.asarray(sequence)] = np.arange(len(sequence))
+
+        # Внутри каждого столбца элементы идут в порядке последовательности; work перед
+        # процессом - available плюс сумма выделений предшествующих ему по этому столбцу.
+        order = np.lexsort((rank[rows], columns))
+        columns, need, allocation = columns[order], need[order], allocation[order]
+        before = np.cumsum(allocation) - allocation
+        group_starts = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]]) if len(columns) else columns
+        before -= np.repeat(before[group_starts], np.diff(np.r_[group_starts, len(columns)]))
+        return bool(np.all(need <= self.available[columns] + before))
+
+
+def create_monitor(available_resources, num_processes, max_claims=None, derived_need=False, **options):
+    """
+    Создает монитор с подходящим хранилищем матриц.
+
+    Если потребности max_claims известны заранее, разреженное хранилище выбирается
+    при плотности ниже SPARSE_DENSITY, и потребности сразу объявляются. Иначе оно
+    выбирается при числе ресурсов не меньше SPARSE_MIN_RESOURCES. Плотный монитор
+    с не более чем PACKED_MAX_RESOURCES ресурсами и PACKED_MAX_PROCESSES процессами
+    хранит векторы упакованными (PackedMonitor). Остальные плотные мониторы при
+    derived_need=True не хранят матрицу need (DerivedNeedMonitor).
+    """
+    num_resources = len(available_resources)
+    if max_claims is not None:
+        max_claims = np.asarray(max_claims, dtype=int)
+        density = np.count_nonzero(max_claims) / max(max_claims.size, 1)
+        sparse = density < SPARSE_DENSITY
+    else:
+        sparse = num_resources >= SPARSE_MIN_RESOURCES
+
+    if sparse:
+        monitor_class = SparseMonitor
+    elif num_resources <= PACKED_MAX_RESOURCES and num_processes <= PACKED_MAX_PROCESSES:
+        monitor_class = PackedMonitor
+    else:
+        monitor_class = DerivedNeedMonitor if derived_need else DeadlockPreventerMonitor
+    monitor = monitor_class(available_resources, num_processes, **options)
+    if max_claims is not None:
+        for process_id, max_needs in enumerate(max_claims):
+            monitor.set_max_claim(process_id, max_needs)
+    return monitor
@@ -0,0 +1,88 @@
+import asyncio
+
+import numpy as np
+
+from async_monitor import AsyncDeadlockPreventerMonitor
+
+
+def test_coroutines_avoid_deadlock():
+    async def worker(monitor, pid, first, second):
+        await monitor.set_max_claim(pid, [1, 1])
+        await monitor.request_resources(pid, first)
+        await asyncio.sleep(0.01)
+        await monitor.request_resources(pid, second)
+        await monitor.release_resources(pid, [1, 1])
+
+    async def scenario():
+        monitor = AsyncDeadlockPreventerMonitor([1, 1], 2)
+        await asyncio.wait_for(
+            asyncio.gather(worker(monitor, 0, [1, 0], [0, 1]), worker(monitor, 1, [0, 1], [1, 0])), timeout=3
+        )
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    assert np.array_equal(monitor.available, [1, 1])
+
+
+def test_many_logical_processes_on_one_loop():
+    num_processes = 200
+
+    async def worker(monitor, pid):
+        await monitor.set_max_claim(pid, [2, 1])
+        for _ in range(3):
+            await monitor.request_resources(pid, [1, 1])
+            await monitor.request_resources(pid, [1, 0])
+            await asyncio.sleep(0)
+            await monitor.release_resources(pid, [2, 1])
+
+    async def scenario():
+        monitor = AsyncDeadlockPreventerMonitor([10, 5], num_processes)
+        await asyncio.wait_for(asyncio.gather(*(worker(monitor, pid) for pid in range(num_processes))), timeout=20)
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    assert np.array_equal(monitor.available, [10, 5])
+    assert not monitor.monitor._wait_queue
+
+
+def test_cancelled_request_leaves_queue():
+    async def scenario():
+        monitor = AsyncDeadlockPreventerMonitor([1], 2)
+        await monitor.set_max_claim(0, [1])
+        await monitor.set_max_claim(1, [1])
+        await monitor.request_resources(0, [1])
+        with_timeout = asyncio.wait_for(monitor.request_resources(1, [1]), timeout=0.05)
+        try:
+            await with_timeout
+        except asyncio.TimeoutError:
+            pass
+        assert not monitor.monitor._wait_queue
+        await monitor.release_resources(0, [1])
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    assert np.array_equal(monitor.available, [1])
+
+
+def test_cancelling_retired_request():
+    async def scenario():
+        monitor = AsyncDeadlockPreventerMonitor([1], 2)
+        await monitor.set_max_claim(0, [1])
+        await monitor.set_max_claim(1, [1])
+        await monitor.request_resources(0, [1])
+        task = asyncio.create_task(monitor.request_resources(1, [1]))
+        while not monitor.monitor._wait_queue:
+            await asyncio.sleep(0.001)
+        # Запрос выведен из очереди (как жертва взаимоблокировки) и отменен до того, как корутина это увидела.
+        with monitor.monitor.lock:
+            monitor.monitor._fail_waiters(1)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await monitor.release_resources(0, [1])
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    assert np.array_equal(monitor.available, [1])
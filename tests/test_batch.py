@@ -0,0 +1,63 @@
+import threading
+
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+
+
+def test_request_many_grants_whole_safe_batch():
+    monitor = DeadlockPreventerMonitor([4, 4], 3)
+    for pid in range(3):
+        monitor.set_max_claim(pid, [1, 1])
+
+    results = monitor.request_many([(0, [1, 1]), (1, [1, 0]), (2, [2, 0])])
+    assert results == [True, True, False]  # последний превышает потребность
+    assert np.array_equal(monitor.available, [2, 3])
+
+    assert monitor.release_many([(0, [1, 1]), (1, [1, 0])]) == [True, True]
+    assert np.array_equal(monitor.available, [4, 4])
+
+
+def test_request_many_falls_back_to_greedy_when_batch_unsafe():
+    monitor = DeadlockPreventerMonitor([1, 1], 2)
+    monitor.set_max_claim(0, [1, 1])
+    monitor.set_max_claim(1, [1, 1])
+
+    # Вместе эти запросы ведут к взаимной блокировке, поэтому выдается только первый.
+    assert monitor.request_many([(0, [1, 0]), (1, [0, 1])]) == [True, False]
+    assert np.array_equal(monitor.allocation, [[1, 0], [0, 0]])
+
+
+def test_request_many_counts_earlier_requests_of_same_process():
+    monitor = DeadlockPreventerMonitor([4, 4], 1)
+    monitor.set_max_claim(0, [1, 1])
+
+    # Вместе запросы превышают потребность: второй отклоняется, а не выделяется сверх max_claim.
+    assert monitor.request_many([(0, [1, 1]), (0, [1, 1])]) == [True, False]
+    assert np.array_equal(monitor.allocation, [[1, 1]])
+    assert np.array_equal(monitor.need, [[0, 0]])
+
+    monitor.set_max_claim(0, [3, 3])
+    assert monitor.request_many([(0, [1, 0]), (0, [0, 1]), (0, [1, 2])]) == [True, True, False]
+    assert np.array_equal(monitor.allocation, [[2, 2]])
+
+
+def test_combining_mode_keeps_resources_consistent():
+    monitor = DeadlockPreventerMonitor([8, 8, 8], 8, combining=True)
+    granted = [0] * 8
+
+    def worker(pid):
+        monitor.set_max_claim(pid, [2, 2, 2])
+        for _ in range(50):
+            if monitor.request_resources(pid, [1, 1, 1]):
+                granted[pid] += 1
+                monitor.release_resources(pid, [1, 1, 1])
+
+    threads = [threading.Thread(target=worker, args=(pid,)) for pid in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert sum(granted) > 0
+    assert np.array_equal(monitor.available, [8, 8, 8])
+    assert not monitor._publications
@@ -0,0 +1,29 @@
+from benchmark import benchmark_latency, compare_results
+
+
+def entry(key, **metrics):
+    return {"key": key, "metrics": metrics}
+
+
+def test_compare_flags_only_regressions():
+    baseline = {
+        "safety_check": [entry("n=10", p99_us=100.0, count=10)],
+        "latency": [entry("threads=2", ops_per_sec=1000.0, request={"total": {"p50_us": 10.0}})],
+    }
+    current = {
+        "safety_check": [entry("n=10", p99_us=150.0, count=99)],
+        "latency": [entry("threads=2", ops_per_sec=1200.0, request={"total": {"p50_us": 10.5}})],
+    }
+    regressions = compare_results(baseline, current, tolerance=0.2)
+    assert [name for name, *_ in regressions] == ["safety_check/n=10/p99_us"]
+
+    current["latency"][0]["metrics"]["ops_per_sec"] = 500.0
+    assert len(compare_results(baseline, current, tolerance=0.2)) == 2
+
+
+def test_latency_benchmark_splits_lock_wait_and_hold():
+    metrics = benchmark_latency(num_processes=2, num_resources=3, duration=0.2)
+    assert metrics["ops_per_sec"] > 0
+    request = metrics["request"]
+    assert request["total"]["count"] == request["in_lock"]["count"] > 0
+    assert request["in_lock"]["p50_us"] <= request["total"]["p50_us"]
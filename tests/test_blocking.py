@@ -0,0 +1,99 @@
+import threading
+import time
+
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor, _Waiter
+
+
+def wait_for_queue(monitor, length, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with monitor.lock:
+            if len(monitor._wait_queue) == length:
+                return True
+        time.sleep(0.01)
+    return False
+
+
+def test_release_wakes_only_satisfiable_waiter():
+    monitor = DeadlockPreventerMonitor([1, 1], 3)
+    monitor.set_max_claim(0, [1, 1])
+    monitor.set_max_claim(1, [1, 0])
+    monitor.set_max_claim(2, [0, 1])
+    assert monitor.request_resources(0, [1, 1], blocking=True)
+
+    granted = []
+    threads = [
+        threading.Thread(target=lambda pid=pid, req=req: granted.append(monitor.request_resources(pid, req, blocking=True)))
+        for pid, req in ((1, [1, 0]), (2, [0, 1]))
+    ]
+    for thread in threads:
+        thread.start()
+    assert wait_for_queue(monitor, 2)
+
+    monitor.release_resources(0, [1, 0])
+    threads[0].join(timeout=2)
+    assert not threads[0].is_alive()
+    assert wait_for_queue(monitor, 1)
+    assert threads[1].is_alive()
+
+    monitor.release_resources(0, [0, 1])
+    threads[1].join(timeout=2)
+    assert granted == [True, True]
+    assert np.array_equal(monitor.available, [0, 0])
+
+
+def test_blocking_mode_prevents_deadlock():
+    monitor = DeadlockPreventerMonitor([1, 1], 2)
+
+    def worker(pid, first, second):
+        monitor.set_max_claim(pid, [1, 1])
+        monitor.request_resources(pid, first, blocking=True)
+        time.sleep(0.1)
+        monitor.request_resources(pid, second, blocking=True)
+        monitor.release_resources(pid, [1, 1])
+
+    threads = [
+        threading.Thread(target=worker, args=(0, [1, 0], [0, 1]), daemon=True),
+        threading.Thread(target=worker, args=(1, [0, 1], [1, 0]), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=3)
+    assert not any(thread.is_alive() for thread in threads)
+    assert np.array_equal(monitor.available, [1, 1])
+
+
+class PerWaiterMonitor(DeadlockPreventerMonitor):
+    """Без пакетного отбора: каждый помещающийся запрос проверяется полностью."""
+
+    def _dispatch_rows(self):
+        return None
+
+
+def test_batched_dispatch_grants_same_waiters_as_full_checks():
+    rng = np.random.default_rng(11)
+    for _ in range(40):
+        total = rng.integers(2, 7, size=3)
+        claims = rng.integers(0, total + 1, size=(12, 3))
+        held = rng.integers(0, claims + 1) // 2
+        # Доля оставшейся потребности, которую запрашивает каждый ожидающий.
+        fractions = rng.random((12, 3))
+        results = []
+        for monitor_class in (DeadlockPreventerMonitor, PerWaiterMonitor):
+            monitor = monitor_class(total, 12)
+            for pid in range(12):
+                monitor.set_max_claim(pid, claims[pid])
+                monitor.try_request(pid, held[pid])
+            with monitor.lock:
+                waiters = [
+                    _Waiter(pid, (fractions[pid] * (monitor.need[pid] + 1)).astype(int), monitor.lock)
+                    for pid in range(12)
+                ]
+                for waiter in waiters:
+                    monitor._enqueue_waiter(waiter)
+                monitor._dispatch_waiters()
+            results.append(([waiter.granted for waiter in waiters], monitor.allocation.tolist()))
+        assert results[0] == results[1]
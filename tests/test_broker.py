@@ -0,0 +1,95 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from broker import BrokerClient, BrokerClientPool, BrokerError, create_server
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+
+
+@pytest.fixture
+def broker(tmp_path):
+    monitor = DeadlockPreventerMonitor([2, 2], 4)
+    address = f"unix:{tmp_path / 'broker.sock'}"
+    server = create_server(monitor, address)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield monitor, address
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_round_trip_and_pipeline(broker):
+    monitor, address = broker
+    client = BrokerClient(address)
+    try:
+        assert client.info()[:2] == (4, 2)
+        client.set_max_claim(0, [2, 1])
+        assert client.request_resources(0, [1, 1])
+        assert not client.request_resources(0, [2, 0])  # больше оставшейся потребности
+
+        pipeline = client.pipeline()
+        pipeline.release_resources(0, [1, 1]).request_resources(0, [2, 1]).release_resources(0, [2, 1])
+        assert pipeline.execute() == [None, True, None]
+        assert np.array_equal(monitor.available, [2, 2])
+
+        assert client.max_safe_request(0).tolist() == [2, 1]
+        assert client.acquire_up_to(0, [2, 0]).tolist() == [2, 0]
+        client.release_resources(0, [2, 0])
+
+        with pytest.raises(BrokerError):
+            client.request_resources(99, [1, 0])
+        assert client.info()[0] == 4  # соединение осталось рабочим
+    finally:
+        client.close()
+
+
+def test_pool_is_shared_between_threads(broker):
+    monitor, address = broker
+    pool = BrokerClientPool(address, size=2)
+
+    def worker(pid):
+        pool.set_max_claim(pid, [1, 1])
+        for _ in range(20):
+            pool.request_resources(pid, [1, 1], blocking=True)
+            pool.release_resources(pid, [1, 1])
+
+    threads = [threading.Thread(target=worker, args=(pid,)) for pid in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    pool.close()
+    assert np.array_equal(monitor.available, [2, 2])
+
+
+def test_blocking_request_does_not_hold_a_pooled_connection(tmp_path):
+    monitor = DeadlockPreventerMonitor([1], 2)
+    address = f"unix:{tmp_path / 'broker.sock'}"
+    server = create_server(monitor, address)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pool = BrokerClientPool(address, size=1)
+    try:
+        pool.set_max_claim(0, [1])
+        pool.set_max_claim(1, [1])
+        assert pool.request_resources(0, [1])
+
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(pool.request_resources(1, [1], blocking=True)))
+        waiter.start()
+        while not monitor._wait_queue:
+            time.sleep(0.01)
+        # Единственное соединение пула свободно: освобождение доходит до брокера и будит ожидающего.
+        pool.release_resources(0, [1])
+        waiter.join(5)
+        assert results == [True]
+        assert np.array_equal(monitor.allocation, [[0], [1]])
+
+        with pytest.raises(BrokerError):
+            pool.release_resources(1, [-1])
+        with pytest.raises(ValueError):
+            pool.run_pipeline(lambda pipeline: pipeline.request_resources(1, [0], blocking=True))
+    finally:
+        pool.close()
+        server.shutdown()
+        server.server_close()
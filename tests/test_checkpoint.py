@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from checkpoint import read_checkpoint, restore_checkpoint, save_checkpoint
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from derived_need_monitor import DerivedNeedMonitor
+from packed_monitor import PackedMonitor
+from sparse_monitor import SparseMonitor
+
+
+def busy_monitor(monitor_class):
+    monitor = monitor_class([6, 5, 4], 0)
+    rng = np.random.default_rng(5)
+    for _ in range(6):
+        monitor.register_process(rng.integers(0, [4, 4, 3], endpoint=True))
+    for _ in range(30):
+        pid = int(rng.integers(6))
+        monitor.try_request(pid, rng.integers(0, monitor.need[pid] + 1))
+    monitor.unregister_process(2)
+    monitor.unregister_process(4)
+    return monitor
+
+
+@pytest.mark.parametrize("monitor_class", [DeadlockPreventerMonitor, DerivedNeedMonitor, SparseMonitor, PackedMonitor])
+def test_round_trip_restores_state_and_registrations(tmp_path, monitor_class):
+    path = tmp_path / "monitor.ckpt"
+    monitor = busy_monitor(monitor_class)
+    save_checkpoint(monitor, path)
+
+    restored = restore_checkpoint(path)
+    assert type(restored) is monitor_class
+    assert np.array_equal(restored.available, monitor.available)
+    assert np.array_equal(restored.max_claim, monitor.max_claim[: monitor.num_processes])
+    assert np.array_equal(restored.allocation, monitor.allocation[: monitor.num_processes])
+    assert np.array_equal(restored.need, monitor.need[: monitor.num_processes])
+    assert restored._safe_sequence is not None
+
+    # Освобожденные слоты выдаются повторно, начиная с меньшего, затем матрицы растут.
+    assert [restored.register_process([1, 0, 0]) for _ in range(3)] == [2, 4, 6]
+    for pid in (0, 1, 3, 5):
+        restored.release_resources(pid, restored.allocation[pid])
+    assert np.array_equal(restored.available, [6, 5, 4])
+
+
+def test_restore_into_other_storage_does_not_change_the_file(tmp_path):
+    path = tmp_path / "monitor.ckpt"
+    save_checkpoint(busy_monitor(DeadlockPreventerMonitor), path)
+    before = path.read_bytes()
+
+    restored = restore_checkpoint(path, monitor_class=SparseMonitor)
+    assert isinstance(restored, SparseMonitor)
+    dense = restore_checkpoint(path)
+    for pid in np.flatnonzero(dense._live):
+        dense.release_resources(pid, dense.allocation[pid])
+    assert not dense.allocation.any()
+    # Матрицы отображены с копированием при записи: изменения монитора остаются в памяти.
+    assert path.read_bytes() == before
+    assert np.array_equal(restored.allocation, read_checkpoint(path)[4])
+
+
+def test_restore_rejects_corrupt_or_unsafe_state(tmp_path):
+    path = tmp_path / "monitor.ckpt"
+    path.write_bytes(b"not a checkpoint")
+    with pytest.raises(ValueError):
+        restore_checkpoint(path)
+
+    monitor = DeadlockPreventerMonitor([2], 2)
+    monitor.set_max_claim(0, [2])
+    monitor.set_max_claim(1, [2])
+    monitor.allocation[:] = [[1], [1]]
+    monitor.available[:] = 0
+    save_checkpoint(monitor, path)
+    with pytest.raises(ValueError, match="небезопасно"):
+        restore_checkpoint(path)
+    # Обнаружение допускает небезопасные состояния.
+    detecting = restore_checkpoint(path, strategy="detection")
+    assert np.array_equal(detecting.allocation, [[1], [1]])
+    detecting.detector.stop()
+
+    save_checkpoint(busy_monitor(DeadlockPreventerMonitor), path)
+    with open(path, "r+b") as file_handle:
+        file_handle.truncate(path.stat().st_size - 1)
+    with pytest.raises(ValueError, match="обрезана"):
+        restore_checkpoint(path)
@@ -0,0 +1,52 @@
+import numpy as np
+
+from benchmark import benchmark_memory
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from derived_need_monitor import DerivedNeedMonitor
+from sparse_monitor import create_monitor
+
+
+def test_matrix_dtype_fits_resource_totals():
+    assert DeadlockPreventerMonitor([100, 3], 2).allocation.dtype == np.int8
+    assert DeadlockPreventerMonitor([1000, 3], 2).need.dtype == np.int16
+    assert DeadlockPreventerMonitor([100, 3], 2, matrix_dtype=np.int64).max_claim.dtype == np.int64
+
+
+def test_large_claim_widens_matrices():
+    monitor = DeadlockPreventerMonitor([5, 5], 2)
+    monitor.set_max_claim(0, [3, 2])
+    assert monitor.request_resources(0, [2, 1])
+    monitor.set_max_claim(1, [300, 1])
+    assert monitor.max_claim.dtype == np.int16
+    assert monitor.max_claim[1].tolist() == [300, 1]
+    assert monitor.allocation[0].tolist() == [2, 1]
+    assert monitor.need[1].tolist() == [300, 1]
+    assert monitor.snapshot().max_claim[1].tolist() == [300, 1]
+
+
+def test_derived_need_matches_stored_need():
+    rng = np.random.default_rng(4)
+    total = [6, 4, 9]
+    monitors = [cls(total, 8, combining=True) for cls in (DeadlockPreventerMonitor, DerivedNeedMonitor)]
+    for pid in range(8):
+        claim = rng.integers(0, np.array(total) + 1)
+        for monitor in monitors:
+            monitor.set_max_claim(pid, claim)
+
+    for _ in range(500):
+        pid = int(rng.integers(8))
+        if rng.random() < 0.6:
+            request = rng.integers(0, monitors[0].need[pid] + 1)
+            assert len({monitor.request_resources(pid, request) for monitor in monitors}) == 1
+        else:
+            release = rng.integers(0, monitors[0].allocation[pid] + 1)
+            for monitor in monitors:
+                monitor.release_resources(pid, release)
+        assert np.array_equal(monitors[0].need, monitors[1].need)
+        assert np.array_equal(monitors[0].available, monitors[1].available)
+
+
+def test_create_monitor_derived_need_and_memory_benchmark():
+    assert type(create_monitor([4] * 20, 10, derived_need=True)) is DerivedNeedMonitor
+    sizes = {entry["layout"]: entry["matrix_bytes"] for entry in benchmark_memory(200, 20, iterations=2)}
+    assert sizes == {"int64": 3 * 200 * 20 * 8, "compact": 3 * 200 * 20, "compact+derived": 2 * 200 * 20}
@@ -4,6 +4,7 @@ import time
 import pytest
 
 from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from detection import DetectionStrategy
 from logger import ConsoleLogger
 
 
@@ -80,3 +81,12 @@ def test_smart_monitor_prevents_deadlock(logger):
     print("\n--- ТЕСТ: DeadlockPreventerMonitor должен предотвратить deadlock ---")
     result_ok = run_test_scenario(DeadlockPreventerMonitor, logger)
     assert result_ok, "Ожидалось успешное завершение, но произошел deadlock!"
+
+
+def test_detection_strategy_recovers_from_deadlock(logger):
+    """Без проверки безопасности сценарий DumbMonitor доходит до взаимоблокировки, но детектор ее разрешает."""
+    strategy = DetectionStrategy(interval=0.05)
+    result_ok = run_test_scenario(lambda **kwargs: DeadlockPreventerMonitor(**kwargs, strategy=strategy), logger)
+    strategy.stop()
+    assert result_ok, "Детектор не разрешил взаимоблокировку!"
+    assert strategy.monitor.available.tolist() == [1, 1]
@@ -0,0 +1,53 @@
+import threading
+
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from detection import DetectionStrategy
+from metrics import MonitorMetrics
+from safety import find_deadlocked_processes
+from tests.test_blocking import wait_for_queue
+
+
+def test_find_deadlocked_processes():
+    allocation = np.array([[1, 0], [0, 1], [0, 0]])
+    requests = np.array([[0, 1], [1, 0], [1, 1]])
+    assert find_deadlocked_processes(np.array([0, 0]), allocation, requests) == [0, 1, 2]
+    assert find_deadlocked_processes(np.array([0, 1]), allocation, requests) == []
+    assert find_deadlocked_processes(np.array([0, 0]), allocation, np.zeros((3, 2), dtype=int)) == []
+
+
+def test_detection_grants_unsafe_requests_and_fails_victim():
+    metrics = MonitorMetrics()
+    # Большой интервал: детектор запускается вручную.
+    strategy = DetectionStrategy(interval=60, recovery="fail")
+    monitor = DeadlockPreventerMonitor([1, 1], 2, metrics=metrics, strategy=strategy)
+    strategy.stop()
+    monitor.set_max_claim(0, [1, 1])
+    monitor.set_max_claim(1, [1, 1])
+    # При предотвращении вторая выдача была бы небезопасной.
+    assert monitor.request_resources(0, [1, 0])
+    assert monitor.request_resources(1, [0, 1])
+
+    results = {}
+
+    def request(pid, vector):
+        results[pid] = monitor.request_resources(pid, vector)
+
+    threads = [threading.Thread(target=request, args=args) for args in ((0, [0, 1]), (1, [1, 0]))]
+    for thread in threads:
+        thread.start()
+    assert wait_for_queue(monitor, 2)
+
+    assert strategy.detect() == [0]
+    threads[0].join(timeout=5)
+    assert results == {0: False}
+    # По этой копии WorkerThread сверяет свое выделение после отказа.
+    assert monitor.allocated(0).tolist() == [1, 0]
+    # Жертва сама освобождает ресурсы, и запрос второго процесса выдается.
+    monitor.release_resources(0, [1, 0])
+    threads[1].join(timeout=5)
+    assert results[1] is True
+    assert strategy.detect() == []
+    assert metrics.counters["deadlocks_detected"] == 1
+    assert metrics.counters["deadlock_victims"] == 1
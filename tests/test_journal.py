@@ -0,0 +1,47 @@
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from journal import JournalReader, StateJournal
+
+
+class RecordingLogger:
+    """Запоминает состояние монитора после каждого события, как его видел бы MatrixFileLogger."""
+
+    def __init__(self, journal):
+        self.journal = journal
+        self.states = []
+
+    def log_event(self, event, process_id, vector, monitor_state):
+        self.journal.log_event(event, process_id, vector, monitor_state)
+        self.states.append((monitor_state.available.copy(), monitor_state.allocation.copy()))
+
+
+def test_journal_reconstructs_every_event(tmp_path):
+    path = tmp_path / "state.journal"
+    journal = StateJournal(path, num_resources=3, snapshot_interval=7)
+    recorder = RecordingLogger(journal)
+    monitor = DeadlockPreventerMonitor([5, 4, 3], 3, matrix_logger=recorder)
+
+    rng = np.random.default_rng(3)
+    for pid in range(3):
+        monitor.set_max_claim(pid, [3, 2, 2])
+    for _ in range(60):
+        pid = int(rng.integers(3))
+        request = rng.integers(0, monitor.need[pid] + 1)
+        if np.all(request <= monitor.available):
+            monitor.request_many([(pid, request)])
+        monitor.release_resources(pid, rng.integers(0, monitor.allocation[pid] + 1))
+    journal.close()
+
+    reader = JournalReader(path)
+    assert len(reader) == len(recorder.states)
+    assert len(reader.snapshots) > 1
+    for number, (available, allocation) in enumerate(recorder.states):
+        replayed_available, max_claim, replayed_allocation = reader.state_at(number)
+        assert np.array_equal(replayed_available, available)
+        assert np.array_equal(replayed_allocation, allocation)
+        if number >= 1:
+            assert np.array_equal(max_claim[1], [3, 2, 2])
+
+    text = reader.render(len(reader) - 1, ["CPU", "RAM", "Disk"])
+    assert "СОБЫТИЕ: P" in text and "Матрица потребностей (Need):" in text
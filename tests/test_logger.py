@@ -0,0 +1,43 @@
+import numpy as np
+
+from logger import LEVEL_OFF, LEVEL_WARNING, ConsoleLogger
+
+
+def test_level_and_category_filtering(capsys):
+    console = ConsoleLogger(level=LEVEL_WARNING)
+    console.request(0, np.array([1, 2]))
+    console.deferred(0, np.array([1, 2]))
+    assert not console.is_enabled("request")
+    assert capsys.readouterr().out.count("\n") == 1
+
+    console.set_level(LEVEL_OFF)
+    console.error(0, "не выводится")
+    console.set_level(0, categories=["error"])
+    console.success(0, np.array([1]), np.array([0]))
+    console.error(0, "выводится")
+    assert capsys.readouterr().out.endswith("[P0] !! ОШИБКА: выводится\n")
+
+
+def test_async_logger_formats_copies_in_order(capsys):
+    console = ConsoleLogger(asynchronous=True)
+    available = np.array([5, 5])
+    for i in range(100):
+        available[0] = i
+        console.release(i, np.array([1, 0]), available)
+    console.flush()
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 100
+    assert lines[-1].endswith("[P99] << Освободил ресурсы: [1 0]. Доступно: [99  5]")
+
+
+def test_message_arguments_are_formatted_only_when_emitted(capsys):
+    class Exploding:
+        def __str__(self):
+            raise AssertionError("форматирование выключенной записи")
+
+    console = ConsoleLogger(level=LEVEL_OFF)
+    console.info(0, "Ресурсы %s", Exploding())
+    console.error(0, "Запрос %s", Exploding())
+    console.set_level(0, categories=["info"])
+    console.info(1, "Объявил макс. потребность: %s, %d%%", np.array([1, 2]), 50)
+    assert capsys.readouterr().out.endswith("[P1] Объявил макс. потребность: [1 2], 50%\n")
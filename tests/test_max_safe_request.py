@@ -0,0 +1,73 @@
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from partitioned_monitor import PartitionedMonitor
+
+
+def random_monitor(rng, num_processes, total):
+    monitor = DeadlockPreventerMonitor(total, num_processes, combining=True)
+    for pid in range(num_processes):
+        monitor.set_max_claim(pid, rng.integers(0, np.array(total) + 1))
+    for _ in range(3 * num_processes):
+        pid = int(rng.integers(num_processes))
+        monitor.request_resources(pid, rng.integers(0, monitor.need[pid] + 1))
+    return monitor
+
+
+def is_safe_grant(monitor, pid, grant):
+    with monitor.lock:
+        return monitor._probe_is_safe(pid, np.array(grant))
+
+
+def test_max_safe_request_is_safe_and_maximal():
+    rng = np.random.default_rng(3)
+    for _ in range(40):
+        monitor = random_monitor(rng, 5, [4, 6, 3])
+        pid = int(rng.integers(5))
+        limit = np.minimum(monitor.need[pid], monitor.available)
+        before = monitor.allocation.copy()
+
+        grant = monitor.max_safe_request(pid)
+        assert np.all(grant <= limit) and is_safe_grant(monitor, pid, grant)
+        for resource in range(3):
+            if grant[resource] < limit[resource]:
+                bigger = grant.copy()
+                bigger[resource] += 1
+                assert not is_safe_grant(monitor, pid, bigger)
+
+        per_resource = monitor.max_safe_request(pid, per_resource=True)
+        for resource in range(3):
+            # Перебором: наибольшее безопасное количество только этого ресурса.
+            unit = np.eye(3, dtype=int)[resource]
+            amounts = [k for k in range(limit[resource] + 1) if is_safe_grant(monitor, pid, unit * k)]
+            assert per_resource[resource] == max(amounts)
+        assert np.array_equal(monitor.allocation, before)
+
+
+def test_acquire_up_to_grants_largest_safe_part():
+    monitor = DeadlockPreventerMonitor([3], 2)
+    monitor.set_max_claim(0, [3])
+    monitor.set_max_claim(1, [2])
+    assert monitor.request_resources(1, [1])
+
+    # P1 должен суметь завершиться: P0 безопасно получить только одну единицу из двух свободных.
+    assert monitor.acquire_up_to(0, [2]).tolist() == [1]
+    assert monitor.allocation[0].tolist() == [1]
+    assert monitor.acquire_up_to(0, [1]).tolist() == [0]
+    assert monitor.acquire_up_to(0, [5]).tolist() == [0]  # больше потребности - отказ
+
+    monitor.release_resources(1, [1])
+    assert monitor.max_safe_request(0).tolist() == [2]
+
+
+def test_partitioned_monitor_acquire_up_to():
+    monitor = PartitionedMonitor([3, 4], 3)
+    monitor.set_max_claim(0, [3, 0])
+    monitor.set_max_claim(1, [2, 0])
+    monitor.set_max_claim(2, [0, 4])
+    assert monitor.request_resources(1, [1, 0])
+
+    assert monitor.max_safe_request(0).tolist() == [1, 0]
+    assert monitor.acquire_up_to(2, [0, 4]).tolist() == [0, 4]
+    assert monitor.acquire_up_to(0, [2, 0]).tolist() == [1, 0]
+    assert monitor.available.tolist() == [1, 0]
@@ -0,0 +1,60 @@
+import threading
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from metrics import Histogram, MonitorMetrics, to_prometheus
+from tests.test_blocking import wait_for_queue
+
+
+def test_counters_cover_grant_defer_reject_and_release():
+    metrics = MonitorMetrics()
+    monitor = DeadlockPreventerMonitor([3], 2, metrics=metrics)
+    monitor.set_max_claim(0, [3])
+    monitor.set_max_claim(1, [3])
+
+    assert monitor.request_resources(0, [2])
+    assert not monitor.request_resources(1, [4])
+    monitor.release_resources(0, [2])
+
+    counters = monitor.metrics_snapshot()["counters"]
+    assert counters["requests"] == 2
+    assert counters["granted"] == 1
+    assert counters["rejected"] == 1
+    assert counters["released"] == 1
+    assert counters["safety_full_check"] + counters["safety_fast_path"] + counters["safety_cached_sequence"] == 1
+    assert metrics.lock_hold_seconds.count >= 3
+
+
+def test_blocked_waiter_records_queue_depth_and_wait_time():
+    metrics = MonitorMetrics()
+    monitor = DeadlockPreventerMonitor([1], 2, metrics=metrics)
+    monitor.set_max_claim(0, [1])
+    monitor.set_max_claim(1, [1])
+    monitor.request_resources(0, [1])
+
+    waiter = threading.Thread(target=monitor.request_resources, args=(1, [1]), kwargs={"blocking": True})
+    waiter.start()
+    assert wait_for_queue(monitor, 1)
+    monitor.release_resources(0, [1])
+    waiter.join(timeout=2)
+
+    snapshot = monitor.metrics_snapshot()
+    assert snapshot["counters"]["blocked_insufficient"] == 1
+    assert snapshot["histograms"]["wait_queue_depth"]["count"] == 1
+    assert snapshot["per_process_wait"]["1"]["count"] == 1
+
+    text = to_prometheus(snapshot)
+    assert "deadlock_monitor_granted_total 2\n" in text
+    assert 'deadlock_monitor_process_waits_total{pid="1"} 1\n' in text
+    assert 'deadlock_monitor_wait_queue_depth_bucket{le="+Inf"} 1\n' in text
+
+
+def test_histogram_quantile_and_disabled_metrics():
+    histogram = Histogram([1, 2, 4])
+    for value in (0.5, 1.5, 3, 10):
+        histogram.record(value)
+    assert histogram.quantile(0.5) == 2
+    assert histogram.quantile(1.0) == float("inf")
+
+    monitor = DeadlockPreventerMonitor([1], 1)
+    assert monitor.metrics is None
+    assert monitor.metrics_snapshot() is None
@@ -0,0 +1,67 @@
+import threading
+
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from packed_monitor import PackedMonitor
+from sparse_monitor import create_monitor
+
+
+def test_packed_monitor_matches_dense_monitor():
+    rng = np.random.default_rng(9)
+    total = [5, 7, 3, 6]
+    monitors = [cls(total, 6, combining=True) for cls in (DeadlockPreventerMonitor, PackedMonitor)]
+    for pid in range(6):
+        claim = rng.integers(0, np.array(total) + 1)
+        for monitor in monitors:
+            monitor.set_max_claim(pid, claim)
+
+    decisions = set()
+    for _ in range(600):
+        pid = int(rng.integers(6))
+        reference = monitors[0]
+        if rng.random() < 0.6:
+            request = rng.integers(0, np.maximum(reference.need[pid], 0) + 2)
+            results = [monitor.try_request(pid, request) for monitor in monitors]
+            assert results[0] == results[1]
+            decisions.add(results[0])
+        else:
+            release = rng.integers(0, reference.allocation[pid] + 1)
+            for monitor in monitors:
+                monitor.release_resources(pid, release)
+        assert np.array_equal(monitors[0].available, monitors[1].available)
+        assert np.array_equal(monitors[0].allocation, monitors[1].allocation)
+        assert np.array_equal(monitors[0].need, monitors[1].need)
+    assert decisions == {True, False}
+
+
+def test_fields_grow_with_large_claims():
+    monitor = PackedMonitor([3, 2], 2)
+    monitor.set_max_claim(0, [3, 1])
+    assert monitor.request_resources(0, [2, 1])
+    monitor.set_max_claim(1, [1000, 2])  # больше, чем есть в системе: поля расширяются
+    assert monitor.max_claim[1].tolist() == [1000, 2]
+    assert monitor.allocation[0].tolist() == [2, 1]
+    assert not monitor.request_resources(0, [-1, 0])
+    assert not monitor.try_request(1, [1, 1])  # P1 никогда не получит 1000 единиц
+    monitor.release_resources(0, [2, 1])
+    assert monitor.available.tolist() == [3, 2]
+
+
+def test_blocking_request_waits_for_release():
+    monitor = PackedMonitor([2], 2)
+    monitor.set_max_claim(0, [2])
+    monitor.set_max_claim(1, [2])
+    assert monitor.request_resources(0, [2])
+    result = []
+    thread = threading.Thread(target=lambda: result.append(monitor.request_resources(1, [2], blocking=True)))
+    thread.start()
+    monitor.release_resources(0, [2])
+    thread.join(timeout=5)
+    assert result == [True]
+    assert monitor.allocation[1].tolist() == [2]
+
+
+def test_create_monitor_packs_small_configurations():
+    assert type(create_monitor([4, 4, 4], 10)) is PackedMonitor
+    assert type(create_monitor([4, 4, 4], 1000)) is DeadlockPreventerMonitor
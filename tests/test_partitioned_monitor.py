@@ -0,0 +1,98 @@
+import threading
+import time
+
+import numpy as np
+
+from metrics import MonitorMetrics
+from partitioned_monitor import PartitionedMonitor
+
+
+def wait_for_waiters(monitor, process_id, count, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        component = monitor._process_component[process_id]
+        with component.monitor.lock:
+            if not component.retired and len(component.monitor._wait_queue) == count:
+                return True
+        time.sleep(0.01)
+    return False
+
+
+def test_disjoint_claims_get_independent_locks():
+    monitor = PartitionedMonitor([2, 2, 2], 3)
+    monitor.set_max_claim(0, [2, 0, 0])
+    monitor.set_max_claim(1, [0, 1, 1])
+    monitor.set_max_claim(2, [0, 1, 0])
+
+    components = monitor.components
+    assert sorted(c.resources.tolist() for c in components) == [[0], [1, 2]]
+
+    first = monitor._process_component[0]
+    with first.monitor.lock:
+        # Блокировка одной компоненты не мешает запросам другой.
+        assert monitor.request_resources(1, [0, 1, 1])
+    assert not monitor.request_resources(0, [0, 1, 0])  # ресурс вне объявленной потребности
+    assert np.array_equal(monitor.available, [2, 1, 1])
+    assert np.array_equal(monitor.allocation[1], [0, 1, 1])
+    assert monitor.allocated(1).tolist() == [0, 1, 1]
+
+
+def test_linking_claim_merges_components_and_keeps_state():
+    monitor = PartitionedMonitor([1, 1], 3)
+    monitor.set_max_claim(0, [1, 0])
+    monitor.set_max_claim(1, [0, 1])
+    assert monitor.request_resources(0, [1, 0])
+    assert monitor.request_resources(1, [0, 1])
+
+    monitor.set_max_claim(2, [1, 1])
+    assert len(monitor.components) == 1
+    assert np.array_equal(monitor.allocation, [[1, 0], [0, 1], [0, 0]])
+    assert np.array_equal(monitor.available, [0, 0])
+
+    monitor.release_resources(0, [1, 0])
+    assert monitor.request_resources(2, [1, 0])
+    monitor.release_resources(1, [0, 1])
+    assert np.array_equal(monitor.need, [[1, 0], [0, 1], [0, 1]])
+
+
+def test_blocked_request_survives_merge():
+    monitor = PartitionedMonitor([1, 1], 3)
+    monitor.set_max_claim(0, [1, 0])
+    monitor.set_max_claim(1, [1, 0])
+    assert monitor.request_resources(0, [1, 0])
+
+    granted = []
+    waiter = threading.Thread(target=lambda: granted.append(monitor.request_resources(1, [1, 0], blocking=True)))
+    waiter.start()
+    assert wait_for_waiters(monitor, 1, 1)
+
+    monitor.set_max_claim(2, [1, 1])
+    assert wait_for_waiters(monitor, 1, 1)  # ожидающий перешел в новую компоненту
+    monitor.release_resources(0, [1, 0])
+    waiter.join(timeout=2)
+    assert granted == [True]
+    assert np.array_equal(monitor.allocation[1], [1, 0])
+
+
+def test_components_keep_own_rows_metrics_and_detectors():
+    metrics = MonitorMetrics()
+    monitor = PartitionedMonitor([1, 1], 1000, metrics=metrics, strategy="detection")
+    monitor.set_max_claim(10, [1, 0])
+    monitor.set_max_claim(20, [0, 1])
+    first = monitor._process_component[10]
+    # Монитор компоненты хранит только ее процессы и ресурсы.
+    assert first.monitor.max_claim.shape == (1, 1)
+    assert monitor.request_resources(10, [1, 0])
+    assert monitor.request_resources(20, [0, 1])
+
+    monitor.set_max_claim(30, [1, 1])
+    merged = monitor._process_component[30]
+    assert merged.monitor.max_claim.shape == (3, 2)
+    assert not first.monitor.detector._thread.is_alive()
+    assert np.array_equal(monitor.allocation[[10, 20, 30]], [[1, 0], [0, 1], [0, 0]])
+
+    monitor.release_resources(10, [1, 0])
+    snapshot = monitor.metrics_snapshot()
+    assert snapshot["counters"]["granted"] == 2
+    assert snapshot["counters"]["released"] == 1
+    merged.monitor.detector.stop()
@@ -0,0 +1,62 @@
+import threading
+
+import numpy as np
+import pytest
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from tests.test_blocking import wait_for_queue
+
+
+def test_register_grows_matrices_and_reuses_lowest_free_slot():
+    monitor = DeadlockPreventerMonitor([4, 4], 0)
+    ids = [monitor.register_process([1, 1]) for _ in range(5)]
+    assert ids == [0, 1, 2, 3, 4]
+    assert len(monitor.allocation) == 8  # емкость растет удвоением
+    assert monitor.num_processes == 5
+
+    assert monitor.request_resources(3, [1, 1])
+    monitor.unregister_process(3)
+    monitor.unregister_process(1)
+    assert np.array_equal(monitor.available, [4, 4])  # ресурсы снятого процесса возвращены
+
+    assert monitor.register_process() == 1
+    assert monitor.register_process([2, 0]) == 3
+    assert np.array_equal(monitor.need[1], [0, 0])
+    assert np.array_equal(monitor.need[3], [2, 0])
+    assert monitor.register_process() == 5
+
+
+def test_safety_check_only_sees_resource_holders():
+    seen = []
+    monitor = DeadlockPreventerMonitor([2], 6, incremental_safety=False)
+    check = monitor._safety_check
+    monitor._safety_check = lambda available, allocation, need: seen.append(len(need)) or check(available, allocation, need)
+    for pid in range(6):
+        monitor.set_max_claim(pid, [2])
+    for pid in range(1, 5):
+        monitor.unregister_process(pid)
+
+    assert monitor.request_resources(5, [1])
+    assert seen == [1]
+    assert monitor._last_safe_sequence == [5]
+    assert not monitor.try_request(0, [1])  # оба держателя ждали бы последнюю единицу
+    assert seen == [1, 2]
+    assert not monitor.request_resources(2, [1])  # снятый с учета процесс
+
+
+def test_unregister_rejects_unknown_or_waiting_process():
+    monitor = DeadlockPreventerMonitor([1], 2)
+    monitor.set_max_claim(0, [1])
+    monitor.set_max_claim(1, [1])
+    monitor.request_resources(0, [1])
+    waiter = threading.Thread(target=monitor.request_resources, args=(1, [1]), kwargs={"blocking": True})
+    waiter.start()
+    assert wait_for_queue(monitor, 1)
+    with pytest.raises(ValueError):
+        monitor.unregister_process(1)
+
+    monitor.unregister_process(0)  # освобожденные ресурсы достаются ожидающему
+    waiter.join()
+    assert np.array_equal(monitor.allocation[1], [1])
+    with pytest.raises(ValueError):
+        monitor.unregister_process(0)
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from safety import evaluate_states, find_safe_sequence_reference, find_safe_sequence_vectorized, find_safe_sequences_batch
+
+
+def random_state(rng, num_processes, num_resources):
+    total = rng.integers(1, 20, size=num_resources)
+    max_claim = rng.integers(0, total + 1, size=(num_processes, num_resources))
+    allocation = rng.integers(0, max_claim + 1)
+    # Не выдаем больше, чем есть в системе.
+    while np.any(allocation.sum(axis=0) > total):
+        i = rng.integers(num_processes)
+        allocation[i] //= 2
+    available = total - allocation.sum(axis=0)
+    return available, allocation, max_claim - allocation
+
+
+def is_valid_sequence(sequence, available, allocation, need):
+    work = available.copy()
+    for i in sequence:
+        if np.any(need[i] > work):
+            return False
+        work += allocation[i]
+    return sorted(sequence) == list(range(len(need)))
+
+
+def test_vectorized_matches_reference_on_random_states():
+    rng = np.random.default_rng(42)
+    verdicts = set()
+    for _ in range(500):
+        state = random_state(rng, int(rng.integers(1, 30)), int(rng.integers(1, 6)))
+        reference = find_safe_sequence_reference(*state)
+        vectorized = find_safe_sequence_vectorized(*state)
+        assert (reference is None) == (vectorized is None)
+        if vectorized is not None:
+            assert is_valid_sequence(vectorized, *state)
+        verdicts.add(reference is None)
+    # Убеждаемся, что встретились и безопасные, и небезопасные состояния.
+    assert verdicts == {True, False}
+
+
+def test_unknown_safety_algorithm_rejected():
+    with pytest.raises(ValueError):
+        DeadlockPreventerMonitor([1, 1], 2, safety_algorithm="magic")
+
+
+def test_incremental_safety_matches_full_check():
+    rng = np.random.default_rng(7)
+    total = [6, 5, 7]
+    monitors = [DeadlockPreventerMonitor(total, 6, incremental_safety=flag) for flag in (True, False)]
+    for pid in range(6):
+        claim = rng.integers(0, np.array(total) + 1)
+        for monitor in monitors:
+            monitor.set_max_claim(pid, claim)
+
+    for _ in range(400):
+        pid = int(rng.integers(6))
+        reference = monitors[1]
+        if rng.random() < 0.6:
+            request = rng.integers(0, reference.need[pid] + 1)
+            if np.any(request > reference.available):
+                continue
+            decisions = set()
+            for monitor in monitors:
+                with monitor.lock:
+                    decisions.add(monitor._try_grant(pid, request))
+            assert len(decisions) == 1
+        else:
+            release = rng.integers(0, reference.allocation[pid] + 1)
+            for monitor in monitors:
+                monitor.release_resources(pid, release)
+        assert np.array_equal(monitors[0].allocation, monitors[1].allocation)
+
+
+def random_batch(rng, batch, num_processes, num_resources):
+    states = [random_state(rng, num_processes, num_resources) for _ in range(batch)]
+    return tuple(np.stack(part) for part in zip(*states))
+
+
+def test_batch_matches_vectorized_per_state():
+    rng = np.random.default_rng(11)
+    available, allocation, need = random_batch(rng, 300, 12, 4)
+    safe, sequences = find_safe_sequences_batch(available, allocation, need, sequences=True)
+    for b in range(len(available)):
+        expected = find_safe_sequence_vectorized(available[b], allocation[b], need[b])
+        assert safe[b] == (expected is not None)
+        if expected is not None:
+            assert is_valid_sequence(sequences[b], available[b], allocation[b], need[b])
+        else:
+            assert sequences[b] is None
+    assert set(safe.tolist()) == {True, False}
+
+
+def test_batch_broadcasts_shared_matrices_over_available():
+    allocation = np.array([[1, 0], [1, 1]])
+    need = np.array([[2, 1], [1, 2]])
+    available = np.array([[0, 0], [2, 2], [2, 1], [1, 2]])
+    assert find_safe_sequences_batch(available, allocation, need).tolist() == [False, True, False, True]
+
+
+def test_evaluate_states_shards_over_processes():
+    rng = np.random.default_rng(5)
+    available, allocation, need = random_batch(rng, 50, 8, 3)
+    local = evaluate_states(available, allocation, need, sequences=True, workers=0)
+    sharded = evaluate_states(available, allocation, need, sequences=True, workers=2, shard_size=16)
+    assert np.array_equal(local[0], sharded[0])
+    assert local[1] == sharded[1]
@@ -0,0 +1,158 @@
+import threading
+import time
+
+import pytest
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor, _Waiter
+from metrics import MonitorMetrics
+from scheduler import PriorityPolicy, _KeyPolicy
+from tests.test_blocking import wait_for_queue
+
+
+def first_granted(scheduler, waiters, claims=None):
+    """Ставит запросы waiters (pid, request, параметры) в очередь и возвращает, кому выдана первая единица."""
+    monitor = DeadlockPreventerMonitor([2], len(waiters) + 1, scheduler=scheduler)
+    monitor.set_max_claim(0, [2])
+    for pid, claim in enumerate(claims or [[1]] * len(waiters), start=1):
+        monitor.set_max_claim(pid, claim)
+    assert monitor.request_resources(0, [2])
+
+    threads = []
+    for index, (pid, request, options) in enumerate(waiters):
+        thread = threading.Thread(target=monitor.request_resources, args=(pid, request, True), kwargs=options)
+        thread.start()
+        threads.append(thread)
+        assert wait_for_queue(monitor, index + 1)
+
+    # Освобождается одна единица: ее получает только первый по политике.
+    monitor.release_resources(0, [1])
+    assert wait_for_queue(monitor, len(waiters) - 1)
+    first = next(pid for pid, _, _ in waiters if monitor.allocation[pid].any())
+    monitor.release_resources(0, [1])
+    for thread in threads:
+        thread.join(timeout=2)
+    return first
+
+
+def test_fifo_priority_and_deadline_policies():
+    far, near = time.monotonic() + 60, time.monotonic() + 30
+    waiters = [(1, [1], {"priority": 0, "deadline": far}), (2, [1], {"priority": 5, "deadline": near})]
+    assert first_granted("fifo", waiters) == 1
+    assert first_granted("priority", waiters) == 2
+    assert first_granted("deadline", waiters) == 2
+
+
+def test_shortest_need_policy_prefers_process_closest_to_finishing():
+    monitor = DeadlockPreventerMonitor([5], 3, scheduler="shortest-need")
+    for pid, claim in enumerate(([4], [1], [2])):
+        monitor.set_max_claim(pid, claim)
+    waiters = [_Waiter(pid, [1], monitor.lock) for pid in range(3)]
+    for waiter in waiters:
+        monitor._enqueue_waiter(waiter)
+    assert [waiter.process_id for waiter in monitor.scheduler.order(monitor._wait_queue, monitor)] == [1, 2, 0]
+
+
+def queued_behind_holder(scheduler):
+    """P0 держит 2 из 3, P1 с priority=10 ждет [2] в очереди."""
+    monitor = DeadlockPreventerMonitor([3], 4, scheduler=scheduler)
+    for pid, claim in enumerate(([2], [2], [1], [1])):
+        monitor.set_max_claim(pid, claim)
+    assert monitor.request_resources(0, [2])
+    thread = threading.Thread(target=monitor.request_resources, args=(1, [2], True), kwargs={"priority": 10})
+    thread.start()
+    assert wait_for_queue(monitor, 1)
+    return monitor, thread
+
+
+def test_new_requests_do_not_bypass_queued_request():
+    monitor, thread = queued_behind_holder("priority")
+    # Свободная единица достается не новому запросу с меньшим приоритетом, а ждущему.
+    assert not monitor.try_request(2, [1])
+    assert not monitor.acquire_up_to(2, [1]).any()
+    assert monitor.request_many([(2, [1])]) == [False]
+    # Неблокирующий request_resources, как и при отложенном запросе, ждет освобождения, а не крутится в цикле.
+    deferred = []
+    legacy = threading.Thread(target=lambda: deferred.append(monitor.request_resources(2, [1])))
+    legacy.start()
+    blocked = threading.Thread(target=monitor.request_resources, args=(3, [1], True))
+    blocked.start()
+    assert wait_for_queue(monitor, 2)
+    assert legacy.is_alive() and not deferred
+
+    monitor.release_resources(0, [1])
+    thread.join(timeout=2)
+    legacy.join(timeout=2)
+    assert deferred == [False]
+    assert monitor.allocation[1] == 2 and monitor.allocation[3] == 0
+    monitor.release_resources(0, [1])
+    blocked.join(timeout=2)
+    assert monitor.allocation[3] == 1
+
+
+def test_bounded_bypass_and_queue_without_other_holders():
+    monitor, thread = queued_behind_holder(PriorityPolicy(max_bypass=1))
+    # Ждущего можно обойти один раз.
+    assert monitor.try_request(2, [1])
+    monitor.release_resources(2, [1])
+    assert not monitor.try_request(2, [1])
+    monitor.release_resources(0, [2])
+    thread.join(timeout=2)
+    assert monitor.allocation[1] == 2
+
+    # Если ресурсы держат только ждущие, очередь строй не держит: иначе никто не освободит ресурсы.
+    monitor = DeadlockPreventerMonitor([3], 3)
+    monitor.set_max_claim(0, [3])
+    monitor.set_max_claim(1, [1])
+    assert monitor.try_request(0, [2])
+    monitor._enqueue_waiter(_Waiter(0, [1], monitor.lock))
+    monitor._enqueue_waiter(_Waiter(0, [1], monitor.lock))
+    assert monitor.request_resources(1, [1], blocking=True)
+    assert len(monitor._wait_queue) == 2
+
+
+def test_queue_without_other_holders_yields_to_a_holder():
+    monitor = DeadlockPreventerMonitor([4], 3)
+    monitor.set_max_claim(0, [4])
+    monitor.set_max_claim(1, [2])
+    monitor.set_max_claim(2, [3])
+    assert monitor.try_request(0, [1])
+    assert monitor.try_request(1, [1])
+    head, idle, holder = _Waiter(0, [3], monitor.lock), _Waiter(2, [1], monitor.lock), _Waiter(1, [1], monitor.lock)
+    for waiter in (head, idle, holder):
+        monitor._enqueue_waiter(waiter)
+
+    # Ресурсы держат только ждущие: очередь уступает держателю, а не первому выполнимому запросу.
+    with monitor.lock:
+        monitor._dispatch_waiters()
+    assert holder.granted and not idle.granted
+    assert list(monitor._wait_queue) == [head, idle]
+
+    monitor.release_resources(1, [2])
+    assert head.granted and not idle.granted
+    assert list(monitor._wait_queue) == [idle]
+
+
+def test_timeout_removes_request_and_try_request_never_waits():
+    metrics = MonitorMetrics()
+    monitor = DeadlockPreventerMonitor([1], 2, metrics=metrics)
+    monitor.set_max_claim(0, [1])
+    monitor.set_max_claim(1, [1])
+    assert monitor.try_request(0, [1])
+    assert not monitor.try_request(1, [1])
+
+    start = time.monotonic()
+    assert not monitor.request_resources(1, [1], timeout=0.05)
+    assert time.monotonic() - start >= 0.05
+    assert not monitor._wait_queue
+    assert metrics.counters["timed_out"] == 1
+
+    with pytest.raises(ValueError):
+        DeadlockPreventerMonitor([1], 1, scheduler="random")
+
+
+def test_key_policy_requires_key():
+    class NoKey(_KeyPolicy):
+        pass
+
+    with pytest.raises(TypeError):
+        NoKey()
@@ -0,0 +1,53 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from shared_monitor import SharedMemoryMonitor, init_worker, worker_monitor
+
+
+def run_worker(process_id):
+    monitor = worker_monitor()
+    monitor.set_max_claim(process_id, [2, 2])
+    for _ in range(20):
+        monitor.request_resources(process_id, [1, 1], blocking=True)
+        monitor.request_resources(process_id, [1, 1], blocking=True)
+        monitor.release_resources(process_id, [2, 2])
+    return int(monitor.allocation[process_id].sum())
+
+
+def test_worker_processes_share_one_monitor():
+    monitor = SharedMemoryMonitor([3, 3], 4)
+    try:
+        with ProcessPoolExecutor(max_workers=4, initializer=init_worker, initargs=(monitor.handle(),)) as pool:
+            assert list(pool.map(run_worker, range(4))) == [0, 0, 0, 0]
+        assert np.array_equal(monitor.available, [3, 3])
+        assert np.array_equal(monitor.max_claim, [[2, 2]] * 4)
+    finally:
+        monitor.close()
+
+
+def register_and_work(_):
+    monitor = worker_monitor()
+    process_id = monitor.register_process([1, 1])
+    assert monitor.request_resources(process_id, [1, 1], blocking=True)
+    # Снятие с учета возвращает ресурсы и освобождает слот для других процессов.
+    monitor.unregister_process(process_id)
+    return process_id
+
+
+def test_worker_processes_register_in_shared_slots():
+    monitor = SharedMemoryMonitor([2, 2], 3)
+    try:
+        for process_id in range(3):
+            monitor.unregister_process(process_id)
+        with ProcessPoolExecutor(max_workers=3, initializer=init_worker, initargs=(monitor.handle(),)) as pool:
+            assert set(pool.map(register_and_work, range(12))) <= {0, 1, 2}
+        assert not monitor._live.any()
+        assert np.array_equal(monitor.available, [2, 2])
+
+        assert [monitor.register_process() for _ in range(3)] == [0, 1, 2]
+        with pytest.raises(RuntimeError):
+            monitor.register_process()
+    finally:
+        monitor.close()
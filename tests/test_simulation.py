@@ -0,0 +1,60 @@
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from simulation import Release, Request, Simulation, Sleep, simulate
+
+
+def summary_without_wall(result):
+    summary = result.summary()
+    del summary["wall_seconds"]
+    return summary
+
+
+def test_same_seed_reproduces_the_run():
+    first = simulate([4, 3, 5], processes=20, seed=7)
+    second = simulate([4, 3, 5], processes=20, seed=7)
+    assert summary_without_wall(first) == summary_without_wall(second)
+    assert first.completed == 20
+    assert first.virtual_seconds > 0
+
+
+def test_arrivals_register_and_unregister_processes():
+    result = simulate([5, 5], arrival_rate=0.5, duration=60, seed=3)
+    assert result.completed > 0
+    assert result.peak_processes >= 1
+    assert all(0 <= u <= 1 for u in result.utilization)
+
+
+def test_blocked_request_waits_on_the_virtual_clock():
+    monitor = DeadlockPreventerMonitor([2], 2)
+    monitor.set_max_claim(0, [2])
+    monitor.set_max_claim(1, [2])
+    simulation = Simulation(monitor, seed=0)
+
+    def holder():
+        yield Request(0, [2])
+        yield Sleep(10)
+        yield Release(0, [2])
+
+    def waiter():
+        yield Sleep(1)
+        granted = yield Request(1, [1])
+        assert granted
+        yield Release(1, [1])
+
+    simulation.spawn(holder())
+    simulation.spawn(waiter())
+    result = simulation.run()
+
+    assert result.virtual_seconds == 10
+    assert result.completed == 2
+    assert sorted(result.wait_times) == [0.0, 9.0]
+    assert np.array_equal(monitor.available, [2])
+    assert result.utilization[0] == 1.0
+
+
+def test_ten_thousand_processes_finish_in_seconds():
+    # Освобождение не должно просматривать всю очередь: раньше 10 000 процессов считались минутами.
+    result = simulate([50, 50, 50], processes=10_000, seed=1)
+    assert result.completed == 10_000
+    assert result.wall_seconds < 60
@@ -0,0 +1,66 @@
+import threading
+
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+
+
+def test_snapshots_are_consistent_under_concurrent_updates():
+    monitor = DeadlockPreventerMonitor([6, 6], 4, combining=True, snapshot_history=64)
+    for pid in range(4):
+        monitor.set_max_claim(pid, [2, 2])
+    stop = threading.Event()
+
+    def worker(pid):
+        while not stop.is_set():
+            if monitor.request_resources(pid, [1, 2]):
+                monitor.release_resources(pid, [1, 2])
+
+    workers = [threading.Thread(target=worker, args=(pid,)) for pid in range(4)]
+    for thread in workers:
+        thread.start()
+    try:
+        versions = []
+        for _ in range(500):
+            snapshot = monitor.snapshot()
+            assert snapshot.version % 2 == 0
+            assert np.array_equal(snapshot.available + snapshot.allocation.sum(axis=0), [6, 6])
+            versions.append(snapshot.version)
+    finally:
+        stop.set()
+        for thread in workers:
+            thread.join()
+    assert versions == sorted(versions)
+
+
+def test_changes_since_rolls_snapshot_forward():
+    monitor = DeadlockPreventerMonitor([3, 3], 2, snapshot_history=16)
+    monitor.set_max_claim(0, [2, 1])
+    base = monitor.snapshot()
+
+    monitor.set_max_claim(1, [1, 3])
+    monitor.request_resources(0, [1, 1])
+    monitor.request_resources(1, [1, 2])
+    monitor.release_resources(0, [1, 0])
+    current, changes = monitor.changes_since(base.version)
+
+    latest = monitor.snapshot()
+    assert current == latest.version
+    base.apply(changes)
+    assert np.array_equal(base.available, latest.available)
+    assert np.array_equal(base.allocation, latest.allocation)
+    assert np.array_equal(base.need, monitor.need)
+    assert monitor.changes_since(latest.version) == (latest.version, [])
+
+
+def test_changes_since_reports_truncated_history():
+    monitor = DeadlockPreventerMonitor([3], 1, snapshot_history=2)
+    monitor.set_max_claim(0, [3])
+    base = monitor.snapshot()
+    for _ in range(3):
+        monitor.request_resources(0, [1])
+    assert monitor.changes_since(base.version) is None
+
+    plain = DeadlockPreventerMonitor([3], 1)
+    assert plain.snapshot().version is None
+    assert plain.changes_since(0) is None
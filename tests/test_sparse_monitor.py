@@ -0,0 +1,57 @@
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from sparse_monitor import SparseMonitor, create_monitor
+
+
+def random_claims(rng, num_processes, num_resources, per_process):
+    claims = np.zeros((num_processes, num_resources), dtype=int)
+    for row in claims:
+        row[rng.choice(num_resources, per_process, replace=False)] = rng.integers(1, 4, per_process)
+    return claims
+
+
+def test_sparse_monitor_matches_dense_decisions():
+    rng = np.random.default_rng(7)
+    num_processes, num_resources = 12, 40
+    claims = random_claims(rng, num_processes, num_resources, 3)
+    available = rng.integers(2, 6, num_resources)
+    # В режиме комбинирования отказ возвращается сразу, без ожидания освобождения.
+    dense = DeadlockPreventerMonitor(available, num_processes, combining=True)
+    sparse = SparseMonitor(available, num_processes, combining=True)
+    for monitor in (dense, sparse):
+        for pid, claim in enumerate(claims):
+            monitor.set_max_claim(pid, claim)
+
+    for _ in range(300):
+        pid = int(rng.integers(num_processes))
+        if rng.random() < 0.6:
+            vector = np.minimum(dense.need[pid], rng.integers(0, 3, num_resources))
+            assert dense.request_resources(pid, vector) == sparse.request_resources(pid, vector)
+        else:
+            vector = np.minimum(dense.allocation[pid], rng.integers(0, 3, num_resources))
+            dense.release_resources(pid, vector)
+            sparse.release_resources(pid, vector)
+        assert np.array_equal(dense.available, sparse.available)
+        assert np.array_equal(dense.allocation, sparse.allocation)
+
+    assert sparse.nnz == np.count_nonzero(claims)
+
+
+def test_sparse_monitor_rejects_unclaimed_resource_and_supports_registration():
+    monitor = SparseMonitor([2] * 1000, 0)
+    pid = monitor.register_process(np.eye(1000, dtype=int)[5])
+    assert not monitor.request_resources(pid, np.eye(1000, dtype=int)[6])
+    assert monitor.request_resources(pid, np.eye(1000, dtype=int)[5])
+    monitor.unregister_process(pid)
+    assert monitor.nnz == 0
+    assert monitor.available.sum() == 2000
+
+
+def test_create_monitor_chooses_storage_by_density():
+    rng = np.random.default_rng(1)
+    sparse = create_monitor([5] * 100, 10, max_claims=random_claims(rng, 10, 100, 2))
+    dense = create_monitor([5] * 20, 10, max_claims=np.ones((10, 20), dtype=int))
+    assert type(sparse) is SparseMonitor
+    assert type(dense) is DeadlockPreventerMonitor
+    assert sparse.nnz == 20
@@ -0,0 +1,141 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from broker import BrokerClient, create_server
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+from metrics import MonitorMetrics
+from packed_monitor import PackedMonitor
+from sparse_monitor import SparseMonitor
+from trace_replay import Trace, TraceRecorder, replay_fast, replay_timed
+
+
+def record_workload(path):
+    monitor = DeadlockPreventerMonitor([3, 3], 3)
+    recorder = TraceRecorder().attach(monitor)
+
+    def worker(pid):
+        monitor.set_max_claim(pid, [2, 2])
+        for _ in range(5):
+            monitor.request_resources(pid, [1, 1], blocking=True)
+            monitor.request_resources(pid, [1, 0], blocking=True)
+            monitor.release_resources(pid, [2, 1])
+
+    threads = [threading.Thread(target=worker, args=(pid,)) for pid in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    recorder.detach()
+    recorder.save(path)
+    return monitor
+
+
+def test_fast_replay_reproduces_decisions(tmp_path):
+    path = tmp_path / "workload.trace"
+    original = record_workload(path)
+    trace = Trace.load(path)
+    assert len(trace.events) == 3 * (1 + 5 * 3)
+
+    monitor = trace.build_monitor()
+    result = replay_fast(trace, monitor)
+    assert result.mismatches == 0
+    assert np.array_equal(monitor.available, original.available)
+
+
+def test_timed_replay_keeps_concurrency(tmp_path):
+    path = tmp_path / "workload.trace"
+    record_workload(path)
+    trace = Trace.load(path)
+    monitor = trace.build_monitor()
+    result = replay_timed(trace, monitor, speed=10)
+    assert result.operations == len(trace.events)
+    assert np.array_equal(monitor.available, [3, 3])
+
+
+def test_broker_traffic_is_recorded_and_replayed(tmp_path):
+    monitor = DeadlockPreventerMonitor([3, 2], 2)
+    recorder = TraceRecorder().attach(monitor)
+    address = f"unix:{tmp_path / 'broker.sock'}"
+    server = create_server(monitor, address)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = BrokerClient(address)
+    try:
+        client.set_max_claim(0, [3, 2])
+        client.set_max_claim(1, [1, 1])
+        assert client.request_resources(0, [1, 1])
+        assert client.request_resources(1, [1, 0])
+        # Безопасно выдать только часть: запись хранит фактически выданное.
+        granted = client.acquire_up_to(0, [1, 1])
+        assert granted.tolist() == [1, 0]
+        client.release_resources(1, [1, 0])
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+    recorder.detach()
+    path = tmp_path / "broker.trace"
+    recorder.save(path)
+
+    trace = Trace.load(path)
+    assert [event["op"] for event in trace.events] == ["claim", "claim", "request", "request", "request", "release"]
+    assert trace.events[4]["vector"] == granted.tolist()
+    replayed = trace.build_monitor()
+    assert replay_fast(trace, replayed).mismatches == 0
+    assert np.array_equal(replayed.allocation, monitor.allocation)
+    assert np.array_equal(replayed.available, monitor.available)
+
+
+@pytest.mark.parametrize("monitor_class", [DeadlockPreventerMonitor, SparseMonitor, PackedMonitor])
+def test_registrations_replay_on_any_storage(tmp_path, monitor_class):
+    monitor = DeadlockPreventerMonitor([4, 4], 0)
+    first = monitor.register_process([2, 2])
+    assert monitor.request_resources(first, [1, 2])
+    recorder = TraceRecorder().attach(monitor)
+    second = monitor.register_process([3, 1])
+    third = monitor.register_process()
+    assert monitor.request_resources(second, [2, 1])
+    monitor.unregister_process(third)
+    monitor.release_resources(first, [1, 0])
+    recorder.detach()
+    path = tmp_path / "registrations.trace"
+    recorder.save(path)
+
+    trace = Trace.load(path)
+    assert [event["op"] for event in trace.events] == ["register", "register", "request", "unregister", "release"]
+    replayed = trace.build_monitor(monitor_class)
+    # Начальное выделение попадает в хранилище любого типа.
+    assert np.array_equal(replayed.allocation[:1], [[1, 2]])
+    assert replay_fast(trace, replayed).mismatches == 0
+    assert np.array_equal(replayed.allocation[:3], monitor.allocation[:3])
+    assert np.array_equal(replayed.available, monitor.available)
+    assert replayed.register_process() == third
+
+
+def test_timeout_only_request_is_replayed_as_blocking(tmp_path):
+    monitor = DeadlockPreventerMonitor([1], 2)
+    monitor.set_max_claim(0, [1])
+    monitor.set_max_claim(1, [1])
+    assert monitor.request_resources(0, [1])
+    recorder = TraceRecorder().attach(monitor)
+    # Без blocking, но со сроком: запрос ждет в очереди и снимается с нее по истечении.
+    assert not monitor.request_resources(1, [1], timeout=0.05, priority=3)
+    time.sleep(0.1)
+    monitor.release_resources(0, [1])
+    assert monitor.request_resources(1, [1], deadline=time.monotonic() + 1)
+    recorder.detach()
+    path = tmp_path / "timeout.trace"
+    recorder.save(path)
+
+    trace = Trace.load(path)
+    first, _, second = trace.events
+    assert first["blocking"] and first["timeout"] == 0.05 and first["priority"] == 3
+    assert second["blocking"] and 0 < second["timeout"] <= 1
+    for replay in (replay_fast, replay_timed):
+        metrics = MonitorMetrics()
+        replayed = trace.build_monitor(metrics=metrics)
+        assert replay(trace, replayed).mismatches == 0
+        assert metrics.counters["timed_out"] == 1
+        assert np.array_equal(replayed.allocation, monitor.allocation)
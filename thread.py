@@ -31,12 +31,13 @@ class WorkerThread(threading.Thread):
             if np.all(request == 0):
                 continue
 
-            while not self.monitor.request_resources(self.process_id, request):
-                logger.info(self.process_id, "...повторяет попытку после ожидания.")
-                time.sleep(random.uniform(0.2, 0.5))
+            if not self.monitor.request_resources(self.process_id, request, blocking=True):
+                # Запрос отклонен детектором взаимоблокировки; выделенное могли отобрать.
+                self.currently_allocated = self.monitor.allocated(self.process_id)
+                continue
 
             self.currently_allocated += request
-            logger.info(self.process_id, f"Использует ресурсы: {self.currently_allocated}")
+            logger.info(self.process_id, "Использует ресурсы: %s", self.currently_allocated)
             time.sleep(random.uniform(1, 2.0))
 
             if np.any(self.currently_allocated > 0):
@@ -47,7 +48,7 @@ class WorkerThread(threading.Thread):
                     self.currently_allocated -= release
 
         if np.any(self.currently_allocated > 0):
-            logger.info(self.process_id, f"Завершает работу, освобождая всё: {self.currently_allocated}")
+            logger.info(self.process_id, "Завершает работу, освобождая всё: %s", self.currently_allocated)
             self.monitor.release_resources(self.process_id, self.currently_allocated)
 
         logger.info(self.process_id, "Завершен.")
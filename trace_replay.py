@@ -0,0 +1,322 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+from deadlock_prevent_monitor import DeadlockPreventerMonitor
+
+OP_CLAIM = "claim"
+OP_REQUEST = "request"
+OP_RELEASE = "release"
+OP_REGISTER = "register"
+OP_UNREGISTER = "unregister"
+
+
+class TraceRecorder:
+    """
+    Записывает реальную последовательность вызовов монитора.
+
+    attach() подменяет публичные методы конкретного экземпляра обертками,
+    поэтому записываются вызовы любого клиента (WorkerThread, брокер и т.д.),
+    а без записи монитор не платит ничего. Каждое событие хранит время начала
+    и окончания вызова относительно начала записи и результат.
+    """
+
+    TRACED_METHODS = (
+        "set_max_claim",
+        "register_process",
+        "unregister_process",
+        "request_resources",
+        "try_request",
+        "acquire_up_to",
+        "release_resources",
+        "request_many",
+        "release_many",
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.header = None
+        self.monitor = None
+        self._start = None
+
+    def attach(self, monitor):
+        with monitor.lock:
+            num_processes = monitor.num_processes
+            self.header = {
+                "available": monitor.available.tolist(),
+                "max_claim": monitor.max_claim[:num_processes].tolist(),
+                "allocation": monitor.allocation[:num_processes].tolist(),
+                "live": monitor._live[:num_processes].tolist(),
+            }
+        self.monitor = monitor
+        self._start = time.perf_counter()
+
+        set_max_claim = monitor.set_max_claim
+        register_process = monitor.register_process
+        unregister_process = monitor.unregister_process
+        request_resources = monitor.request_resources
+        try_request = monitor.try_request
+        acquire_up_to = monitor.acquire_up_to
+        release_resources = monitor.release_resources
+        request_many = monitor.request_many
+        release_many = monitor.release_many
+
+        def traced_set_max_claim(process_id, max_needs):
+            start = self._now()
+            result = set_max_claim(process_id, max_needs)
+            self._record(OP_CLAIM, process_id, max_needs, start, True)
+            return result
+
+        def traced_register_process(max_needs=None):
+            start = self._now()
+            process_id = register_process(max_needs)
+            vector = max_needs if max_needs is not None else np.zeros(monitor.num_resources, dtype=int)
+            self._record(OP_REGISTER, process_id, vector, start, True)
+            return process_id
+
+        def traced_unregister_process(process_id):
+            start = self._now()
+            result = unregister_process(process_id)
+            self._record(OP_UNREGISTER, process_id, (), start, True)
+            return result
+
+        def traced_request_resources(process_id, request, blocking=False, timeout=None, deadline=None, priority=0):
+            start = self._now()
+            # deadline - момент по time.monotonic() этого запуска, поэтому записывается оставшееся время.
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            result = request_resources(process_id, request, blocking, timeout, None, priority)
+            # Запрос со сроком ждет в очереди, даже если blocking не задан.
+            blocking = blocking or timeout is not None
+            self._record(OP_REQUEST, process_id, request, start, result, blocking, timeout, priority)
+            return result
+
+        def traced_try_request(process_id, request):
+            start = self._now()
+            result = try_request(process_id, request)
+            self._record(OP_REQUEST, process_id, request, start, result)
+            return result
+
+        def traced_acquire_up_to(process_id, request):
+            start = self._now()
+            grant = acquire_up_to(process_id, request)
+            # Записывается фактически выданное: при воспроизведении это обычный запрос.
+            if np.any(grant):
+                self._record(OP_REQUEST, process_id, grant, start, True)
+            else:
+                self._record(OP_REQUEST, process_id, request, start, False)
+            return grant
+
+        def traced_release_resources(process_id, release):
+            start = self._now()
+            result = release_resources(process_id, release)
+            self._record(OP_RELEASE, process_id, release, start, True)
+            return result
+
+        def traced_request_many(operations):
+            operations = list(operations)
+            start = self._now()
+            results = request_many(operations)
+            for (process_id, request), result in zip(operations, results):
+                self._record(OP_REQUEST, process_id, request, start, result)
+            return results
+
+        def traced_release_many(operations):
+            operations = list(operations)
+            start = self._now()
+            results = release_many(operations)
+            for (process_id, release), result in zip(operations, results):
+                self._record(OP_RELEASE, process_id, release, start, result)
+            return results
+
+        monitor.set_max_claim = traced_set_max_claim
+        monitor.register_process = traced_register_process
+        monitor.unregister_process = traced_unregister_process
+        monitor.request_resources = traced_request_resources
+        monitor.try_request = traced_try_request
+        monitor.acquire_up_to = traced_acquire_up_to
+        monitor.release_resources = traced_release_resources
+        monitor.request_many = traced_request_many
+        monitor.release_many = traced_release_many
+        return self
+
+    def detach(self):
+        for name in self.TRACED_METHODS:
+            self.monitor.__dict__.pop(name, None)
+
+    def _now(self):
+        return time.perf_counter() - self._start
+
+    def _record(self, op, process_id, vector, start, result, blocking=False, timeout=None, priority=0):
+        event = {
+            "op": op,
+            "pid": int(process_id),
+            "vector": [int(v) for v in vector],
+            "start": start,
+            "end": self._now(),
+            "result": bool(result),
+        }
+        if blocking:
+            event["blocking"] = True
+        if timeout is not None:
+            event["timeout"] = timeout
+        if priority:
+            event["priority"] = priority
+        with self.lock:
+            self.events.append(event)
+
+    def save(self, path):
+        """Формат - JSON Lines: первая строка - начальное состояние, далее события."""
+        with self.lock:
+            events = sorted(self.events, key=lambda event: event["end"])
+        with open(path, "w", encoding="utf-8") as file_handle:
+            file_handle.write(json.dumps(self.header) + "\n")
+            for event in events:
+                file_handle.write(json.dumps(event) + "\n")
+
+
+class Trace:
+    def __init__(self, header, events):
+        self.header = header
+        self.events = events
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as file_handle:
+            header = json.loads(file_handle.readline())
+            events = [json.loads(line) for line in file_handle if line.strip()]
+        return cls(header, events)
+
+    @property
+    def num_processes(self):
+        return len(self.header["max_claim"])
+
+    def build_monitor(self, monitor_class=DeadlockPreventerMonitor, **options):
+        """
+        Монитор в начальном состоянии записи.
+
+        Состояние воспроизводится публичными вызовами: процессы регистрируются
+        со своими max_claim, слоты снятых с учета освобождаются, а выделение
+        запрашивается одним пакетом. Поэтому подходит любое хранилище, в том
+        числе с распакованными копиями матриц. Несогласованное или небезопасное
+        начальное состояние - ValueError.
+        """
+        available = np.array(self.header["available"], dtype=int)
+        shape = (self.num_processes, len(available))
+        max_claim = np.array(self.header["max_claim"], dtype=int).reshape(shape)
+        allocation = np.array(self.header["allocation"], dtype=int).reshape(shape)
+        # Записи без "live" сделаны до учета регистраций: живы все слоты.
+        live = np.array(self.header.get("live", [True] * self.num_processes), dtype=bool)
+
+        monitor = monitor_class(available + allocation.sum(axis=0), 0, **options)
+        for process_id in range(self.num_processes):
+            monitor.register_process(max_claim[process_id])
+        for process_id in np.flatnonzero(~live):
+            monitor.unregister_process(int(process_id))
+        held = [(process_id, allocation[process_id]) for process_id in np.flatnonzero(allocation.any(axis=1))]
+        if not all(monitor.request_many(held)):
+            raise ValueError("Начальное состояние записи несогласованно или небезопасно")
+        return monitor
+
+
+class ReplayResult:
+    def __init__(self, operations, elapsed, mismatches):
+        self.operations = operations
+        self.elapsed = elapsed
+        # Запросы, результат которых при воспроизведении отличается от записанного,
+        # и регистрации, получившие другой номер процесса.
+        self.mismatches = mismatches
+
+    @property
+    def ops_per_sec(self):
+        return self.operations / self.elapsed if self.elapsed else float("inf")
+
+
+def replay_fast(trace, monitor):
+    """
+    Однопоточное воспроизведение с максимальной скоростью.
+
+    События идут в порядке завершения вызовов, то есть в том порядке, в котором
+    монитор принимал решения. Неблокирующие запросы выполняются через
+    request_many, а блокирующие - через request_resources с timeout=0 и
+    записанным priority: они проходят через очередь ожидания и планировщик, но
+    не ждут, поэтому воспроизведение детерминировано.
+    """
+    mismatches = 0
+    vectors = [np.array(event["vector"], dtype=int) for event in trace.events]
+    start = time.perf_counter()
+    for event, vector in zip(trace.events, vectors):
+        op, process_id = event["op"], event["pid"]
+        if op == OP_REQUEST:
+            if event.get("blocking"):
+                result = monitor.request_resources(process_id, vector, timeout=0, priority=event.get("priority", 0))
+            else:
+                result = monitor.request_many([(process_id, vector)])[0]
+            if result != event["result"]:
+                mismatches += 1
+        elif op == OP_RELEASE:
+            monitor.release_resources(process_id, vector)
+        elif op == OP_REGISTER:
+            if monitor.register_process(vector) != process_id:
+                mismatches += 1
+        elif op == OP_UNREGISTER:
+            monitor.unregister_process(process_id)
+        else:
+            monitor.set_max_claim(process_id, vector)
+    return ReplayResult(len(trace.events), time.perf_counter() - start, mismatches)
+
+
+def replay_timed(trace, monitor, speed=1.0):
+    """
+    Воспроизведение с исходными временами и параллелизмом: поток на каждый процесс.
+
+    Каждый поток выполняет события своего процесса в исходном порядке, дожидаясь
+    записанного момента начала вызова (ускоренного в speed раз). Записанные
+    сроки ожидания запросов сокращаются во столько же раз.
+    """
+    by_process = {}
+    for event in sorted(trace.events, key=lambda event: event["start"]):
+        by_process.setdefault(event["pid"], []).append(event)
+    mismatches = [0]
+    mismatches_lock = threading.Lock()
+
+    def run(events):
+        for event in events:
+            delay = event["start"] / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            vector = event["vector"]
+            if event["op"] == OP_REQUEST:
+                timeout = event.get("timeout")
+                result = monitor.request_resources(
+                    event["pid"],
+                    vector,
+                    blocking=event.get("blocking", False),
+                    timeout=timeout / speed if timeout is not None else None,
+                    priority=event.get("priority", 0),
+                )
+                if result != event["result"]:
+                    with mismatches_lock:
+                        mismatches[0] += 1
+            elif event["op"] == OP_RELEASE:
+                monitor.release_resources(event["pid"], vector)
+            elif event["op"] == OP_REGISTER:
+                if monitor.register_process(vector) != event["pid"]:
+                    with mismatches_lock:
+                        mismatches[0] += 1
+            elif event["op"] == OP_UNREGISTER:
+                monitor.unregister_process(event["pid"])
+            else:
+                monitor.set_max_claim(event["pid"], vector)
+
+    threads = [threading.Thread(target=run, args=(events,)) for events in by_process.values()]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return ReplayResult(len(trace.events), time.perf_counter() - start, mismatches[0])